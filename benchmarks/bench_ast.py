@@ -0,0 +1,127 @@
+'''
+Benchmarks: Serialization of the AST.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import pickle
+import argparse
+import tempfile
+import tracemalloc
+from io import StringIO
+from time import perf_counter
+from synthetic import generate_lines, build_front_end
+import uCSerialize
+import uCAST
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_ast.py --load [--lines N]
+# python benchmarks/bench_ast.py --memory [--lines N]
+# python benchmarks/bench_ast.py --dump [--lines N]
+
+def timed(function, *args):
+    start = perf_counter()
+    result = function(*args)
+    return perf_counter() - start, result
+
+def bench_load(parser, lines):
+    ''' Parse a program vs load its serialized AST (pickle, and the binary
+        format, whole or with lazy function bodies).
+    '''
+    text = generate_lines(lines)
+    parser.lexer.reset_line_num()
+    elapsed, ast = timed(parser.parse, text, False)
+    print(f"parse:          {elapsed:8.3f}s")
+
+    pickled = pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)
+    data = uCSerialize.dumps(ast)
+    elapsed, _ = timed(pickle.loads, pickled)
+    print(f"pickle load:    {elapsed:8.3f}s, {len(pickled) / 2**20:8.2f} MiB")
+    elapsed, _ = timed(uCSerialize.loads, data, False)
+    print(f"binary load:    {elapsed:8.3f}s, {len(data) / 2**20:8.2f} MiB")
+    elapsed, program = timed(uCSerialize.loads, data)
+    print(f"lazy load:      {elapsed:8.3f}s")
+    elapsed, _ = timed(lambda: program.gdecls[len(program.gdecls) // 2].body)
+    print(f"+ one body:     {elapsed:8.3f}s")
+
+def bench_memory(parser, lines):
+    ''' Memory held by the AST of a program, per 1k lines of source, with
+        and without the compact AST (see uCParser).
+    '''
+    text = generate_lines(lines)
+    for compact in (False, True):
+        parser.compact = compact
+        parser.lexer.reset_line_num()
+        tracemalloc.start()
+        ast = parser.parse(text, False)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'compact' if compact else 'normal':8}: {size / 2**20:8.2f} MiB, "
+              f"{size / 2**10 / (lines / 1000):8.1f} KiB per 1k lines")
+        del ast
+
+def show_lines(ast, buf):
+    ''' Dump as Node.show did before NodeWriter: show_node line by line. '''
+    def pre(node, name, depth):
+        buf.write(node.show_node(4 * depth, False, False, True, name))
+    uCAST.walk(ast, pre)
+
+def bench_dump(parser, lines):
+    ''' Throughput of the AST dump (Node.show format), line by line vs
+        NodeWriter, to memory, a file and a file descriptor.
+    '''
+    text = generate_lines(lines)
+    parser.lexer.reset_line_num()
+    ast = parser.parse(text, False)
+
+    with tempfile.TemporaryFile('w+') as file:
+        def to_file(write):
+            file.seek(0)
+            file.truncate()
+            write(file)
+            file.flush()
+        fd = file.fileno()
+        def to_fd():
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            uCAST.NodeWriter(fd).write(ast)
+
+        cases = [('lines, memory', lambda: show_lines(ast, StringIO())),
+                 ('lines, file', lambda: to_file(lambda f: show_lines(ast, f))),
+                 ('writer, memory', lambda: uCAST.NodeWriter(StringIO()).write(ast)),
+                 ('writer, file', lambda: to_file(lambda f: uCAST.NodeWriter(f).write(ast))),
+                 ('writer, fd', to_fd)]
+        buf = StringIO()
+        uCAST.NodeWriter(buf).write(ast)
+        size = len(buf.getvalue())
+        for name, case in cases:
+            elapsed = min(timed(case)[0] for _ in range(3))
+            print(f"{name:15} {elapsed:8.3f}s, {size / 2**20 / elapsed:8.2f} MiB/s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=100000,
+                        help='Size of the synthetic program, in lines.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--load', action='store_true',
+                       help='Load time of a serialized AST vs parsing.')
+    group.add_argument('--memory', action='store_true',
+                       help='Memory of the AST per 1k lines, normal vs compact.')
+    group.add_argument('--dump', action='store_true',
+                       help='Throughput of the AST dump (show), line by line vs NodeWriter.')
+    args = parser.parse_args()
+
+    _, front_end = build_front_end()
+    if args.load:
+        bench_load(front_end, args.lines)
+    elif args.memory:
+        bench_memory(front_end, args.lines)
+    elif args.dump:
+        bench_dump(front_end, args.lines)
@@ -0,0 +1,187 @@
+'''
+Benchmarks: Back end (CFG, dataflow, optimization and interpretation of the uCIR).
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import sys
+import argparse
+import tempfile
+from io import StringIO
+from glob import glob
+from time import perf_counter
+from synthetic import workdir, generate_lines, build_front_end
+from uCSemantic import uCSemanticCheck
+from uCGenerate import uCIRGenerator
+from uCBlock import uCIRCFG
+from uCDFA import uCIRDFA
+from uCOptimize import uCIROptimizer
+from uCInterpreter import uCIRInterpreter
+from uCIR import number
+from uCBinary import dump, load
+from uCText import read
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_backend.py --opt [--lines N] [--runs N]
+# python benchmarks/bench_backend.py --run [--runs N]
+# python benchmarks/bench_backend.py --load [--lines N] [--runs N]
+
+STAGES = ('parse', 'check', 'generate', 'cfg', 'optimize', 'run')
+
+def compile_opt(parser, data):
+    ''' Compile as uCCompiler -o does (and run the optimized uCIR), timing
+        each stage.
+    '''
+    times = [perf_counter()]
+    parser.lexer.reset_line_num()
+    program = parser.parse(data, False)
+    times.append(perf_counter())
+    sema = uCSemanticCheck(parser)
+    sema.visit(program)
+    times.append(perf_counter())
+    gen = uCIRGenerator(sema)
+    gen.visit(program)
+    times.append(perf_counter())
+    cfg = uCIRCFG(gen)
+    cfg.build_cfg(gen.code)
+    times.append(perf_counter())
+    opt = uCIROptimizer(uCIRDFA(cfg))
+    opt.optimize(True, True, True, False)
+    times.append(perf_counter())
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+        uCIRInterpreter(gen).run(opt.code)
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = stdout
+    times.append(perf_counter())
+    return [end - start for start, end in zip(times, times[1:])]
+
+def read_corpus(*dirs):
+    ''' Programs (without input) of the tests directories. '''
+    corpus = sorted(sum((glob(os.path.join(workdir, 'tests', d, '*.uc')) for d in dirs), []))
+    sources = []
+    for filename in corpus:
+        with open(filename, 'r') as source:
+            data = source.read()
+        if 'read' not in data:
+            sources.append(data)
+    return sources
+
+def bench_opt(parser, lines, runs):
+    ''' Full -o compile of tests/opt_in and tests/IR_in (programs without
+        input), and of a synthetic program (best of runs, per stage).
+    '''
+    sources = read_corpus('opt_in', 'IR_in')
+
+    print(f"{'':10}" + ''.join(f"{stage:>10}" for stage in STAGES) + f"{'total':>10}")
+    def report(name, compile_all):
+        best = [min(t) for t in zip(*(compile_all() for _ in range(runs)))]
+        print(f"{name:10}" + ''.join(f"{t * 1000:8.1f}ms" for t in best) + f"{sum(best) * 1000:8.1f}ms")
+    report(f"{len(sources)} files", lambda: [sum(t) for t in zip(*(compile_opt(parser, data) for data in sources))])
+    text = generate_lines(lines, per_function=100)
+    report(f"{lines} lines", lambda: compile_opt(parser, text))
+
+def run_program(gen, code):
+    stdout, sys.stdout = sys.stdout, StringIO()
+    start = perf_counter()
+    try:
+        uCIRInterpreter(gen).run(code)
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = stdout
+    return perf_counter() - start
+
+def bench_run(parser, runs):
+    ''' Interpretation of the programs of tests/llvm and tests/complete_codes:
+        numbering of the registers, and run of the numbered uCIR (best of runs).
+    '''
+    sources = read_corpus('llvm', 'complete_codes')
+    programs = []
+    for data in sources:
+        parser.lexer.reset_line_num()
+        program = parser.parse(data, False)
+        sema = uCSemanticCheck(parser)
+        sema.visit(program)
+        gen = uCIRGenerator(sema)
+        gen.visit(program)
+        programs.append(gen)
+
+    size = sum(len(gen.code) for gen in programs)
+    numbering = min(timed(lambda: [number(gen.code) for gen in programs]) for _ in range(runs))
+    numbered = [number(gen.code) for gen in programs]
+    running = min(sum(run_program(gen, code) for gen, code in zip(programs, numbered)) for _ in range(runs))
+    print(f"{len(programs)} files, {size} instructions: number {numbering * 1000:.1f}ms, run {running * 1000:.1f}ms")
+
+def bench_load(parser, lines, runs):
+    ''' uCIR of a synthetic program: from its source (front end), from its
+        binary file (load, and render of the names) or from its text file
+        (read), best of runs.
+    '''
+    text = generate_lines(lines, per_function=100)
+    def front_end():
+        parser.lexer.reset_line_num()
+        program = parser.parse(text, False)
+        sema = uCSemanticCheck(parser)
+        sema.visit(program)
+        gen = uCIRGenerator(sema)
+        gen.visit(program)
+        return gen
+    gen = front_end()
+
+    fd, filename = tempfile.mkstemp(suffix='.irb')
+    os.close(fd)
+    ir_filename = filename[:-4] + '.ir'
+    try:
+        with open(filename, 'wb') as out_file:
+            dump(gen.code, out_file)
+        gen.write_file(gen.code, ir_filename)
+        source = min(timed(front_end) for _ in range(runs))
+        loading = min(timed(lambda: load(filename)) for _ in range(runs))
+        render = min(timed(lambda: load(filename).render()) for _ in range(runs))
+        text = min(timed(lambda: read(ir_filename)) for _ in range(runs))
+        print(f"{lines} lines, {len(gen.code)} instructions, {os.path.getsize(filename)} bytes "
+              f"(.ir: {os.path.getsize(ir_filename)} bytes): front end {source * 1000:.1f}ms, "
+              f"load {loading * 1000:.1f}ms, load and render {render * 1000:.1f}ms, "
+              f"read .ir {text * 1000:.1f}ms")
+    finally:
+        os.remove(filename)
+        if os.path.exists(ir_filename):
+            os.remove(ir_filename)
+
+def timed(func):
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=2000,
+                        help='Size of the synthetic program, in lines.')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of runs (the best one is shown).')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--opt', action='store_true',
+                       help='Stages of a full -o compile (and run of the optimized uCIR).')
+    group.add_argument('--load', action='store_true',
+                       help='Front end vs load of the binary (or text) uCIR.')
+    group.add_argument('--run', action='store_true',
+                       help='Numbering of the registers and run of the uCIR.')
+    args = parser.parse_args()
+
+    _, front_end = build_front_end()
+    if args.opt:
+        bench_opt(front_end, args.lines, args.runs)
+    elif args.load:
+        bench_load(front_end, args.lines, args.runs)
+    elif args.run:
+        bench_run(front_end, args.runs)
@@ -0,0 +1,56 @@
+'''
+Benchmarks: Batch front end over many translation units.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import argparse
+from glob import glob
+from time import perf_counter
+from synthetic import workdir
+from uCBatch import uCBatchFrontEnd
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_batch.py --scaling [--copies N] [--workers N ...]
+
+def bench_scaling(copies, workers, parser):
+    ''' Check tests/complete_codes, replicated copies times, with each
+        number of workers (0: serially, in this process).
+    '''
+    corpus = sorted(glob(os.path.join(workdir, 'tests', 'complete_codes', '*.uc')))
+    filenames = corpus * copies
+    print(f"{len(filenames)} files, {os.cpu_count()} CPU(s)")
+
+    serial = None
+    for count in workers:
+        start = perf_counter()
+        units = list(uCBatchFrontEnd(count, parser).check(filenames))
+        elapsed = perf_counter() - start
+        assert not any(unit.errors for unit in units)
+        serial = serial or elapsed
+        print(f"workers {count:3}: {elapsed:8.3f}s, {len(filenames) / elapsed:8.1f} files/s, "
+              f"speedup {serial / elapsed:5.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=100,
+                        help='Number of times the corpus is replicated.')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[0] + [2 ** i for i in range((os.cpu_count() or 1).bit_length())],
+                        help='Numbers of worker processes to compare (0: serial).')
+    parser.add_argument('--parser', choices=['ply', 'descent'], default='ply',
+                        help='Parser backend.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--scaling', action='store_true',
+                       help='Throughput of the batch front end vs number of workers.')
+    args = parser.parse_args()
+
+    if args.scaling:
+        bench_scaling(args.copies, args.workers, args.parser)
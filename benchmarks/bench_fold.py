@@ -0,0 +1,82 @@
+'''
+Benchmarks: Constant folding over the AST (uCIR size and compile time).
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import argparse
+from glob import glob
+from time import perf_counter
+from synthetic import workdir, build_front_end
+from uCSemantic import uCSemanticCheck
+from uCGenerate import uCIRGenerator
+from uCFold import uCConstantFolder
+from uCBlock import uCIRCFG
+from uCDFA import uCIRDFA
+from uCOptimize import uCIROptimizer
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_fold.py --opt-in [--runs N]
+
+def compile_file(parser, data, fold):
+    ''' Parse, check (and fold), generate and optimize the uCIR, as the
+        compiler does with -o (and -F). Returns the sizes of the uCIR
+        (generated, optimized) and the time after the parse.
+    '''
+    parser.lexer.reset_line_num()
+    program = parser.parse(data, False)
+    start = perf_counter()
+    sema = uCSemanticCheck(parser)
+    sema.visit(program)
+    if fold:
+        uCConstantFolder().fold(program)
+    gen = uCIRGenerator(sema)
+    gen.visit(program)
+    size = len(gen.code)
+    cfg = uCIRCFG(gen)
+    cfg.build_cfg(gen.code)
+    opt = uCIROptimizer(uCIRDFA(cfg))
+    opt.optimize(True, True, True, False)
+    return size, len(opt.code), perf_counter() - start
+
+def bench_opt_in(parser, runs):
+    ''' uCIR size and compile time of tests/opt_in, without and with the
+        folding of the AST (best of runs).
+    '''
+    totals = [0] * 6
+    print(f"{'file':8} {'uCIR':>5} {'-F':>5} {'opt':>5} {'-F':>5} {'ms':>7} {'-F':>7}")
+    for filename in sorted(glob(os.path.join(workdir, 'tests', 'opt_in', '*.uc'))):
+        with open(filename, 'r') as source:
+            data = source.read()
+        results = []
+        for fold in (False, True):
+            size, opt, _ = compile_file(parser, data, fold)
+            elapsed = min(compile_file(parser, data, fold)[2] for _ in range(runs))
+            results += [size, opt, elapsed]
+        totals = [a + b for a, b in zip(totals, results)]
+        print_row(os.path.basename(filename), results)
+    print_row('total', totals)
+
+def print_row(name, results):
+    size, opt, elapsed, fsize, fopt, felapsed = results
+    print(f"{name:8} {size:5} {fsize:5} {opt:5} {fopt:5} {elapsed * 1000:7.2f} {felapsed * 1000:7.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Number of runs (the best one is shown).')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--opt-in', action='store_true',
+                       help='tests/opt_in: uCIR size and compile time, without/with folding.')
+    args = parser.parse_args()
+
+    _, front_end = build_front_end()
+    if args.opt_in:
+        bench_opt_in(front_end, args.runs)
@@ -0,0 +1,197 @@
+'''
+Benchmarks: Performance of the uC lexer.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+from synthetic import generate_lines, build_front_end
+from uCLexer import uCLexer
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_lexer.py --coords [--lines N]
+# python benchmarks/bench_lexer.py --arrays [--tokens N]
+# python benchmarks/bench_lexer.py --stream [--lines N]
+# python benchmarks/bench_lexer.py --edit [--lines N]
+
+class RfindLexer(uCLexer):
+    ''' Column lookup as it was before the line-start index. '''
+    def find_column(self, lexpos):
+        last_cr = self.lexer.lexdata.rfind('\n', 0, lexpos)
+        return lexpos - last_cr
+
+def bench_coords(lexer, text):
+    ''' Resolve the coordinates of every token, with the old rfind scan
+        and with the line-start index (including the time to build it).
+    '''
+    legacy = RfindLexer(None)
+    legacy.build()
+    lexer.reset_line_num()
+    lexer.input(text)
+    positions = []
+    while True:
+        tok = lexer.token()
+        if not tok: break
+        positions.append(tok.lexpos)
+    print(f"{len(text.splitlines())} lines, {len(positions)} tokens")
+
+    start = perf_counter()
+    legacy.input(text)
+    old = [legacy.find_column(p) for p in positions]
+    elapsed = perf_counter() - start
+    print(f"rfind scan:        {elapsed:8.3f}s")
+
+    start = perf_counter()
+    lexer.input(text)
+    new = [lexer.find_column(p) for p in positions]
+    elapsed = perf_counter() - start
+    print(f"line-start index:  {elapsed:8.3f}s")
+
+    assert old == new, "Column mismatch between both approaches"
+
+    # Long lines are the worst case for rfind, which walks back to the newline.
+    wide = text.replace('\n', ' ')
+    sample = positions[::max(1, len(positions) // 2000)]
+
+    start = perf_counter()
+    legacy.input(wide)
+    old = [legacy.find_column(p) for p in sample]
+    elapsed = perf_counter() - start
+    print(f"rfind scan (single line, {len(sample)} lookups):       {elapsed:8.3f}s")
+
+    start = perf_counter()
+    lexer.input(wide)
+    new = [lexer.find_column(p) for p in sample]
+    elapsed = perf_counter() - start
+    print(f"line-start index (single line, {len(sample)} lookups): {elapsed:8.3f}s")
+
+    assert old == new, "Column mismatch between both approaches"
+
+def measure(func, *args):
+    ''' Run func, returning its result, time and peak of allocated memory. '''
+    tracemalloc.start()
+    start = perf_counter()
+    result = func(*args)
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def lex_tokens(lexer, text):
+    ''' Current path: one LexToken per token, through uCLexer.token(). '''
+    lexer.reset_line_num()
+    lexer.input(text)
+    toks = []
+    while True:
+        tok = lexer.token()
+        if not tok: break
+        toks.append(tok)
+    return toks
+
+def bench_arrays(lexer, text):
+    ''' Keep the whole token stream: LexToken list vs TokenArrays. '''
+    # Timing without tracemalloc, which slows allocations down.
+    for name, func in (('LexToken list', lex_tokens), ('TokenArrays', lambda l, t: l.tokenize_all(t))):
+        start = perf_counter()
+        toks = func(lexer, text)
+        elapsed = perf_counter() - start
+        toks, _, peak = measure(func, lexer, text)
+        print(f"{name:14} {len(toks)} tokens: {elapsed:8.3f}s, peak {peak / 2**20:8.1f} MiB")
+
+def consume(tokens):
+    ''' Read every token, as the parser does. '''
+    while tokens.token():
+        pass
+    return tokens
+
+def read_whole(lexer, filename):
+    ''' Current path: read the whole file, then tokenize it. '''
+    with open(filename, 'r') as source:
+        return consume(lexer.tokenize_all(source.read()))
+
+def read_stream(lexer, filename, use_mmap):
+    ''' Streaming path: tokens are read (and dropped) as the file is lexed. '''
+    return consume(lexer.stream(filename, use_mmap=use_mmap))
+
+def bench_stream(lexer, text):
+    ''' Lex a source file: whole-file read vs chunked and mmap streams. '''
+    fd, filename = tempfile.mkstemp(suffix='.uc')
+    with os.fdopen(fd, 'w') as source:
+        source.write(text)
+    try:
+        print(f"File: {os.path.getsize(filename) / 2**20:.1f} MiB")
+        runs = (('whole file', read_whole),
+                ('chunked', lambda l, f: read_stream(l, f, False)),
+                ('mmap', lambda l, f: read_stream(l, f, True)))
+        for name, func in runs:
+            start = perf_counter()
+            func(lexer, filename)
+            elapsed = perf_counter() - start
+            _, _, peak = measure(func, lexer, filename)
+            print(f"{name:10}: {elapsed:8.3f}s, peak {peak / 2**20:8.1f} MiB")
+    finally:
+        os.remove(filename)
+
+def bench_edit(lexer, text, edits=100):
+    ''' Keystrokes spread over a buffer: relex all text vs TokenBuffer.edit. '''
+    buffer = lexer.tokenize_buffer(text)
+    offsets = [len(text) * (i + 1) // (edits + 1) for i in range(edits)]
+
+    start = perf_counter()
+    for offset in offsets:
+        lexer.tokenize_all(text[:offset] + 'x' + text[offset:])
+    elapsed = perf_counter() - start
+    print(f"full relex : {elapsed / edits * 1000:8.3f} ms/edit")
+
+    start = perf_counter()
+    rescanned = 0
+    for offset in offsets:
+        first, last = buffer.edit(offset, 0, 'x')
+        rescanned += last - first
+    elapsed = perf_counter() - start
+    print(f"incremental: {elapsed / edits * 1000:8.3f} ms/edit, {rescanned / edits:.1f} tokens rescanned")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the uC lexer.')
+    parser.add_argument('--lines', type=int, default=1000000,
+                        help='Size of the synthetic program, in lines.')
+    parser.add_argument('--tokens', type=int, default=None,
+                        help='Size of the synthetic program, in tokens (overrides --lines).')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--coords', action='store_true',
+                       help='Token coordinates: rfind scan vs line-start index.')
+    group.add_argument('--arrays', action='store_true',
+                       help='Token stream: LexToken list vs TokenArrays.')
+    group.add_argument('--stream', action='store_true',
+                       help='Source file: whole read vs chunked/mmap streaming.')
+    group.add_argument('--edit', action='store_true',
+                       help='Edited buffer: full relex vs incremental relex.')
+    args = parser.parse_args()
+
+    lexer, _ = build_front_end()
+    if args.tokens:
+        args.lines = args.tokens // 5 # About 5 tokens per line
+    elif args.arrays:
+        args.lines = 100000
+    text = generate_lines(args.lines)
+
+    if args.coords:
+        bench_coords(lexer, text)
+    elif args.arrays:
+        bench_arrays(lexer, text)
+    elif args.stream:
+        bench_stream(lexer, text)
+    elif args.edit:
+        bench_edit(lexer, text)
+    else:
+        print("No valid option selected.")
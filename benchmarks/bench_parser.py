@@ -0,0 +1,103 @@
+'''
+Benchmarks: Performance of the uC parser.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import argparse
+from time import perf_counter
+from synthetic import generate_lines, generate_list, build_front_end
+from uCDescent import uCDescentParser
+from uCParser import uCIncrementalParser
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_parser.py --scaling [--sizes N ...] [--kinds K ...]
+# python benchmarks/bench_parser.py --throughput [--lines N]
+# python benchmarks/bench_parser.py --incremental [--lines N]
+
+KINDS = ('statements', 'globals', 'declarations', 'declarators', 'ids')
+
+def bench_scaling(parser, kinds, sizes):
+    ''' Parse lists of growing size: time per element must stay constant. '''
+    for kind in kinds:
+        print(f"{kind}:")
+        for n in sizes:
+            text = generate_list(kind, n)
+            parser.lexer.reset_line_num()
+            start = perf_counter()
+            parser.parse(text, False)
+            elapsed = perf_counter() - start
+            print(f"  {n:8}: {elapsed:8.3f}s, {elapsed / n * 1e6:6.2f} us/element")
+
+def timed_parse(parser, data):
+    parser.lexer.reset_line_num()
+    start = perf_counter()
+    parser.parse(data, False)
+    return perf_counter() - start
+
+def bench_throughput(parser, lines, runs=3):
+    ''' Tokens parsed per second (best of runs): PLY vs recursive descent
+        backends, reading tokens from the text or from a TokenArrays.
+    '''
+    descent = uCDescentParser(parser.lexer)
+    descent.build()
+    text = generate_lines(lines)
+    tokens = parser.lexer.tokenize_all(text)
+    print(f"{len(tokens)} tokens")
+    for name, backend in (('PLY', parser), ('descent', descent)):
+        for source, data in (('text', text), ('arrays', tokens)):
+            elapsed = min(timed_parse(backend, data) for _ in range(runs))
+            print(f"{name:8} {source:7}: {elapsed:8.3f}s, {len(tokens) / elapsed:10.0f} tokens/s")
+
+def bench_incremental(parser, lines, edits=5):
+    ''' Change one function body (adding a line to it) and parse again:
+        full parse vs reparsing the changed top-level declarations.
+    '''
+    incremental = uCIncrementalParser(parser)
+    text = generate_lines(lines)
+    start = perf_counter()
+    incremental.parse(text, False)
+    print(f"first parse:  {perf_counter() - start:8.3f}s, {incremental.reparsed} declarations")
+
+    full = part = 0
+    bodies = [i for i in range(len(text)) if text.startswith('    i++;\n', i)]
+    for n in reversed(range(edits)): # From the end: offsets stay valid
+        at = bodies[len(bodies) * (2 * n + 1) // (2 * edits)]
+        text = text[:at] + '    x = x + 1;\n' + text[at:]
+        full += timed_parse(parser, text)
+        start = perf_counter()
+        incremental.parse(text, False)
+        part += perf_counter() - start
+    print(f"full parse:   {full / edits:8.3f}s/edit")
+    print(f"incremental:  {part / edits:8.3f}s/edit, {incremental.reparsed} declaration(s) reparsed")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='Number of elements of each list.')
+    parser.add_argument('--lines', type=int, default=100000,
+                        help='Size of the synthetic program, in lines.')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=['statements', 'globals'],
+                        help='List productions to stress.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--scaling', action='store_true',
+                       help='Parse time of list productions vs list size.')
+    group.add_argument('--throughput', action='store_true',
+                       help='Tokens per second of each parser backend.')
+    group.add_argument('--incremental', action='store_true',
+                       help='Reparse after an edit: full vs incremental.')
+    args = parser.parse_args()
+
+    _, front_end = build_front_end()
+    if args.scaling:
+        bench_scaling(front_end, args.kinds, args.sizes)
+    elif args.throughput:
+        bench_throughput(front_end, args.lines)
+    elif args.incremental:
+        bench_incremental(front_end, args.lines)
@@ -0,0 +1,71 @@
+'''
+Benchmarks: Start-up time of the uC front end.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+from synthetic import workdir
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_startup.py --tables [--runs N]
+
+# Builds the lexer and parser in a fresh process, printing the time taken.
+_BUILD = '''
+import sys
+from time import perf_counter
+sys.path.insert(0, {workdir!r})
+start = perf_counter()
+from uCLexer import uCLexer
+from uCParser import uCParser
+lexer = uCLexer(None)
+lexer.build()
+parser = uCParser(lexer)
+parser.build(errorlog=None)
+print(perf_counter() - start)
+'''
+
+def build_time(cache):
+    ''' Start a process building the front end with the given cache directory.
+        Returns the build time, and the whole process time.
+    '''
+    env = dict(os.environ, UC_CACHE_DIR=cache)
+    start = perf_counter()
+    out = subprocess.run([sys.executable, '-c', _BUILD.format(workdir=workdir)], env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return float(out.split()[-1]), perf_counter() - start
+
+def bench_tables(runs):
+    ''' Cold start (empty cache, tables generated) vs warm start (tables loaded). '''
+    cold, warm = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache:
+            cold.append(build_time(cache))
+            warm.append(build_time(cache))
+    for name, times in (('cold', cold), ('warm', warm)):
+        build = min(t[0] for t in times)
+        process = min(t[1] for t in times)
+        print(f"{name}: build {build * 1000:8.1f} ms, process {process * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of runs (the best one is shown).')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--tables', action='store_true',
+                       help='Front end build: cold vs warm table cache.')
+    args = parser.parse_args()
+
+    if args.tables:
+        bench_tables(args.runs)
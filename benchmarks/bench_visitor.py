@@ -0,0 +1,253 @@
+'''
+Benchmarks: AST traversals (semantic check, IR generation and dump).
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import io
+import gc
+import argparse
+from time import perf_counter
+from synthetic import generate_lines, generate_nested, build_front_end
+from uCSemantic import uCSemanticCheck, uCIncrementalChecker, uCParallelChecker
+from uCParser import uCIncrementalParser
+from uCGenerate import uCIRGenerator, uCFusedGenerator
+import uCAST as ast
+
+# NOTE: Running benchmarks
+# python benchmarks/bench_visitor.py --traversal [--lines N] [--runs N]
+# python benchmarks/bench_visitor.py --depth [--depth-of N]
+# python benchmarks/bench_visitor.py --dispatch [--lines N] [--runs N]
+# python benchmarks/bench_visitor.py --scopes [--runs N]
+# python benchmarks/bench_visitor.py --incremental [--lines N]
+# python benchmarks/bench_visitor.py --parallel [--lines N] [--runs N] [--jobs N ...]
+# python benchmarks/bench_visitor.py --fused [--lines N] [--runs N]
+
+class Counter(ast.NodeVisitor):
+    ''' Counts the nodes: the cost of the visit itself, per node. '''
+
+    def __init__(self):
+        self.nodes = 0
+
+    def generic_visit(self, node):
+        self.nodes += 1
+        for _, child in node.children():
+            yield child
+
+    def visit_BinaryOp(self, node):
+        self.nodes += 1
+        yield node.lvalue
+        yield node.rvalue
+
+    def visit_Assignment(self, node):
+        self.nodes += 1
+        yield node.lvalue
+        yield node.rvalue
+
+    def visit_ID(self, node):
+        self.nodes += 1
+
+    def visit_Constant(self, node):
+        self.nodes += 1
+
+def traverse(parser, text, dump=True):
+    ''' Parse text, then time the semantic check, the IR generation and
+        the AST dump (the tree is parsed again for each run: they modify it).
+    '''
+    parser.lexer.reset_line_num()
+    ast = parser.parse(text, False)
+    times = []
+    start = perf_counter()
+    sema = uCSemanticCheck(parser)
+    sema.visit(ast)
+    times.append(perf_counter() - start)
+    start = perf_counter()
+    uCIRGenerator(sema).visit(ast)
+    times.append(perf_counter() - start)
+    if dump:
+        start = perf_counter()
+        ast.show(buf=io.StringIO(), showcoord=True)
+        times.append(perf_counter() - start)
+    return times
+
+def bench_traversal(parser, lines, runs):
+    ''' Time of each traversal over a synthetic program (best of runs). '''
+    text = generate_lines(lines)
+    best = [min(t) for t in zip(*(traverse(parser, text) for _ in range(runs)))]
+    for name, elapsed in zip(('semantic check', 'IR generation', 'show'), best):
+        print(f"{name:16}{elapsed:8.3f}s")
+
+def bench_depth(parser, depth):
+    ''' Run the semantic check and IR generation over deeply nested trees.
+        (Not the dump: its indentation makes it quadratic in the depth.)
+    '''
+    for kind in ('expression', 'else-if'):
+        try:
+            times = traverse(parser, generate_nested(kind, depth), dump=False)
+            print(f"{kind:12} depth {depth}: {sum(times):8.3f}s")
+        except RecursionError:
+            print(f"{kind:12} depth {depth}: RecursionError")
+
+def bench_dispatch(parser, lines, runs):
+    ''' Time per node of a visit: with one visitor for the whole tree,
+        and with a new visitor for each function (as test() does).
+    '''
+    parser.lexer.reset_line_num()
+    ast = parser.parse(generate_lines(lines, per_function=20), False)
+    for name, roots in (('one visitor', [ast]), ('one per function', ast.gdecls)):
+        best = None
+        for _ in range(runs):
+            nodes = 0
+            start = perf_counter()
+            for root in roots:
+                counter = Counter()
+                counter.visit(root)
+                nodes += counter.nodes
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:18}{best / nodes * 1e9:8.1f} ns/node ({nodes} nodes)")
+
+def bench_scopes(parser, runs):
+    ''' Time per nesting level of the semantic check and IR generation, over
+        nested loops: each one is a scope, using the variables of the outer
+        ones. It stays flat if names are resolved in O(1).
+    '''
+    for depth in (250, 500, 1000, 2000):
+        text = generate_nested('loops', depth)
+        best = [min(t) for t in zip(*(traverse(parser, text, dump=False) for _ in range(runs)))]
+        print(f"depth {depth:5}: semantic check {best[0] / depth * 1e6:8.1f} us/level, "
+              f"IR generation {best[1] / depth * 1e6:8.1f} us/level")
+
+def bench_incremental(parser, lines, edits=5):
+    ''' Change one function body (adding a line to it), then parse and check
+        again: full check vs checking the changed top-level declarations.
+    '''
+    incremental = uCIncrementalParser(parser)
+    checker = uCIncrementalChecker(parser)
+    text = generate_lines(lines)
+    parser.lexer.reset_line_num()
+    start = perf_counter()
+    checker.check(incremental.parse(text, False))
+    print(f"first check:  {perf_counter() - start:8.3f}s, {checker.rechecked} declarations")
+
+    full = part = 0
+    bodies = [i for i in range(len(text)) if text.startswith('    i++;\n', i)]
+    for n in reversed(range(edits)): # From the end: offsets stay valid
+        at = bodies[len(bodies) * (2 * n + 1) // (2 * edits)]
+        text = text[:at] + '    x = x + 1;\n' + text[at:]
+        parser.lexer.reset_line_num()
+        start = perf_counter()
+        uCSemanticCheck(parser).visit(parser.parse(text, False))
+        full += perf_counter() - start
+        parser.lexer.reset_line_num()
+        start = perf_counter()
+        checker.check(incremental.parse(text, False), incremental.changed)
+        part += perf_counter() - start
+    print(f"full check:   {full / edits:8.3f}s/edit")
+    print(f"incremental:  {part / edits:8.3f}s/edit, {checker.rechecked} declaration(s) checked")
+
+def bench_parallel(parser, lines, runs, jobs):
+    ''' Semantic check of a program with thousands of small functions:
+        sequential vs function bodies checked in a pool of N workers, with
+        the checked trees sent back or only the errors.
+    '''
+    text = generate_lines(lines, per_function=20)
+    def timed(checker):
+        parser.lexer.reset_line_num()
+        program = parser.parse(text, False)
+        start = perf_counter()
+        checker(program)
+        return perf_counter() - start
+
+    base = min(timed(uCSemanticCheck(parser).visit) for _ in range(runs))
+    print(f"{len(text.splitlines())} lines, {text.count('int f')} functions")
+    print(f"sequential:     {base:8.3f}s")
+    for workers in jobs:
+        for trees in (True, False):
+            elapsed = min(timed(uCParallelChecker(workers, trees=trees).check) for _ in range(runs))
+            print(f"{workers:3} worker(s), {'trees ' if trees else 'errors'}: {elapsed:8.3f}s, "
+                  f"speedup {base / elapsed:5.2f}")
+
+def bench_fused(parser, lines, runs):
+    ''' Parse, check and generate the IR of a synthetic program (end to
+        end): a semantic check then an IR generation (two traversals) vs
+        the fused single traversal. The runs alternate, each one after a
+        full collection, so both pay the same for the garbage collector.
+    '''
+    text = generate_lines(lines)
+    def timed(fused):
+        gc.collect()
+        start = perf_counter()
+        parser.lexer.reset_line_num()
+        program = parser.parse(text, False)
+        parsed = perf_counter()
+        sema = uCSemanticCheck(parser)
+        if fused:
+            uCFusedGenerator(sema).visit(program)
+        else:
+            sema.visit(program)
+            uCIRGenerator(sema).visit(program)
+        end = perf_counter()
+        return parsed - start, end - parsed, end - start
+
+    times = {False: [], True: []}
+    for _ in range(runs):
+        for fused in times:
+            times[fused].append(timed(fused))
+    results = {}
+    for name, fused in (('two passes', False), ('fused', True)):
+        results[name] = [min(t) for t in zip(*times[fused])]
+        parse, visit, total = results[name]
+        print(f"{name:11} parse {parse:8.3f}s, check and IR {visit:8.3f}s, total {total:8.3f}s")
+    base, fused = results['two passes'], results['fused']
+    print(f"saved: {base[1] - fused[1]:8.3f}s ({(base[1] - fused[1]) / base[1]:.0%} of the traversals, "
+          f"{(base[2] - fused[2]) / base[2]:.0%} end to end)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=20000,
+                        help='Size of the synthetic program, in lines.')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Number of runs (the best one is shown).')
+    parser.add_argument('--depth-of', type=int, default=100000,
+                        help='Depth of the nested trees.')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Numbers of worker processes (0: no pool).')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--traversal', action='store_true',
+                       help='Time of the semantic check, IR generation and show.')
+    group.add_argument('--depth', action='store_true',
+                       help='Traversals of deeply nested trees.')
+    group.add_argument('--dispatch', action='store_true',
+                       help='Time per node of a visit (dispatch overhead).')
+    group.add_argument('--scopes', action='store_true',
+                       help='Name resolution in deeply nested scopes.')
+    group.add_argument('--incremental', action='store_true',
+                       help='Parse and check after an edit: full vs incremental.')
+    group.add_argument('--parallel', action='store_true',
+                       help='Semantic check with the function bodies in a worker pool.')
+    group.add_argument('--fused', action='store_true',
+                       help='End to end: check and IR generation, separate vs fused.')
+    args = parser.parse_args()
+
+    _, front_end = build_front_end()
+    if args.traversal:
+        bench_traversal(front_end, args.lines, args.runs)
+    if args.depth:
+        bench_depth(front_end, args.depth_of)
+    if args.dispatch:
+        bench_dispatch(front_end, args.lines, args.runs)
+    if args.scopes:
+        bench_scopes(front_end, args.runs)
+    if args.incremental:
+        bench_incremental(front_end, args.lines)
+    if args.parallel:
+        bench_parallel(front_end, args.lines, args.runs, args.jobs)
+    if args.fused:
+        bench_fused(front_end, args.lines, args.runs)
@@ -0,0 +1,98 @@
+'''
+Benchmarks: Synthetic uC programs for the performance scripts.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os, re, sys
+
+# Make the compiler modules importable from the benchmarks folder.
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.benchmarks$', '', workdir)
+sys.path.append(workdir)
+
+# Body of a function, repeated to reach the requested size.
+_BODY = (
+    '    /* accumulate */\n',
+    '    x = x + i * 2;\n',
+    '    if (x > 100) x = x % 7;\n',
+    '    else y = y + 1.5;\n',
+    '    // next iteration\n',
+    '    i++;\n',
+)
+
+def generate_lines(lines, per_function=1000):
+    ''' Create a valid uC program with (about) the given number of lines. '''
+    out = ['int g = 0;\n', 'char msg[6] = "hello";\n']
+    count = 2
+    f = 0
+    while count < lines:
+        out.append(f'int f{f}(int i) {{\n    int x = 0;\n    float y = 0.0;\n')
+        count += 3
+        n = 0
+        while n < per_function and count < lines:
+            out.append(_BODY[n % len(_BODY)])
+            n += 1
+            count += 1
+        out.append('    return x;\n}\n')
+        count += 2
+        f += 1
+    out.append('int main() {\n    return f0(1);\n}\n')
+    return ''.join(out)
+
+def generate_list(kind, n):
+    ''' Create a valid uC program with a list of n elements, where kind is
+        the list production being stressed:
+            - statements: statement_list (one function with n statements)
+            - globals: global_declaration_list (n global variables)
+            - declarations: declaration_list (n local declarations)
+            - declarators: init_declarator_list (n variables, one declaration)
+            - ids: id_list (n identifiers in a function declarator)
+    '''
+    names = (f'v{i}' for i in range(n))
+    if kind == 'statements':
+        body = ''.join(f'    x = x + {i};\n' for i in range(n))
+        return f'int main() {{\n    int x = 0;\n{body}    return x;\n}}\n'
+    if kind == 'globals':
+        return ''.join(f'int {v};\n' for v in names) + 'int main() {\n    return 0;\n}\n'
+    if kind == 'declarations':
+        body = ''.join(f'    int {v};\n' for v in names)
+        return f'int main() {{\n{body}    return 0;\n}}\n'
+    if kind == 'declarators':
+        return f"int {', '.join(names)};\nint main() {{\n    return 0;\n}}\n"
+    if kind == 'ids':
+        return f"int f({', '.join(names)});\nint main() {{\n    return 0;\n}}\n"
+    raise ValueError(f"Unknown list kind: {kind}")
+
+def generate_nested(kind, depth):
+    ''' Create a valid uC program with a tree of the given depth, where kind is:
+            - expression: left associative chain of additions (x + x + ...)
+            - else-if: chain of if/else if statements
+            - loops: while loops nested in each other, each one declaring a
+              variable and using the outer ones (one scope per loop)
+    '''
+    if kind == 'expression':
+        return f"int main() {{\n    int x = 1;\n    x = x{' + x' * depth};\n    return x;\n}}\n"
+    if kind == 'else-if':
+        chain = ' else '.join(f'if (x == {i}) x = {i + 1};\n   ' for i in range(depth))
+        return f"int main() {{\n    int x = 0;\n    {chain} ;\n    return x;\n}}\n"
+    if kind == 'loops':
+        opening = ''.join(f'    while (x < 1) {{\n    int v{i} = x + g;\n    x = x + v{i};\n' for i in range(depth))
+        return f"int g = 1;\nint main() {{\n    int x = 0;\n{opening}{'    }' * depth}\n    return x;\n}}\n"
+    raise ValueError(f"Unknown nesting kind: {kind}")
+
+def build_front_end():
+    ''' Build a lexer/parser pair as the compiler does. '''
+    from uCLexer import uCLexer
+    from uCParser import uCParser
+    lexer = uCLexer(None)
+    lexer.build()
+    parser = uCParser(lexer)
+    parser.build()
+    return lexer, parser
@@ -0,0 +1,61 @@
+import sys, os, unittest, re
+from io import StringIO
+from glob import glob
+from contextlib import redirect_stdout
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+from uCParser import uCParser as Parser
+from uCSemantic import uCSemanticCheck as Semantic
+from uCGenerate import uCIRGenerator as Generator
+
+class FrontEndTest(unittest.TestCase):
+    '''
+    Shared setup of the tests that compile uC programs: a parser is built
+    for each test, and programs go through the front end from their text.
+    Atributes:
+        - inputs: the uC programs of the tests directory
+        - parser: the parser of the test
+    '''
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', '**', '*.uc'), recursive=True))
+
+    def setUp(self):
+        lexer = Lexer(lambda msg, x, y: None)
+        lexer.build()
+        self.parser = Parser(lexer)
+        self.parser.build()
+
+    # AST of a program, without the parser's messages (None if it has a
+    # syntax error).
+    def parse(self, data):
+        with redirect_stdout(StringIO()):
+            self.parser.lexer.reset_line_num()
+            return self.parser.parse(data, False)
+
+    def parse_file(self, filename):
+        with open(filename, 'r') as content_file:
+            return self.parse(content_file.read())
+
+    # Checked AST of a program, and its semantic check.
+    def check(self, data):
+        program = self.parse(data)
+        sema = Semantic(self.parser)
+        sema.visit(program)
+        return program, sema
+
+    # Generator of the program's uCIR (gen.code), after generating it.
+    def generate(self, data):
+        program, sema = self.check(data)
+        gen = Generator(sema)
+        gen.visit(program)
+        return gen
+
+    # AST dump, with coordinates.
+    def show(self, ast):
+        buf = StringIO()
+        ast.show(buf=buf, showcoord=True)
+        return buf.getvalue()
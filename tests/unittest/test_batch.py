@@ -0,0 +1,62 @@
+import sys, os, unittest, re, tempfile
+from io import StringIO
+from glob import glob
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+from uCParser import uCParser as Parser
+from uCSemantic import uCSemanticCheck as Semantic
+from uCBatch import uCBatchFrontEnd as BatchFrontEnd
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestBatch(unittest.TestCase):
+    ''' Batch front end in a process pool vs the serial front end. '''
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', 'complete_codes', '*.uc')))
+    errors = sorted(glob(os.path.join(workdir, 'tests', 'errors', '*.uc')))
+
+    def show(self, ast):
+        buf = StringIO()
+        ast.show(buf=buf, showcoord=True)
+        return buf.getvalue()
+
+    def test_pool(self):
+        filenames = (self.inputs + self.errors) * 3
+        units = list(BatchFrontEnd(2, chunksize=4).check(filenames))
+        serial = list(BatchFrontEnd(0).check(filenames))
+        self.assertEqual([u.filename for u in units], filenames)
+        for unit, expected in zip(units, serial):
+            self.assertEqual(unit.errors, expected.errors, unit.filename)
+            self.assertEqual(unit.data is None, unit.filename in self.errors, unit.filename)
+
+    def test_ast(self):
+        lexer = Lexer(lambda msg, x, y: None)
+        lexer.build()
+        parser = Parser(lexer)
+        parser.build()
+        for unit in BatchFrontEnd(2).check(self.inputs):
+            lexer.reset_line_num()
+            with open(unit.filename, 'r') as content_file:
+                ast = parser.parse(content_file.read(), False)
+            Semantic(parser).visit(ast)
+            self.assertEqual(self.show(unit.ast()), self.show(ast), unit.filename)
+
+    def test_deep(self):
+        # Deeper than the recursion limit: the tree is sent back all the same.
+        depth = 3 * sys.getrecursionlimit()
+        data = 'int main() {\n    int x = 0;\n' + '{' * depth + 'x = x + 1;' + '}' * depth + '\n    return x;\n}\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'deep.uc')
+            with open(filename, 'w') as source:
+                source.write(data)
+            units = list(BatchFrontEnd(2).check([filename] + self.inputs))
+        self.assertEqual(units[0].errors, [])
+        self.assertEqual(units[0].ast().gdecls[0].decl.name.name, 'main')
+        self.assertTrue(all(unit.data is not None for unit in units))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys, os, unittest, re, tempfile, argparse
+from io import StringIO
+from contextlib import redirect_stderr
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCBinary import dump, load, uCIRFile
+from uCCompiler import Compiler, subscribe_errors, clear_errors
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestBinary(FrontEndTest):
+    ''' uCIR saved in binary files, and loaded back. '''
+
+    def setUp(self):
+        super().setUp()
+        fd, self.filename = tempfile.mkstemp(suffix='.irb')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def roundtrip(self, code):
+        with open(self.filename, 'wb') as f:
+            dump(code, f)
+        return load(self.filename).render()
+
+    def test_inputs(self):
+        saved = 0
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            try:
+                gen = self.generate(data)
+            except Exception:
+                continue
+            code = self.roundtrip(gen.code)
+            self.assertEqual(code, gen.code, filename)
+            # Same text form (as uCIRGenerator prints it).
+            self.assertEqual(list(map(gen.format_instruction, code)),
+                             list(map(gen.format_instruction, gen.code)), filename)
+            saved += 1
+        self.assertGreater(saved, 0)
+
+    def test_constants(self):
+        code = [('global_float_2_2', '@m', [[1.5, -2.0], [0.25, 3e10]]),
+                ('global_string', '@.str.0', "ação: 'x'\n"),
+                ('global_int', '@n'),
+                ('global_int_2', '@f', ['int', 'float']),
+                ('define_void', '@main', []),
+                ('literal_int', -(2 ** 40), '%1'),
+                ('literal_char', 'c', '%2'),
+                ('literal_bool', True, '%3'),
+                ('return_void',)]
+        back = self.roundtrip(code)
+        self.assertEqual(back, code)
+        self.assertIs(back[7][1], True)
+
+    def test_mapped(self):
+        gen = self.generate("int main() { int x = 2; print(x * 3); return 0; }")
+        with open(self.filename, 'wb') as f:
+            dump(gen.code, f)
+        with uCIRFile(self.filename) as f:
+            code = f.section('code')
+            # The instructions are read in place, 4 integers each.
+            self.assertEqual(len(code), 4 * len(gen.code))
+            self.assertEqual(f.program().render(), gen.code)
+
+        with open(self.filename, 'wb') as f:
+            f.write(b'not a uCIR file')
+        with self.assertRaises(ValueError):
+            load(self.filename)
+
+    def test_empty(self):
+        # Left by a compilation with errors: reported, not loaded.
+        with tempfile.TemporaryDirectory() as tmp:
+            text = os.path.join(tmp, 'empty.ir')
+            open(text, 'w').close()
+            for filename in (self.filename, text):
+                args = argparse.Namespace(filename=filename, susy=True, ast=False, ir=False, no_run=True,
+                                          cfg=False, opt=True, debug=False, llvm=False, llvm_opt=None,
+                                          parser='ply', stream=False, compact=False, fused=False, fold=False,
+                                          binary=False)
+                errors = []
+                clear_errors()
+                with subscribe_errors(errors.append), redirect_stderr(StringIO()):
+                    Compiler(args).compile()
+                clear_errors()
+                self.assertEqual(errors, [f"no uCIR in {filename}"])
+
+if __name__ == '__main__':
+    unittest.main()
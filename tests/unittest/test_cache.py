@@ -0,0 +1,65 @@
+import sys, os, unittest, re, tempfile
+from glob import glob
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+from uCParser import uCParser as Parser
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class ChangedParser(Parser):
+    def p_empty(self, p):
+        '''empty : 
+        '''
+        pass
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.environ = os.environ.get('UC_CACHE_DIR')
+        os.environ['UC_CACHE_DIR'] = self.cache.name
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ['UC_CACHE_DIR']
+        else:
+            os.environ['UC_CACHE_DIR'] = self.environ
+        self.cache.cleanup()
+
+    def build(self, parser_class=Parser):
+        lexer = Lexer(None)
+        lexer.build()
+        parser = parser_class(lexer)
+        parser.build(errorlog=None)
+        return parser
+
+    def tables(self):
+        return sorted(os.path.basename(f) for f in glob(os.path.join(self.cache.name, '*tab_*')))
+
+    def test_reuse(self):
+        # Tables are written once, then loaded by later builds.
+        self.build()
+        tables = self.tables()
+        self.assertEqual([t.split('_')[0] for t in tables], ['lextab', 'parsetab'])
+        mtimes = [os.path.getmtime(os.path.join(self.cache.name, t)) for t in tables]
+        parser = self.build()
+        self.assertEqual(self.tables(), tables)
+        self.assertEqual([os.path.getmtime(os.path.join(self.cache.name, t)) for t in tables], mtimes)
+        ast = parser.parse("int main() { return 0; }", False)
+        self.assertEqual(ast.gdecls[0].decl.name.name, 'main')
+
+    def test_invalidation(self):
+        # A grammar change gets new tables; the lexer tables are kept.
+        self.build()
+        tables = self.tables()
+        self.build(ChangedParser)
+        changed = self.tables()
+        self.assertEqual(len(changed), 3)
+        self.assertEqual(set(tables) - set(changed), set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys, os, unittest, re
+from io import StringIO
+from glob import glob
+from contextlib import redirect_stdout
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+from uCParser import uCParser as Parser
+from uCParser import uCIncrementalParser as IncrementalParser
+from uCDescent import uCDescentParser as DescentParser
+from uCSemantic import uCSemanticCheck as Semantic
+from uCGenerate import uCIRGenerator as Generator
+import uCSerialize
+import uCAST as ast
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestCompact(unittest.TestCase):
+    ''' Compact AST (packed coordinates, shared types), vs the normal one. '''
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', '**', '*.uc'), recursive=True))
+
+    def setUp(self):
+        self.lexer = Lexer(lambda msg, x, y: None)
+        self.lexer.build()
+
+    def build(self, cls, compact):
+        parser = cls(self.lexer, compact)
+        parser.build()
+        return parser
+
+    # Show and IR of the checked program, or the semantic error.
+    def compile(self, parser, data):
+        with redirect_stdout(StringIO()):
+            self.lexer.reset_line_num()
+            program = parser.parse(data, False)
+        if program is None:
+            return None
+        try:
+            sema = Semantic(parser)
+            sema.visit(program)
+        except AssertionError as e:
+            return str(e)
+        gen = Generator(sema)
+        gen.visit(program)
+        buf = StringIO()
+        program.show(buf=buf, showcoord=True)
+        return buf.getvalue(), gen.code
+
+    def test_conformance(self):
+        for cls in (Parser, DescentParser):
+            normal, compact = self.build(cls, False), self.build(cls, True)
+            for filename in self.inputs:
+                with open(filename, 'r') as content_file:
+                    data = content_file.read()
+                expected, result = self.compile(normal, data), self.compile(compact, data)
+                if not isinstance(expected, tuple):
+                    self.assertEqual(result, expected, filename)
+                    continue
+                self.assertEqual(result[1], expected[1], filename)
+
+                # Only the shared types have no coordinates: their VarDecl
+                # has them instead.
+                expected, result = expected[0].splitlines(), result[0].splitlines()
+                self.assertEqual(len(result), len(expected), filename)
+                for i, (line, other) in enumerate(zip(result, expected)):
+                    if line != other and line.strip()[:8] == 'VarDecl:':
+                        coord = expected[i + 1][expected[i + 1].index('   @ '):]
+                        self.assertEqual(line, other + coord, filename)
+                    elif line != other:
+                        self.assertEqual(line.strip()[:5], 'Type:', filename)
+                        self.assertEqual(line, other[:other.index('   @ ')], filename)
+                        self.assertEqual(result[i - 1].strip()[:8], 'VarDecl:', filename)
+
+    def test_nodes(self):
+        parser = self.build(Parser, True)
+        program = parser.parse("int total;\nint main() {\n  int b = 300; float c[2]; float d; total = b;\n  return total;\n}", False)
+        b, c, d = program.gdecls[1].body.decls
+        self.assertIsInstance(b.name.coord, ast.PackedCoord)
+        self.assertEqual((b.name.coord.line, b.name.coord.column), (3, 7))
+        self.assertEqual(str(b.name.coord), str(ast.Coord(3, 7)))
+
+        # Scalars share their Type node, arrays don't.
+        self.assertIs(b.type.type, program.gdecls[0].decls[0].type.type)
+        self.assertIs(d.type.type, parser.shared_types['float'])
+        self.assertEqual((d.type.coord.line, d.type.coord.column), (3, 28))
+        self.assertIsNot(c.type.type.type, d.type.type)
+        self.assertIs(program.gdecls[1].body.stats[0].lvalue.name, sys.intern('total'))
+
+        # Read back as normal coordinates.
+        result = uCSerialize.loads(uCSerialize.dumps(program), lazy=False)
+        coord = result.gdecls[1].body.decls[0].name.coord
+        self.assertEqual((type(coord), coord.line, coord.column), (ast.Coord, 3, 7))
+
+        # Wide columns don't fit.
+        coord = ast.PackedCoord(1, 5000)
+        self.assertEqual((type(coord), coord.line, coord.column), (ast.Coord, 1, 5000))
+
+        with self.assertRaises(ValueError):
+            IncrementalParser(parser)
+
+if __name__ == '__main__':
+    unittest.main()
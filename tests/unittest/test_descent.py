@@ -0,0 +1,99 @@
+import sys, os, unittest, re
+from io import StringIO
+from glob import glob
+from contextlib import redirect_stdout
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+from uCParser import uCParser as Parser
+from uCDescent import uCDescentParser as DescentParser
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestDescent(unittest.TestCase):
+    ''' Conformance of the recursive descent parser with the PLY one. '''
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', '**', '*.uc'), recursive=True))
+
+    def setUp(self):
+        self.parsers = []
+        for parser_class in (Parser, DescentParser):
+            lexer = Lexer(lambda msg, x, y: None)
+            lexer.build()
+            parser = parser_class(lexer)
+            parser.build()
+            self.parsers.append(parser)
+
+    # Returns the messages printed by the parser and the AST dump.
+    def parse(self, parser, data):
+        messages, buf = StringIO(), StringIO()
+        with redirect_stdout(messages):
+            parser.lexer.reset_line_num()
+            ast = parser.parse(data, False)
+            if ast is not None:
+                ast.show(buf=buf, showcoord=True)
+        return messages.getvalue().splitlines(), buf.getvalue()
+
+    def test_conformance(self):
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            (errors, expected), (descent_errors, result) = [self.parse(p, data) for p in self.parsers]
+            if errors:
+                # No error recovery: only the first syntax error is the same.
+                self.assertEqual(descent_errors, errors[:1], filename)
+            else:
+                self.assertEqual(descent_errors, [], filename)
+                self.assertEqual(result, expected, filename)
+
+    def test_expressions(self):
+        # Precedence, associativity, casts and assignments.
+        exprs = ['a = b = c - d - e * f / g % h', 'a || b && c == d < e + f',
+                 '-(int) a = (float) b++ + !c[1](2, 3)--', '*p += &q < r != s',
+                 'a < b < c', 'a == b != c', '(int) a = 1', 'a + b = c',
+                 # A parenthesized list followed by a comma is extended.
+                 '(a, b), c', 'x = ((a, b), c)', 'g((a, b), c)', '((a, b)), c']
+        for expr in exprs:
+            data = f"int main() {{ {expr}; if (a) if (b) c; else d; }}"
+            (errors, expected), (descent_errors, result) = [self.parse(p, data) for p in self.parsers]
+            self.assertEqual(descent_errors, errors[:1], expr)
+            self.assertEqual(result, expected, expr)
+
+        data = "int main() { for ((i, j), k;;) break; }"
+        (errors, expected), (descent_errors, result) = [self.parse(p, data) for p in self.parsers]
+        self.assertEqual((descent_errors, errors), ([], []))
+        self.assertEqual(result, expected)
+
+    def test_depth(self):
+        # Else if chains and nested parentheses deeper than the recursion
+        # limit, as the PLY parser takes them.
+        depth = 2 * sys.getrecursionlimit()
+        chain = ' else '.join(f"if (a == {i}) b = {i};" for i in range(depth))
+        parens = '(' * depth + 'a' + ') + b' * (depth - 1) + ')'
+        nested = '((a)[1] = ((b), c) * (((int) d)))'
+        for data in (f"int main() {{ {chain} else b = 0; }}", f"int main() {{ a = {parens}; }}",
+                     f"int main() {{ a = {nested}; }}"):
+            (errors, expected), (descent_errors, result) = [self.parse(p, data) for p in self.parsers]
+            self.assertEqual((descent_errors, errors), ([], []))
+            self.assertEqual(result, expected)
+
+        # Other nestings that deep are a syntax error, not a RecursionError.
+        data = f"int main() {{ a = {'-' * depth}b; }}"
+        errors, result = self.parse(self.parsers[1], data)
+        self.assertEqual((len(errors), result), (1, ''))
+
+    def test_token_arrays(self):
+        # Same AST from the text and from the TokenArrays of the lexer.
+        parser = self.parsers[1]
+        for filename in self.inputs[:20]:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            _, expected = self.parse(parser, data)
+            _, result = self.parse(parser, parser.lexer.tokenize_all(data))
+            self.assertEqual(result, expected, filename)
+
+if __name__ == '__main__':
+    unittest.main()
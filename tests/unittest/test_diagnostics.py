@@ -0,0 +1,79 @@
+import sys, os, unittest, re, tempfile, argparse
+from io import StringIO
+from contextlib import redirect_stderr
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCSemantic import uCSemanticCheck as Semantic
+from uCCompiler import Compiler, subscribe_errors, clear_errors
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestDiagnostics(FrontEndTest):
+    ''' Semantic errors collected in one pass, without cascading. '''
+
+    # Errors of the program, collected.
+    def diagnostics(self, data):
+        sema = Semantic(self.parser, recover=True)
+        sema.visit(self.parse(data))
+        return [str(diagnostic) for diagnostic in sema.diagnostics]
+
+    def test_first(self):
+        # The first one is the error raised by default.
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            program = self.parse(data)
+            if program is None:
+                continue
+            try:
+                Semantic(self.parser).visit(program)
+                expected = []
+            except AssertionError as e:
+                expected = [str(e)]
+            self.assertEqual(self.diagnostics(data)[:1], expected, filename)
+
+    def test_recovery(self):
+        data = ("int f(int a, float b);\n"
+                "int f(int a, float b) {\n"
+                "    int x = 1.0;\n"
+                "    float y = x + b * 2;\n"   # Only the mismatch of b * 2
+                "    x = (z + 1) * f(x, y);\n"  # Only z, not the expressions using it
+                "    g(x + y, z);\n"            # g, x + y and z
+                "    return y;\n"
+                "}\n")
+        self.assertEqual(self.diagnostics(data), [
+            "(3, 9): Initialization type mismatch in declaration(type(int)/type(float)).",
+            "(4, 19): Type mismatch in binary operation ([type(float)]/[type(int)]).",
+            "(5, 10): ID 'z' is not defined.",
+            "(6, 5): ID 'g' is not defined.",
+            "(6, 7): Type mismatch in binary operation ([type(int)]/[type(float)]).",
+            "(6, 14): ID 'z' is not defined.",
+            "(7, 5): Incorrect return type [type(float)], expected [type(int)]."])
+
+    def test_compiler(self):
+        # Reported by line, whatever the order of the check.
+        data = "int main() {\n    int v[2];\n    float x =\n        v[1.0];\n    return y;\n}\n"
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'errors.uc')
+            with open(filename, 'w') as source:
+                source.write(data)
+            for fused in (False, True):
+                args = argparse.Namespace(filename=filename, susy=True, ast=False, ir=False, no_run=True,
+                                          cfg=False, opt=False, debug=False, llvm=False, llvm_opt=None,
+                                          parser='ply', stream=False, compact=False, fused=fused, fold=False,
+                                          binary=False)
+                errors = []
+                clear_errors()
+                with subscribe_errors(errors.append), redirect_stderr(StringIO()):
+                    Compiler(args).compile()
+                clear_errors()
+                self.assertEqual(errors, ["3: Initialization type mismatch in declaration([type(float)]/[type(int)]).",
+                                          "4: Array index must be of type int, and is of type float.",
+                                          "5: ID 'y' is not defined."])
+
+if __name__ == '__main__':
+    unittest.main()
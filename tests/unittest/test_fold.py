@@ -0,0 +1,81 @@
+import sys, os, unittest, re
+from io import StringIO
+from glob import glob
+from contextlib import redirect_stdout
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCGenerate import uCIRGenerator as Generator
+from uCFold import uCConstantFolder as Folder
+from uCInterpreter import uCIRInterpreter as Interpreter
+import uCAST as ast
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestFold(FrontEndTest):
+    ''' Constant folding of the AST: less uCIR, same output. '''
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', 'opt_in', '*.uc')) +
+                    glob(os.path.join(workdir, 'tests', 'IR_in', '*.uc')))
+
+    # uCIR of the program, and its output.
+    def compile(self, data, fold):
+        program, sema = self.check(data)
+        if fold:
+            Folder().fold(program)
+        gen = Generator(sema)
+        gen.visit(program)
+        out = StringIO()
+        with redirect_stdout(out), self.assertRaises(SystemExit):
+            Interpreter(gen).run(gen.code)
+        return gen.code, out.getvalue()
+
+    def test_fold(self):
+        program, _ = self.check("int main() {\n    float y = (float) (7 / 2) * 2.0 + -(1.5);\n"
+                                "    int v[2] = {1 + 1, 10 % 0};\n    return v[2 - 1];\n}\n")
+        folder = Folder()
+        folder.fold(program)
+        body = program.gdecls[0].body
+        y, v = body.decls[0].init, body.decls[1].init
+        self.assertIsInstance(y, ast.Constant)
+        self.assertEqual((y.value, y.type.name[0].name), (4.5, 'float'))
+        self.assertEqual(v.exprs[0].value, 2)
+        self.assertIsInstance(v.exprs[1], ast.BinaryOp) # Division by zero, kept
+        self.assertEqual(body.stats[0].expr.subsc.value, 1)
+        self.assertEqual(folder.replaced, {})
+
+    def test_prune(self):
+        data = ("int f(int a) {\n    if (1 > 2) return 0; else if (!(3 <= 3) || 2 > 1) a = a + 1;\n"
+                "    while (1 == 2 && 0 < 1) a = a * 2;\n    assert 2 > 1;\n    if (a > 1) print(a);\n"
+                "    for (a = 0; a < 2 * 2; a++) { if (0 == 1) break; print(a); }\n    return a;\n}\n"
+                "int main() {\n    print(f(3), -7 / 2, (int) 3.7 + 10 % 4);\n    return 0;\n}\n")
+        program, _ = self.check(data)
+        folder = Folder()
+        folder.fold(program)
+        stats = program.gdecls[0].body.stats
+        self.assertIsInstance(stats[0], ast.Assignment)
+        self.assertEqual([type(stat) for stat in stats[1:]], [ast.If, ast.For, ast.Return])
+        self.assertEqual([type(stat) for stat in stats[2].body.stats], [ast.Print])
+        self.assertEqual(folder.pruned, 5)
+
+        code, out = self.compile(data, False)
+        folded, folded_out = self.compile(data, True)
+        self.assertEqual(folded_out, out)
+        self.assertLess(len(folded), len(code))
+
+    def test_inputs(self):
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            if 'read' in data:
+                continue
+            code, out = self.compile(data, False)
+            folded, folded_out = self.compile(data, True)
+            self.assertEqual(folded_out, out, filename)
+            self.assertLessEqual(len(folded), len(code), filename)
+
+if __name__ == '__main__':
+    unittest.main()
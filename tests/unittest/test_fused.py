@@ -0,0 +1,77 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCSemantic import uCSemanticCheck as Semantic
+from uCGenerate import uCIRGenerator as Generator
+from uCGenerate import uCFusedGenerator as FusedGenerator
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestFused(FrontEndTest):
+    ''' Fused check and IR generation, vs a check then a generation. '''
+
+    # IR of the program, or the error of its check.
+    def compile(self, data, fused):
+        program = self.parse(data)
+        sema = Semantic(self.parser)
+        try:
+            if fused:
+                gen = FusedGenerator(sema)
+                gen.visit(program)
+            else:
+                sema.visit(program)
+                gen = Generator(sema)
+                gen.visit(program)
+        except AssertionError as e:
+            return str(e)
+        return gen.code
+
+    def test_inputs(self):
+        compiled = 0
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            if self.parse(data) is None:
+                continue
+            expected = self.compile(data, False)
+            self.assertEqual(self.compile(data, True), expected, filename)
+            compiled += isinstance(expected, list)
+        self.assertGreater(compiled, 0)
+
+    def test_errors(self):
+        errors = ["int main() { int x; x = y + 1; return 0; }",
+                  "int f(int a) { return a; }\nint main() { int x = f + 1; return x; }",
+                  "int main() { int x = 1; if (x) x = 2; return 0; }",
+                  "int main() { int v[2]; v = 1; return 0; }",
+                  "int main[2]() { return 0; }"]
+        for data in errors:
+            with self.assertRaises(AssertionError) as cm:
+                self.compile_fused(data)
+            self.assertEqual(str(cm.exception), self.compile(data, False))
+
+    def test_recheck(self):
+        # After a failed fused pass, the same AST is checked again (see
+        # uCCompiler) and gets the diagnostics of a fresh one.
+        errors = ["int *p[2];\nint main() { float x = (float) 1; return y; }",
+                  "int main() { char s[] = \"ab\"; int v[] = {1, 2}; v = 1; return 0; }"]
+        for data in errors:
+            program = self.parse(data)
+            with self.assertRaises(AssertionError):
+                FusedGenerator(Semantic(self.parser)).visit(program)
+            sema = Semantic(self.parser, recover=True)
+            sema.visit(program)
+            fresh = self.parse(data)
+            expected = Semantic(self.parser, recover=True)
+            expected.visit(fresh)
+            self.assertEqual(list(map(str, sema.diagnostics)), list(map(str, expected.diagnostics)))
+            self.assertEqual(self.show(program), self.show(fresh))
+
+    def compile_fused(self, data):
+        FusedGenerator(Semantic(self.parser)).visit(self.parse(data))
+
+if __name__ == '__main__':
+    unittest.main()
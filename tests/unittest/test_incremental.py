@@ -0,0 +1,95 @@
+import sys, os, unittest, re
+from io import StringIO
+from contextlib import redirect_stdout
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCParser import uCIncrementalParser as IncrementalParser
+from uCSemantic import uCSemanticCheck as Semantic, uCIncrementalChecker as IncrementalChecker
+from uCGenerate import uCIRGenerator as Generator
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestIncremental(FrontEndTest):
+    ''' Incremental reparsing vs parsing the whole source again. '''
+
+    # Returns the messages printed by the parser and the AST dump.
+    def dump(self, parser, data):
+        messages = StringIO()
+        with redirect_stdout(messages):
+            self.parser.lexer.reset_line_num()
+            ast = parser.parse(data, False)
+        return messages.getvalue().splitlines(), self.show(ast) if ast is not None else ''
+
+    def test_conformance(self):
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            errors, expected = self.dump(self.parser, data)
+            if not errors:
+                incremental = IncrementalParser(self.parser)
+                self.assertEqual(self.dump(incremental, data), ([], expected), filename)
+
+    def test_edit(self):
+        functions = ["int f%d(int a) {\n    a = a + %d;\n    return a;\n}\n" % (i, i) for i in range(4)]
+        incremental = IncrementalParser(self.parser)
+        data = ''.join(functions)
+        self.dump(incremental, data)
+        self.assertEqual(incremental.reparsed, 4)
+
+        # Only the edited function is reparsed; the lines after it are shifted.
+        data = data.replace('a = a + 1;', 'a = a + 1;\n    a = a * 2;')
+        result = self.dump(incremental, data)
+        self.assertEqual(incremental.reparsed, 1)
+        self.assertEqual(result, self.dump(self.parser, data))
+        self.assertIn("Type: ['int']   @ 14:1", result[1])
+
+        # Declarations with syntax errors are parsed (and reported) again.
+        data = data.replace('return a;\n}\nint f3', 'return a\n}\nint f3')
+        errors, _ = self.dump(incremental, data)
+        self.assertEqual(len(errors), 1)
+        errors, _ = self.dump(incremental, data + '\n')
+        self.assertEqual((len(errors), incremental.reparsed), (1, 1))
+
+    # Returns the dump and the IR of the checked program (or the error).
+    def compile(self, data, incremental=None, checker=None):
+        self.parser.lexer.reset_line_num()
+        try:
+            if checker is None:
+                program = self.parser.parse(data, False)
+                sema = Semantic(self.parser)
+                sema.visit(program)
+            else:
+                program = checker.check(incremental.parse(data, False), incremental.changed)
+                sema = Semantic(self.parser)
+        except AssertionError as e:
+            return str(e)
+        gen = Generator(sema)
+        gen.visit(program)
+        return self.show(program), gen.code
+
+    def test_semantic(self):
+        data = ("int g = 1;\nint f0(int a);\n"
+                + ''.join("int f%d(int a) {\n    a = a + g * %d;\n    return f%d(a);\n}\n" % (i, i, max(i - 1, 0)) for i in range(4))
+                + "int h(int a) {\n    return a;\n}\nint main() {\n    return f3(h(1));\n}\n")
+        edits = [('', '', 8),                                         # Everything is checked first
+                 ('a = a + g * 2;', 'a = a + g * 2;\n    a = a * 2;', 2), # f2, and f3 calling it
+                 ('int g = 1;', 'int g = 2;', 5),                     # Users of g
+                 ('    return a;\n}', '    return a + 1;\n}', 2),    # h, and main calling it
+                 ('int h(int a)', 'float h(int a)', 0),               # Error in h
+                 ('    return a + 1;', '    return 1.0;', 1),        # Error in main
+                 ('float h(int a) {\n    return 1.0;', 'int h(int a) {\n    return a;', 2), # Both again
+                 ('int g = 2;\n', '', 0)]                             # Error in f0
+        incremental = IncrementalParser(self.parser)
+        checker = IncrementalChecker(self.parser)
+        for old, new, rechecked in edits:
+            data = data.replace(old, new)
+            result = self.compile(data, incremental, checker)
+            self.assertEqual(result, self.compile(data), data)
+            self.assertEqual(checker.rechecked, rechecked, data)
+
+if __name__ == '__main__':
+    unittest.main()
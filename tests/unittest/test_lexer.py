@@ -0,0 +1,108 @@
+import sys, os, unittest, re
+from glob import glob
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCLexer import uCLexer as Lexer
+
+def print_error(msg, x, y):
+    print("Lexical error: %s at %d:%d" % (msg, x, y))
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestLexer(unittest.TestCase):
+
+    inputs = sorted(glob(os.path.join(workdir, 'tests', '*', '*.uc')))
+
+    def setUp(self):
+        self.lexer = Lexer(print_error)
+        self.lexer.build()
+
+    def read(self, filename):
+        with open(filename, 'r') as content_file:
+            return content_file.read()
+
+    def tokens(self, data):
+        self.lexer.reset_line_num()
+        self.lexer.input(data)
+        toks = []
+        while True:
+            tok = self.lexer.token()
+            if not tok: break
+            toks.append(tok)
+        return toks
+
+    def test_columns(self):
+        # Columns from the line-start index must match a backwards scan.
+        for filename in self.inputs:
+            data = self.read(filename)
+            for tok in self.tokens(data):
+                expected = tok.lexpos - data.rfind('\n', 0, tok.lexpos)
+                self.assertEqual(self.lexer.find_tok_column(tok), expected, filename)
+
+    def test_coords(self):
+        data = "int a;\n\nint main() {\n    return a;\n}"
+        coords = [self.lexer.find_coord(tok.lexpos) for tok in self.tokens(data)]
+        self.assertEqual(coords[:3], [(1, 1), (1, 5), (1, 6)])
+        self.assertEqual(coords[-1], (5, 1))
+        for tok in self.tokens(data):
+            self.assertEqual(self.lexer.find_coord(tok.lexpos)[0], tok.lineno)
+
+    def test_tokenize_all(self):
+        # The array scanner must yield the same stream as token().
+        for filename in self.inputs:
+            data = self.read(filename)
+            expected = self.tokens(data)
+            toks = self.lexer.tokenize_all(data)
+            self.assertEqual(len(toks), len(expected), filename)
+            for i, tok in enumerate(expected):
+                got = toks.token()
+                self.assertEqual((got.type, got.value, got.lineno, got.lexpos),
+                                 (tok.type, tok.value, tok.lineno, tok.lexpos), filename)
+                self.assertEqual(toks.type(i), tok.type, filename)
+                self.assertEqual(toks.find_column(tok.lexpos),
+                                 self.lexer.find_tok_column(tok), filename)
+            self.assertIsNone(toks.token())
+
+    def test_stream(self):
+        # Tokens split across chunks must be scanned as in the whole text.
+        for filename in self.inputs:
+            expected = self.lexer.tokenize_all(self.read(filename))
+            for size, use_mmap in ((1, False), (7, True), (4096, False)):
+                stream = self.lexer.stream(filename, size, use_mmap)
+                for i in range(len(expected)):
+                    tok, ref = stream.token(), expected.token()
+                    self.assertEqual((tok.type, tok.value, tok.lineno, tok.lexpos),
+                                     (ref.type, ref.value, ref.lineno, ref.lexpos), filename)
+                    self.assertEqual(stream.find_column(tok.lexpos),
+                                     expected.find_column(ref.lexpos), filename)
+                self.assertIsNone(stream.token())
+                expected.rewind()
+
+    def test_edit(self):
+        # Relexing an edit must give the same tokens as lexing the new text.
+        def dump(toks):
+            return (list(map(toks.type, range(len(toks)))), list(map(toks.value, range(len(toks)))),
+                    list(toks.starts), list(toks.lines), list(toks.line_starts))
+        edits = ['x', '\n\n', '/*', '*/', '"', "'", '// c', '1.5', '=']
+        for filename in self.inputs:
+            data = self.read(filename)
+            buffer = self.lexer.tokenize_buffer(data)
+            for i, inserted in enumerate(edits):
+                offset = len(buffer.text) * i // len(edits)
+                buffer.edit(offset, i % 3, inserted)
+                expected = self.lexer.tokenize_all(buffer.text)
+                self.assertEqual(dump(buffer), dump(expected), filename)
+
+        # Opening a comment relexes up to the end of it, then resynchronizes.
+        buffer = self.lexer.tokenize_buffer("int a;\nint b;\n/* c */ int d;\nint e;")
+        first, last = buffer.edit(7, 0, "/* ")
+        self.assertEqual((first, last), (2, 3))
+        self.assertEqual((buffer.type(3), buffer.value(4)), ('INT', 'd'))
+        self.assertEqual((buffer.lines[3], buffer.lines[-1]), (3, 4))
+        self.assertEqual(buffer.find_column(buffer.starts[-1]), 6)
+
+if __name__ == '__main__':
+    unittest.main()
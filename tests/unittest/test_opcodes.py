@@ -0,0 +1,95 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from io import StringIO
+from contextlib import redirect_stdout
+from uCIR import Op, decode, operands, number
+from uCInterpreter import uCIRInterpreter as Interpreter
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestOpcodes(unittest.TestCase):
+    ''' uCIR opcodes, decoded once. '''
+
+    def test_decode(self):
+        code = decode('store_int_10_*')
+        self.assertIs(code, decode('store_int_10_*'))
+        self.assertEqual((code.op, code.name, code.type, code.dims, code.ptr),
+                         (Op.STORE, 'store', 'int', (10,), True))
+        self.assertEqual(code.modifier, {'dim0': '10', 'ptr1': '*'})
+        self.assertEqual(code.operation, 'store_int')
+
+        self.assertEqual(decode('12').op, Op.LABEL)
+        self.assertEqual((decode('call_void').operation, decode('call_void').type), ('call', 'void'))
+        self.assertEqual((decode('fptosi').operation, decode('fptosi').type), ('fptosi', None))
+        self.assertEqual(decode('alloc_float_3_2').dims, (3, 2))
+        self.assertIsNone(decode('nop_int').op)
+
+    def test_operands(self):
+        inst = ('add_int', '%1', '%2', '%3')
+        code = decode(inst[0])
+        self.assertEqual((operands(inst, code.uses), operands(inst, code.defines)), (['%1', '%2'], ['%3']))
+
+        # Storing through a pointer uses both of its operands.
+        inst = ('store_int_*', '%4', '%5')
+        code = decode(inst[0])
+        self.assertEqual((operands(inst, code.uses), operands(inst, code.defines)), (['%4', '%5'], []))
+        inst = ('store_int', '%4', '%5')
+        code = decode(inst[0])
+        self.assertEqual((operands(inst, code.uses), operands(inst, code.defines)), (['%4'], ['%5']))
+
+        # Shorter instructions don't have them.
+        self.assertEqual(operands(('call_void', '@f'), decode('call_void').defines), [])
+        self.assertEqual(operands(('return_void',), decode('return_void').uses), [])
+
+class TestNumbered(unittest.TestCase):
+    ''' uCIR with its registers and globals numbered. '''
+
+    code = [('global_int', '@n', 3),
+            ('define_int', '@twice', [('int', '%1')]),
+            ('alloc_int', '%x'),
+            ('store_int', '%1', '%x'),
+            ('load_int', '%x', '%2'),
+            ('add_int', '%2', '%2', '%3'),
+            ('return_int', '%3'),
+            ('define_int', '@main', []),
+            ('load_int', '@n', '%1'),
+            ('param_int', '%1'),
+            ('call_int', '@twice', '%2'),
+            ('literal_int', 6, '%3'),
+            ('eq_int', '%2', '%3', '%4'),
+            ('cbranch', '%4', '%5', '%6'),
+            ('5',),
+            ('print_int', '%2'),
+            ('6',),
+            ('literal_int', 0, '%7'),
+            ('return_int', '%7')]
+
+    def test_number(self):
+        program = number(self.code)
+        self.assertEqual(program.symbols, ['@n', '@twice', '@main'])
+        self.assertEqual(program.registers[1], ['%0', '%1', '%x', '%2', '%3'])
+        self.assertIsNone(program.registers[0])
+        self.assertEqual(program.size(program.symbol('@main')), 8)
+
+        # Registers are dense in each function, globals are ~index.
+        self.assertEqual(program.code[1][1:], (~1, [('int', 1)]))
+        self.assertEqual(program.code[8][1:], (~0, 1))
+        self.assertEqual(program.code[10][1:], (~1, 2))
+        self.assertEqual(program.code[11][1:], (6, 3))
+        self.assertEqual(program.code[14][1:], (5,))
+        self.assertIs(program.code[5][0], decode('add_int'))
+        self.assertEqual(program.render(), self.code)
+
+    def test_run(self):
+        for code in (self.code, number(self.code)):
+            with redirect_stdout(StringIO()) as out:
+                with self.assertRaises(SystemExit) as cm:
+                    Interpreter(None).run(code)
+            self.assertEqual((out.getvalue(), cm.exception.code), ('6', 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCSemantic import uCSemanticCheck as Semantic, uCParallelChecker as ParallelChecker
+from uCGenerate import uCIRGenerator as Generator
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestParallel(FrontEndTest):
+    ''' Function bodies checked in a worker pool, vs the sequential check. '''
+
+    # Show and IR of the checked program, or the semantic error.
+    def compile(self, data, checker=None):
+        program = self.parse(data)
+        if program is None:
+            return None
+        try:
+            if checker is None:
+                Semantic(self.parser).visit(program)
+            else:
+                checker.check(program)
+        except AssertionError as e:
+            return str(e)
+        gen = Generator()
+        gen.visit(program)
+        return self.show(program), gen.code
+
+    def test_conformance(self):
+        checker = ParallelChecker(0)
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            self.assertEqual(self.compile(data, checker), self.compile(data), filename)
+
+    def test_pool(self):
+        # One function per chunk: names declared after a body are unknown to it.
+        checker = ParallelChecker(2, chunks=8)
+        data = ''.join(f"int f{i}(int a) {{\n    return f{max(i - 1, 0)}(a) + {i};\n}}\n" for i in range(12))
+        programs = [data,
+                    data.replace("return f3(a)", "return f5(a)"),
+                    "int g;\n" + data.replace("return f3(a)", "return g(a)").replace("f8(int a)", "f8(float a)"),
+                    data.replace("int f6(int a)", "int f2(int a)"),
+                    data.replace("+ 9;", "+ 1.0;").replace("+ 4;", "+ 1.0;")]
+        for data in programs:
+            expected = self.compile(data)
+            self.assertEqual(self.compile(data, checker), expected, data)
+
+            # Only the errors are sent back.
+            if isinstance(expected, str):
+                self.assertEqual(self.compile(data, ParallelChecker(2, trees=False)), expected)
+
+            # All the errors, in source order.
+            recovering = ParallelChecker(2, chunks=8, recover=True)
+            self.assertEqual(self.diagnostics(data, recovering), self.diagnostics(data), data)
+
+    def test_deep(self):
+        # Bodies deeper than the recursion limit are sent back all the same.
+        depth = 3 * sys.getrecursionlimit()
+        body = '{' * depth + 'x = x + 1;' + '}' * depth
+        data = ''.join(f"int f{i}(int x) {{\n{body}\n    return x;\n}}\n" for i in range(4))
+        self.assertEqual(self.compile(data, ParallelChecker(2, chunks=2)), self.compile(data))
+
+    # Errors of a program, collected by the check.
+    def diagnostics(self, data, checker=None):
+        program = self.parse(data)
+        if checker is None:
+            checker = Semantic(self.parser, recover=True)
+            checker.visit(program)
+        else:
+            checker.check(program)
+        return list(map(str, checker.diagnostics))
+
+    def test_recover(self):
+        checker = ParallelChecker(0, recover=True)
+        for filename in self.inputs:
+            with open(filename, 'r') as content_file:
+                data = content_file.read()
+            if self.parse(data) is None:
+                continue
+            self.assertEqual(self.diagnostics(data, checker), self.diagnostics(data), filename)
+
+        data = ("int f(int a) { return a + 1.0; }\nfloat g;\nint g;\n"
+                "int h(int a) { return b; }\nint main() { return f(1) + h(2.0); }")
+        self.assertEqual(len(self.diagnostics(data, ParallelChecker(2, recover=True))), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from uCSemantic import ScopeChain
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestScopes(unittest.TestCase):
+    ''' Scope chain: bindings per name, undone by scope. '''
+
+    def test_shadowing(self):
+        chain = ScopeChain()
+        chain.push()
+        chain.add('x', 'global x')
+        chain.add('g', 'global g')
+        chain.push()
+        chain.add('x', 'local x')
+        self.assertEqual(chain.lookup('x'), 'local x')
+        self.assertEqual(chain.lookup('g'), 'global g')
+        self.assertEqual(chain.get('x', 0), 'global x')
+        self.assertIsNone(chain.get('g'))
+
+        # Popping a scope only undoes its own bindings.
+        chain.pop()
+        self.assertEqual(chain.lookup('x'), 'global x')
+        chain.pop()
+        self.assertIsNone(chain.lookup('x'))
+        self.assertEqual(chain.bindings, {})
+
+    def test_outer(self):
+        chain = ScopeChain()
+        for _ in range(3):
+            chain.push()
+        chain.add('f', 'local f')
+        chain.add('f', 'global f', 0)
+        chain.add('f', 'local f again')
+        self.assertEqual(chain.lookup('f'), 'local f again')
+        self.assertEqual(chain.names(0), ['f'])
+        self.assertIsNone(chain.get('f', 1))
+
+        chain.remove('f')
+        self.assertEqual(chain.lookup('f'), 'global f')
+        self.assertEqual(chain.names(2), [])
+        chain.pop()
+        chain.pop()
+        self.assertEqual(chain.lookup('f'), 'global f')
+
+if __name__ == '__main__':
+    unittest.main()
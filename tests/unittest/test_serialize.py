@@ -0,0 +1,87 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCSemantic import uCSemanticCheck as Semantic
+import uCSerialize
+import uCType
+import uCAST
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestSerialize(FrontEndTest):
+    ''' Binary serialization of the AST, before and after the semantic check. '''
+
+    def test_round_trip(self):
+        for filename in self.inputs:
+            ast = self.parse_file(filename)
+            if ast is None:
+                continue
+            data = uCSerialize.dumps(ast)
+            for lazy in (False, True):
+                result = uCSerialize.loads(data, lazy)
+                self.assertEqual(self.show(result), self.show(ast), filename)
+                self.assertEqual(uCSerialize.dumps(result), data, filename)
+
+    def test_checked(self):
+        program = self.parse_file(os.path.join(workdir, 'tests', 'complete_codes', 'bubble.uc'))
+        Semantic(self.parser).visit(program)
+        result = uCSerialize.loads(uCSerialize.dumps(program), lazy=False)
+        self.assertEqual(self.show(result), self.show(program))
+
+        # Shared nodes stay shared, types are the uCType singletons and the
+        # canonical types of the Type nodes are interned again.
+        types, ctypes, stack = [], [], [result]
+        while stack:
+            node = stack.pop()
+            stack.extend(child for _, child in node.children())
+            if isinstance(node, uCAST.BinaryOp):
+                self.assertIs(node.coord, node.lvalue.coord)
+            if isinstance(getattr(node, 'type', None), uCAST.Type):
+                types.extend(t for t in node.type.name if not isinstance(t, str))
+                ctypes.append(node.type.ctype)
+        self.assertTrue(types)
+        self.assertTrue(any(t is uCType.array_of(uCType.int_type, 100) for t in ctypes))
+        self.assertTrue(all(t in vars(uCType).values() for t in types))
+
+    def test_deep(self):
+        # Deeper than the recursion limit: no recursion in dumps and loads.
+        depth = 3 * sys.getrecursionlimit()
+        lines = '\n'.join('    x = x + 1;' for _ in range(3))
+        ast = self.parse('int main() {\n' + '{' * depth + lines + '}' * depth + '\n}\n')
+        self.assertIsNotNone(ast)
+        data = uCSerialize.dumps(ast)
+        for lazy in (False, True):
+            result = uCSerialize.loads(data, lazy)
+            self.assertEqual(uCSerialize.dumps(result), data)
+
+    def test_lazy(self):
+        ast = self.parse_file(os.path.join(workdir, 'tests', 'complete_codes', 'armstrong.uc'))
+        result = uCSerialize.loads(uCSerialize.dumps(ast))
+        funcs = [node for node in result.gdecls if isinstance(node, uCAST.FuncDef)]
+        self.assertTrue(funcs)
+        self.assertTrue(all(type(func) is not uCAST.FuncDef for func in funcs))
+        self.assertTrue(funcs[0].show_node().startswith('FuncDef: '))
+
+        # A plain FuncDef once its body is loaded.
+        body = funcs[0].body
+        self.assertIs(type(funcs[0]), uCAST.FuncDef)
+        self.assertIs(funcs[0].body, body)
+        self.assertTrue(all(type(func) is not uCAST.FuncDef for func in funcs[1:]))
+
+        # Visited as a FuncDef before.
+        class Names(uCAST.NodeVisitor):
+            def __init__(self):
+                self.names = []
+            def visit_FuncDef(self, node):
+                self.names.append(node.decl.name.name)
+        names = Names()
+        names.visit(result)
+        self.assertEqual(names.names, [func.decl.name.name for func in funcs])
+        self.assertEqual(self.show(result), self.show(ast))
+
+if __name__ == '__main__':
+    unittest.main()
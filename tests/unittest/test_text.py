@@ -0,0 +1,83 @@
+import sys, os, unittest, re, tempfile
+from io import StringIO
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCText import parse, parse_line, read
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestText(FrontEndTest):
+    ''' uCIR read back from its text form (.ir files). '''
+
+    def test_inputs(self):
+        fd, filename = tempfile.mkstemp(suffix='.ir')
+        os.close(fd)
+        read_back = 0
+        try:
+            for source in self.inputs:
+                with open(source, 'r') as content_file:
+                    data = content_file.read()
+                try:
+                    gen = self.generate(data)
+                except Exception:
+                    continue
+                gen.write_file(gen.code, filename)
+                self.assertEqual(read(filename), gen.code, source)
+                read_back += 1
+        finally:
+            os.remove(filename)
+        self.assertGreater(read_back, 0)
+
+    def test_char_arrays(self):
+        # A string that looks like a list stays a string.
+        gen = self.generate('char s[] = "[1, 2]";\nchar t[2] = {\'[\', \'1\'};\n'
+                            'int main() { print(s); return 0; }')
+        text = ''.join(gen.format_instruction(inst) + '\n' for inst in gen.code)
+        self.assertEqual(list(parse(StringIO(text))), gen.code)
+        self.assertEqual(gen.code[0][2], '[1, 2]')
+
+    def test_lines(self):
+        lines = ["global_string @.str.0 'x, y: '",
+                 "global_char_8 @s hi there ",
+                 "global_char_6 @b [1, 2] ",
+                 "global_char_2_1 @l [[\"'a'\"], [\"'['\"]] ",
+                 "global_char @c 'a' ",
+                 "global_float_2_2 @m [[1.5, 2.0], [0.5, 3.0]] ",
+                 "global_int @n ",
+                 "",
+                 "define_int @f int %1, float_* %2",
+                 "entry:",
+                 "  alloc_int %x ",
+                 "  literal_char ' ' %3 ",
+                 "  literal_float -2.5 %4 ",
+                 "  cbranch %5 label %6 label %7",
+                 "6:",
+                 "  jump label %7",
+                 "  print_void",
+                 "  return_int %3"]
+        self.assertEqual(list(parse(line + '\n' for line in lines)),
+                         [('global_string', '@.str.0', 'x, y: '),
+                          ('global_char_8', '@s', 'hi there'),
+                          ('global_char_6', '@b', '[1, 2]'),
+                          ('global_char_2_1', '@l', [["'a'"], ["'['"]]),
+                          ('global_char', '@c', "'a'"),
+                          ('global_float_2_2', '@m', [[1.5, 2.0], [0.5, 3.0]]),
+                          ('global_int', '@n'),
+                          ('define_int', '@f', [('int', '%1'), ('float_*', '%2')]),
+                          ('alloc_int', '%x'),
+                          ('literal_char', "' '", '%3'),
+                          ('literal_float', -2.5, '%4'),
+                          ('cbranch', '%5', '%6', '%7'),
+                          ('6',),
+                          ('jump', '%7'),
+                          ('print_void',),
+                          ('return_int', '%3')])
+        self.assertEqual(parse_line("define_void @main "), ('define_void', '@main', []))
+        self.assertEqual(parse_line("  return_void"), ('return_void',))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import sys, os, unittest, re, pickle
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCGenerate import uCIRGenerator as Generator
+import uCType
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestTypes(FrontEndTest):
+    ''' Interned types: derived types are single instances. '''
+
+    def test_interned(self):
+        int_ptrs = uCType.array_of(uCType.pointer_to(uCType.int_type), 10)
+        self.assertIs(int_ptrs, uCType.array_of(uCType.pointer_to(uCType.int_type), 10))
+        self.assertIsNot(int_ptrs, uCType.array_of(uCType.pointer_to(uCType.int_type)))
+        self.assertIs(uCType.canonical([uCType.arr_type, uCType.ptr_type, uCType.int_type], [10]), int_ptrs)
+        self.assertIs(uCType.canonical([uCType.float_type]), uCType.float_type)
+        self.assertIsNone(uCType.canonical(['int']))
+        self.assertEqual((int_ptrs.ir, str(int_ptrs)), ('int_10_*', 'type(int*[10])'))
+        self.assertEqual(int_ptrs.un_ops, uCType.arr_type.un_ops)
+        self.assertIs(pickle.loads(pickle.dumps(int_ptrs)), int_ptrs)
+
+        func = uCType.function_of(uCType.void_type, [int_ptrs, uCType.char_type])
+        self.assertIs(func, uCType.function_of(uCType.void_type, (int_ptrs, uCType.char_type)))
+        self.assertEqual(str(func), 'type(void(int*[10], char))')
+
+        # Only the types in use are kept.
+        count = len(uCType._derived)
+        uCType.pointer_to(uCType.array_of(uCType.char_type, 12345))
+        self.assertEqual(len(uCType._derived), count)
+
+    def test_checked(self):
+        program, sema = self.check("int v[2][3];\nint f(int a, float b);\n"
+                                   "int f(int a, float b) { return a; }\n"
+                                   "int main() { float x = 1.0; return f(1, x); }")
+        decl = program.gdecls[0].decls[0]
+        self.assertIs(Generator(sema).build_decl_ctype(decl.type),
+                      uCType.array_of(uCType.array_of(uCType.int_type, 3), 2))
+        self.assertEqual(Generator(sema).build_decl_types(decl.type), 'int_2_3')
+        # Set once, by the check, with the dimensions of the declaration.
+        self.assertIs(decl.type.type.type.type.ctype, uCType.array_of(uCType.array_of(uCType.int_type, 3), 2))
+        call = program.gdecls[3].body.stats[0].expr
+        self.assertEqual([arg.type.ctype for arg in call.args.exprs], [uCType.int_type, uCType.float_type])
+
+    def test_signatures(self):
+        errors = [("int f(int a);\nint f(float a) { return 1; }", "incorrect parameter types"),
+                  ("int f(int a);\nfloat f(int a) { return 1.0; }", "different return types"),
+                  ("int f(int a);\nint f(int a, int b) { return 1; }", "exceding/missing arguments"),
+                  ("int f(int a) { return a; }\nint main() { return f(1.0); }", "Incorrect arguments")]
+        for data, error in errors:
+            with self.assertRaises(AssertionError) as cm:
+                self.check(data)
+            self.assertIn(error, str(cm.exception))
+
+if __name__ == '__main__':
+    unittest.main()
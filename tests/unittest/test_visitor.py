@@ -0,0 +1,95 @@
+import sys, os, unittest, re
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+import uCAST as ast
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class Counter(ast.NodeVisitor):
+    ''' Counts the nodes (generic_visit) and adds the constants of binary operations. '''
+
+    def __init__(self):
+        self.nodes = 0
+        self.sums = []
+
+    def generic_visit(self, node):
+        self.nodes += 1
+        yield from ast.NodeVisitor.generic_visit(self, node)
+
+    def visit_Constant(self, node):
+        self.nodes += 1
+        return int(node.value)
+
+    def visit_BinaryOp(self, node):
+        self.nodes += 1
+        left = yield node.lvalue
+        right = yield node.rvalue
+        self.sums.append((left, right))
+
+class Tracer(Counter):
+    ''' Records the order of the pre_visit and post_visit hooks. '''
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def pre_visit(self, node):
+        self.events.append('+' + node.__class__.__name__)
+
+    def post_visit(self, node):
+        self.events.append('-' + node.__class__.__name__)
+
+class TestVisitor(FrontEndTest):
+    ''' Traversals of trees deeper than the recursion limit. '''
+
+    depth = 2 * sys.getrecursionlimit()
+
+    def test_deep(self):
+        programs = [f"int main() {{ int x = 1; x = x{' + x' * self.depth}; return x; }}",
+                    f"int main() {{ int x = 0; {' else '.join(f'if (x == {i}) x = {i};' for i in range(self.depth))} return x; }}"]
+        for data in programs:
+            self.assertTrue(self.generate(data).code)
+
+    def test_show(self):
+        program = self.parse(f"int main() {{ return 1{' + 1' * self.depth}; }}")
+        lines = self.show(program).splitlines()
+        self.assertEqual(len(lines), 2 * self.depth + 10)
+        self.assertEqual(lines[self.depth + 9], ' ' * (4 * (self.depth + 4)) + 'Constant: int, 1   @ 1:21')
+
+    def test_values(self):
+        program = self.parse("int main() { return 1 + 2 * 3; }")
+        counter = Counter()
+        counter.visit(program)
+        self.assertEqual(counter.nodes, 14)
+        # Visits that yield children return nothing.
+        self.assertEqual(counter.sums, [(2, 3), (1, None)])
+
+    def test_hooks(self):
+        program = self.parse("int main() { return 1 + 2 * 3; }")
+        tracer = Tracer()
+        tracer.visit(program.gdecls[0].body)
+        self.assertEqual(tracer.events, ['+Compound', '+Return', '+BinaryOp', '+Constant', '-Constant',
+                                         '+BinaryOp', '+Constant', '-Constant', '+Constant', '-Constant',
+                                         '-BinaryOp', '-BinaryOp', '-Return', '-Compound'])
+        # Values still reach the visits that yield children.
+        self.assertEqual(tracer.sums, [(2, 3), (1, None)])
+
+    def test_dispatch(self):
+        # Tables are built once per visitor class, keyed by node class.
+        self.assertIs(Counter._dispatch[ast.BinaryOp], Counter.visit_BinaryOp)
+        self.assertIs(Counter._dispatch[ast.While], Counter.generic_visit)
+        self.assertIsNot(Tracer._dispatch, Counter._dispatch)
+
+        # Node classes defined later are visited as their namesake.
+        class Constant(ast.Constant):
+            __slots__ = ()
+        counter = Counter()
+        self.assertEqual(counter.visit(Constant('int', '7')), 7)
+        self.assertIn(Constant, Counter._dispatch)
+
+if __name__ == '__main__':
+    unittest.main()
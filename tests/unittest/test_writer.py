@@ -0,0 +1,51 @@
+import sys, os, unittest, re, tempfile
+from io import StringIO
+
+workdir = os.path.dirname(os.path.abspath(__file__))
+workdir = re.sub('.tests.unittest$', '', workdir)
+sys.path.append(workdir)
+
+from helpers import FrontEndTest
+from uCSemantic import uCSemanticCheck as Semantic
+import uCAST as ast
+
+print('\n', f'Working Directory: {workdir}','\n')
+
+class TestWriter(FrontEndTest):
+    ''' Streaming AST dump (NodeWriter), vs the lines of show_node. '''
+
+    # The dump, line by line.
+    def expected(self, program, offset, flags, name=None):
+        lines = []
+        ast.walk(program, lambda node, name, depth: lines.append(
+            node.show_node(offset + 4 * depth, *flags, name)), name=name)
+        return ''.join(lines)
+
+    def test_lines(self):
+        flags = [(False, False, True), (True, True, True), (False, True, False)]
+        for filename in self.inputs:
+            program = self.parse_file(filename)
+            if program is None:
+                continue
+            for checked in (False, True):
+                if checked:
+                    try:
+                        Semantic(self.parser).visit(program)
+                    except AssertionError:
+                        break
+                for attrnames, nodenames, showcoord in flags:
+                    buf = StringIO()
+                    ast.NodeWriter(buf, attrnames, nodenames, showcoord, chunk=256).write(program, 2, 'root')
+                    self.assertEqual(buf.getvalue(), self.expected(program, 2, (attrnames, nodenames, showcoord), 'root'), filename)
+
+    def test_fd(self):
+        program = self.parse_file(os.path.join(workdir, 'tests', 'complete_codes', 'bubble.uc'))
+        buf = StringIO()
+        program.show(buf=buf)
+        with tempfile.TemporaryFile() as file:
+            ast.NodeWriter(file.fileno(), chunk=100).write(program)
+            file.seek(0)
+            self.assertEqual(file.read().decode(), buf.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
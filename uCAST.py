@@ -12,7 +12,9 @@ University of Campinas - UNICAMP - 2020
 Last Modified: 02/05/2020.
 '''
 
+import os
 import sys
+from types import GeneratorType
 
 def _repr(obj):
     """
@@ -32,7 +34,8 @@ class Node(object):
     def __repr__(self):
         """ Generates a python representation of the current node
         """
-        result = self.__class__.__name__ + '('
+        class_name = node_name(self.__class__)
+        result = class_name + '('
         indent = ''
         separator = ''
         for name in self.__slots__[:-1]:
@@ -41,9 +44,9 @@ class Node(object):
             if skips: continue
             result += separator
             result += indent
-            result += name + '=' + (_repr(getattr(self, name)).replace('\n', '\n  ' + (' ' * (len(name) + len(self.__class__.__name__)))))
+            result += name + '=' + (_repr(getattr(self, name)).replace('\n', '\n  ' + (' ' * (len(name) + len(class_name)))))
             separator = ','
-            indent = ' ' * len(self.__class__.__name__)
+            indent = ' ' * len(class_name)
         result += indent + ')'
         return result
 
@@ -61,11 +64,15 @@ class Node(object):
             showcoord:
                 Do you want the coordinates of each Node to be displayed.
         """
+        NodeWriter(buf, attrnames, nodenames, showcoord).write(self, offset, _my_node_name)
+
+    def show_node(self, offset=0, attrnames=False, nodenames=False, showcoord=True, _my_node_name=None):
+        """ Returns the line of this Node (without its children), as printed by show. """
         lead = ' ' * offset
         if nodenames and _my_node_name is not None:
-            buf.write(lead + self.__class__.__name__+ ' <' + _my_node_name + '>: ')
+            line = lead + node_name(self.__class__) + ' <' + _my_node_name + '>: '
         else:
-            buf.write(lead + self.__class__.__name__+ ': ')
+            line = lead + node_name(self.__class__) + ': '
 
         if self.attr_names:
             if attrnames:
@@ -77,18 +84,177 @@ class Node(object):
                     for i,e in enumerate(vlist):
                         if isinstance(e, Type):
                             vlist[i] = e.name[0]
-                attrstr = ', '.join('%s' % v for v in vlist)
-                buf.write(attrstr)
+                attrstr = ', '.join(['%s' % v for v in vlist])
+                line += attrstr
 
         if showcoord:
-            if self.coord : buf.write('%s' % self.coord)
-        buf.write('\n')
-
-        for (child_name, child) in self.children():
-            child.show(buf, offset + 4, attrnames, nodenames, showcoord, child_name)
+            if self.coord : line += '%s' % self.coord
+        return line + '\n'
             
     attr_names = () 
 
+def walk(node, pre=None, post=None, name=None):
+    """ Depth-first traversal of the tree of node, with an explicit stack
+        (no recursion, whatever the depth of the tree).
+            pre(node, name, depth):
+                Called before the children of node. If it returns False,
+                they are skipped.
+            post(node, name, depth):
+                Called after the children of node.
+        name is the child name of node in its parent (see children()).
+    """
+    if post is None: # Only pre-order: nothing to do after the children
+        stack = [(node, name, 0)]
+        push, pop = stack.extend, stack.pop
+        while stack:
+            node, name, depth = pop()
+            if pre(node, name, depth) is not False:
+                children = node.children()
+                if children:
+                    depth += 1
+                    push([(child, name, depth) for name, child in reversed(children)])
+        return
+
+    stack = [(node, name, 0, False)]
+    while stack:
+        node, name, depth, done = stack.pop()
+        if done:
+            post(node, name, depth)
+            continue
+        if pre is not None and pre(node, name, depth) is False:
+            continue
+        stack.append((node, name, depth, True))
+        children = node.children()
+        if children:
+            depth += 1
+            stack.extend([(child, name, depth, False) for name, child in reversed(children)])
+
+class NodeWriter(object):
+    """ Streaming printer of trees, in the format of Node.show (one line per
+        node, as show_node). The tree is walked with an explicit stack, and
+        its lines are joined and written in chunks of about chunk characters.
+        The lead, name and attribute format of each node class is computed
+        only once.
+            out:
+                Open text file, or file descriptor (written in UTF-8).
+    """
+    def __init__(self, out, attrnames=False, nodenames=False, showcoord=True, chunk=1 << 16):
+        if isinstance(out, int):
+            self.flush = lambda text: self._write_fd(out, text.encode())
+        else:
+            self.flush = out.write
+        self.attrnames = attrnames
+        self.nodenames = nodenames
+        self.showcoord = showcoord
+        self.chunk = chunk
+        self.formats = {}
+
+    @staticmethod
+    def _write_fd(fd, data):
+        data = memoryview(data)
+        while data:
+            data = data[os.write(fd, data):]
+
+    # Returns (class name and separator, class name and name opening,
+    # attribute formatter or None) of cls.
+    def _format(self, cls):
+        names = cls.attr_names
+        if not names or self.attrnames: # show_node doesn't print them with their names
+            attrs = None
+        elif len(names) == 1:
+            # Most nodes have a single attribute: no list to join.
+            name = names[0]
+            def attrs(node):
+                value = getattr(node, name)
+                return value if type(value) is str else '%s' % value
+        else:
+            constant = issubclass(cls, Constant)
+            attrs = lambda node: NodeWriter._attrs(node, names, constant)
+        class_name = node_name(cls)
+        form = self.formats[cls] = (class_name + ': ', class_name + ' <', attrs)
+        return form
+
+    # Formats the attributes of node, as show_node.
+    @staticmethod
+    def _attrs(node, names, constant):
+        vlist = [getattr(node, n) for n in names]
+        if constant:
+            for i, e in enumerate(vlist):
+                if isinstance(e, Type):
+                    vlist[i] = e.name[0]
+        return ', '.join([v if type(v) is str else '%s' % v for v in vlist])
+
+    # Writes the tree of node, its first line indented by offset spaces.
+    def write(self, node, offset=0, name=None):
+        formats, indents = self.formats, []
+        nodenames, showcoord, chunk, flush = self.nodenames, self.showcoord, self.chunk, self.flush
+        coords = (Coord, PackedCoord)
+        lines, size = [], 0
+        emit = lines.append
+
+        stack = [(node, name, 0)]
+        push, pop = stack.extend, stack.pop
+        while stack:
+            node, name, depth = pop()
+            cls = node.__class__
+            form = formats.get(cls) or self._format(cls)
+            while len(indents) <= depth:
+                indents.append(' ' * (offset + 4 * len(indents)))
+
+            if nodenames and name is not None:
+                line = indents[depth] + form[1] + name + '>: '
+            else:
+                line = indents[depth] + form[0]
+            if form[2] is not None:
+                line += form[2](node)
+            if showcoord:
+                coord = node.coord
+                if coord:
+                    if type(coord) in coords:
+                        if coord.line:
+                            line += f"   @ {coord.line}:{coord.column}"
+                    else:
+                        line += '%s' % coord
+            line += '\n'
+            emit(line)
+            size += len(line)
+            if size >= chunk:
+                flush(''.join(lines))
+                lines.clear()
+                size = 0
+
+            children = node.children()
+            if children:
+                depth += 1
+                push([(child, name, depth) for name, child in reversed(children)])
+        flush(''.join(lines))
+
+def declared_names(node):
+    """ Names declared by a top-level declaration (FuncDef or GlobalDecl). """
+    decls = [node.decl] if isinstance(node, FuncDef) else node.decls
+    return [decl.name.name for decl in decls]
+
+# Node classes standing for another one, by class (see register_alias).
+_aliases = {}
+
+def register_alias(node_class, as_class):
+    """ Handles the nodes of node_class as nodes of as_class: the visitors
+        run their visit_XXX, and show() prints its name. For node classes
+        defined outside of this module, e.g. uCSerialize's lazy FuncDef.
+    """
+    _aliases[node_class] = as_class
+
+def node_name(node_class):
+    """ Name of a node class, as visited and printed. """
+    return _aliases.get(node_class, node_class).__name__
+
+_done = object() # End of a visit, for NodeVisitor.visit
+
+def _then(visit, post, visitor, node):
+    """ Runs a visit that yields children, then the post_visit hook. """
+    yield from visit
+    post(visitor, node)
+
 class NodeVisitor(object):
     """ A base NodeVisitor class for visiting uc_ast nodes.
         Subclass it and define your own visit_XXX methods, where
@@ -110,6 +276,24 @@ class NodeVisitor(object):
         cv = ConstantVisitor()
         cv.visit(node)
 
+        To visit a child, a visit_XXX method yields it: it is resumed
+        when the child was visited, with the value returned for it.
+        A visit_XXX that yields children doesn't return a value.
+
+            def visit_BinaryOp(self, node):
+                left = yield node.lvalue
+                right = yield node.rvalue
+                node.value = left + right
+
+        The visits are run from an explicit stack, so deep trees (long
+        else if chains, nested expressions) don't hit the recursion
+        limit. Calling self.visit(child) also works, but recurses.
+
+        The visit_XXX of each node class is found once per visitor
+        class, in a table keyed by the node class. A visitor may also
+        define pre_visit(node) and post_visit(node), called before and
+        after the visit of any node (post_visit after its children).
+
         Notes:
 
         *   generic_visit() will be called for AST nodes for which
@@ -118,33 +302,104 @@ class NodeVisitor(object):
             defined will not be visited - if you need this, call
             generic_visit() on the node.
             You can use:
-                NodeVisitor.generic_visit(self, node)
+                yield from NodeVisitor.generic_visit(self, node)
         *   Modeled after Python's own AST visiting facilities
             (the ast module of Python 3.0)
     """
 
-    _method_cache = None
+    # Visiting function of each node class, built once per subclass.
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+        stack = [Node]
+        while stack:
+            node_class = stack.pop()
+            stack.extend(node_class.__subclasses__())
+            cls._dispatch[node_class] = cls._compile(node_class)
+
+    @classmethod
+    def _compile(cls, node_class):
+        """ Function visiting the nodes of node_class: visit_XXX (or
+            generic_visit), fused with the pre_visit and post_visit hooks
+            if the class defines them.
+        """
+        visit = getattr(cls, 'visit_' + node_name(node_class), cls.generic_visit)
+        pre = getattr(cls, 'pre_visit', None)
+        post = getattr(cls, 'post_visit', None)
+        if pre is None and post is None:
+            return visit
+
+        def fused(self, node):
+            if pre is not None:
+                pre(self, node)
+            result = visit(self, node)
+            if post is None:
+                return result
+            if type(result) is GeneratorType:
+                return _then(result, post, self, node)
+            post(self, node)
+            return result
+        return fused
 
     def visit(self, node):
         """ Visit a node.  """
-
-        if self._method_cache is None:
-            self._method_cache = {}
-
-        visitor = self._method_cache.get(node.__class__.__name__, None)
-        if visitor is None:
-            method = 'visit_' + node.__class__.__name__
-            visitor = getattr(self, method, self.generic_visit)
-            self._method_cache[node.__class__.__name__] = visitor
-
-        return visitor(node)
+        dispatch = type(self)._dispatch
+        method = dispatch.get(node.__class__) or self._resolve(node.__class__)
+        result = method(self, node)
+        if type(result) is not GeneratorType:
+            return result
+
+        # Visits in progress: each one waits for the child it yielded.
+        # (next() with a default is much faster than send(), which
+        # raises StopIteration at the end of each visit.)
+        done, generator = _done, GeneratorType
+        stack = []
+        push, pop = stack.append, stack.pop
+        visit = result
+        value = None
+        while True:
+            if value is None:
+                child = next(visit, done)
+            else:
+                try:
+                    child = visit.send(value)
+                except StopIteration:
+                    child = done
+            if child is done:
+                if not stack:
+                    return None
+                visit = pop()
+                value = None
+                continue
+            method = dispatch.get(child.__class__)
+            if method is None:
+                method = self._resolve(child.__class__)
+            value = method(self, child)
+            if type(value) is generator:
+                push(visit)
+                visit = value
+                value = None
+
+    def _resolve(self, node_class):
+        """ Adds a node class missing from the dispatch table (defined
+            after the visitor, e.g. uCSerialize's lazy FuncDef). It is
+            visited as the node class it stands for (see register_alias).
+        """
+        cls = type(self)
+        if '_dispatch' not in cls.__dict__: # NodeVisitor itself
+            cls._dispatch = {}
+        method = cls._compile(node_class)
+        cls._dispatch[node_class] = method
+        return method
 
     def generic_visit(self, node):
         """ Called if no explicit visitor function exists for a
             node. Implements preorder visiting of the node.
         """
-        for c in node:
-            self.visit(c)
+        for _, child in node.children():
+            yield child
 
 # Tree's root - Represents the program
 class Program(Node):
@@ -320,6 +575,35 @@ class Coord(Node):
             coord_str = ""
         return coord_str 
         
+class PackedCoord(int):
+    """ Coordinates packed in a single integer, for the compact AST (see
+        uCParser): line << 12 | column + 1 (0 if no column), which fits the
+        smallest int up to line 262143. Reads as a Coord, but is immutable.
+        Columns too wide to be packed give a plain Coord instead.
+    """
+    __slots__ = ()
+
+    def __new__(cls, line, column=None):
+        column = 0 if column is None else column + 1
+        if column > 0xFFF:
+            return Coord(line, column - 1)
+        return int.__new__(cls, line << 12 | column)
+
+    @property
+    def line(self):
+        return self >> 12
+
+    @property
+    def column(self):
+        column = self & 0xFFF
+        return column - 1 if column else None
+
+    def __str__(self):
+        return Coord.__str__(self)
+
+    def __repr__(self):
+        return 'Coord(line=%r, column=%r)' % (self.line, self.column)
+
 class Decl(Node):
     __slots__ = ('name', 'type', 'init', 'gen_location', 'coord')
 
@@ -560,11 +844,14 @@ class Return(Node):
         return tuple(children)
 
 class Type(Node):
-    __slots__ = ('name', 'coord')
+    __slots__ = ('name', 'ctype', 'coord')
     
     def __init__(self, name, coord=None):
         self.name = name
         self.coord = coord
+        # Semantic Only: canonical (interned) uCType, dimensions included,
+        # so types compare by identity.
+        self.ctype = None
         
     attr_names = ('name',)
 
@@ -0,0 +1,126 @@
+'''
+Front end: Batch checking of many translation units in a process pool.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import sys
+import argparse
+from io import StringIO
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from uCLexer import uCLexer
+from uCParser import uCParser
+from uCDescent import uCDescentParser
+from uCSemantic import uCSemanticCheck
+import uCSerialize
+
+class uCUnit():
+    '''Result of the front end for one source file, as sent back by a worker.
+    The AST is kept serialized (see uCSerialize) until it is needed, so
+    collecting the results of thousands of files doesn't rebuild thousands
+    of trees.
+    Atributes:
+        - filename: path of the source file
+        - errors: diagnostics (lexer, parser and semantic), in order
+        - data: serialized AST, after the semantic check (None if there were errors)
+    '''
+    __slots__ = ('filename', 'errors', 'data')
+
+    def __init__(self, filename, errors, data):
+        self.filename = filename
+        self.errors = errors
+        self.data = data
+
+    # Rebuilds the checked AST (None if there were errors). Function bodies
+    # are decoded when first accessed.
+    def ast(self):
+        return uCSerialize.loads(self.data) if self.data is not None else None
+
+# Front end of the current (worker) process: built once, by _build.
+_lexer = _parser = None
+_errors = []
+
+# Builds the lexer and the parser of a worker (parser: 'ply' or 'descent').
+def _build(parser):
+    global _lexer, _parser
+    _lexer = uCLexer(lambda msg, line, column: _errors.append(f"{line}:{column}: {msg}"))
+    _lexer.build()
+    _parser = (uCDescentParser if parser == 'descent' else uCParser)(_lexer)
+    _parser.build()
+
+# Lexes, parses and checks a source file, as Compiler._parse and _sema do.
+def _check(filename):
+    _errors.clear()
+    try:
+        with open(filename, 'r') as source:
+            code = source.read()
+    except OSError as e:
+        return uCUnit(filename, [str(e)], None)
+
+    # A program too deeply nested for the front end is an error of its
+    # file, not of the whole batch.
+    try:
+        messages = StringIO() # Syntax errors are printed by the parser
+        with redirect_stdout(messages):
+            _lexer.reset_line_num()
+            ast = _parser.parse(code, False)
+        _errors.extend(messages.getvalue().splitlines())
+
+        if not _errors and ast is not None:
+            sema = uCSemanticCheck(_parser, recover=True)
+            sema.visit(ast)
+            _errors.extend(map(str, sema.diagnostics))
+        data = None if _errors else uCSerialize.dumps(ast)
+    except RecursionError:
+        _errors.append("program nested too deeply")
+        data = None
+    return uCUnit(filename, list(_errors), data)
+
+class uCBatchFrontEnd():
+    '''Runs the front end (lexer, parser and semantic check) over many
+    independent source files, spread across a pool of worker processes.
+    Each worker builds its lexer and parser once, and files are sent to
+    it in chunks, so the cost per file is only the front end itself.
+    Atributes:
+        - workers: number of worker processes (None: one per CPU; 0: no pool)
+        - parser: parser backend, 'ply' or 'descent'
+        - chunksize: number of files sent to a worker at a time
+    '''
+
+    def __init__(self, workers=None, parser='ply', chunksize=16):
+        self.workers = workers
+        self.parser = parser
+        self.chunksize = chunksize
+
+    # Checks the files, yielding their uCUnit results in the same order.
+    def check(self, filenames):
+        if self.workers == 0: # Serial, in this process
+            _build(self.parser)
+            yield from map(_check, filenames)
+            return
+        with ProcessPoolExecutor(self.workers, initializer=_build, initargs=(self.parser,)) as pool:
+            yield from pool.map(_check, filenames, chunksize=self.chunksize)
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filenames", nargs='+')
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("-r", "--parser", choices=['ply', 'descent'], default='ply',
+                        help="parser backend: PLY (LALR) or recursive descent")
+    args = parser.parse_args()
+
+    failed = 0
+    for unit in uCBatchFrontEnd(args.jobs, args.parser).check(args.filenames):
+        for msg in unit.errors:
+            sys.stderr.write(f"{unit.filename}: {msg}\n")
+        failed += bool(unit.errors)
+    sys.stderr.write(f"{len(args.filenames)} file(s) checked, {failed} with errors.\n")
+    sys.exit(1 if failed else 0)
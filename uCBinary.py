@@ -0,0 +1,306 @@
+'''
+Second Project (extra): Binary uCIR files, loaded by memory mapping.
+
+The uCIR is saved numbered (see uCIR.number), in little-endian sections:
+    header:    magic, version and the (offset, count) of each section
+    strings:   offsets of the strings in the blob (count + 1 of them)
+    blob:      the strings (opcodes, names, types & constants), in UTF-8
+    symbols:   string of each global, by symbol index
+    kinds:     (opcode string, number of operands) of the instructions
+    constants: (tag, value) records of 16 bytes: integers, floats, strings
+               and lists (the index of their first element and its size;
+               the elements are consecutive records)
+    functions: (symbol, first instruction, first register name, number of
+               registers, first parameter, number of parameters)
+    names:     string of each register, function after function
+    params:    (type string, register) of the parameters
+    code:      (kind, operand, operand, operand) records, the operands as
+               numbered (a literal's value and a global's initializer are
+               constants, and a define's parameters are its function's)
+The integer sections are used in place, as views of the mapped file, and
+the strings are only decoded when they are needed.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import gc
+import sys
+import mmap
+import struct
+from array import array
+from uCIR import Op, NumberedIR, decode, number
+
+MAGIC = b'uCIR'
+VERSION = 1
+
+SECTIONS = ('strings', 'blob', 'symbols', 'kinds', 'constants', 'functions', 'names',
+            'params', 'code')
+
+# Integers per record of the integer sections.
+_WIDTH = {'strings': 1, 'symbols': 1, 'kinds': 2, 'functions': 6, 'names': 1, 'params': 2,
+          'code': 4}
+
+_HEADER = struct.Struct('<4sI' + 'II' * len(SECTIONS))
+_CONSTANT = struct.Struct('<i4x8s')
+
+# Tags of the constants.
+NONE, INT, FLOAT, STRING, LIST, BOOL = range(6)
+
+# Integers in the byte order of the file (little-endian).
+def _pack(ints):
+    data = array('i', ints)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+class _Writer():
+    '''
+    Builds the sections of a binary uCIR (see dump).
+    Atributes:
+        - strings: index of each string in the pool
+        - kinds: index of each instruction kind (opcode, operands)
+        - sections: contents of the sections, as integers (or bytes)
+    '''
+    def __init__(self):
+        self.strings = dict()
+        self.sections = {name: [] for name in SECTIONS}
+        self.kinds = dict()
+
+    # Index of a string in the pool.
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    # Index of an instruction kind (opcode and number of operands).
+    def kind(self, opcode, size):
+        index = self.kinds.get((opcode, size))
+        if index is None:
+            index = self.kinds[(opcode, size)] = len(self.kinds)
+            self.sections['kinds'] += [self.string(opcode), size]
+        return index
+
+    # Index of a constant in the pool (a list's elements follow it).
+    def constant(self, value):
+        constants = self.sections['constants']
+        index = len(constants)
+        constants.append(None)
+        constants[index] = self.record(value)
+        return index
+
+    def record(self, value):
+        constants = self.sections['constants']
+        if value is None:
+            return _CONSTANT.pack(NONE, bytes(8))
+        elif isinstance(value, bool):
+            return _CONSTANT.pack(BOOL, struct.pack('<q', value))
+        elif isinstance(value, int):
+            return _CONSTANT.pack(INT, struct.pack('<q', value))
+        elif isinstance(value, float):
+            return _CONSTANT.pack(FLOAT, struct.pack('<d', value))
+        elif isinstance(value, str):
+            return _CONSTANT.pack(STRING, struct.pack('<q', self.string(value)))
+        elif isinstance(value, list):
+            first = len(constants)
+            constants.extend([None] * len(value))
+            for i, item in enumerate(value):
+                constants[first + i] = self.record(item)
+            return _CONSTANT.pack(LIST, struct.pack('<ii', first, len(value)))
+        raise TypeError(f"constant {value!r} can't be saved in a binary uCIR")
+
+    def function(self, program, inst, first):
+        sections = self.sections
+        names, params = sections['names'], sections['params']
+        registers = program.registers[~inst[1]]
+        index = len(sections['functions']) // _WIDTH['functions']
+        sections['functions'] += [inst[1], first, len(names), len(registers),
+                                  len(params) // 2, len(inst[2])]
+        names += [self.string(name) for name in registers]
+        for ty, reg in inst[2]:
+            params += [self.string(ty), reg]
+        return index
+
+    def write(self, program):
+        sections = self.sections
+        sections['symbols'] = [self.string(name) for name in program.symbols]
+        code = sections['code']
+        for pc, inst in enumerate(program.code):
+            operands = list(inst[1:])
+            op = inst[0].op
+            if op == Op.LITERAL:
+                operands[0] = self.constant(operands[0])
+            elif op == Op.GLOBAL and len(operands) > 1:
+                operands[1] = self.constant(operands[1])
+            elif op == Op.DEFINE:
+                operands[1] = self.function(program, inst, pc)
+            if len(operands) > 3:
+                raise ValueError(f"instruction {inst!r} has more than 3 operands")
+            code += [self.kind(inst[0].opcode, len(operands))] + operands + [0] * (3 - len(operands))
+
+        # The strings: the offsets of each one (and of its end) in the blob.
+        blob = [string.encode('utf-8') for string in self.strings]
+        offsets = [0]
+        for data in blob:
+            offsets.append(offsets[-1] + len(data))
+        sections['strings'] = offsets
+        sections['blob'] = b''.join(blob)
+        return self.image()
+
+    def image(self):
+        header, data = [], []
+        offset = _HEADER.size
+        for name in SECTIONS:
+            content = self.sections[name]
+            if name == 'blob':
+                chunk, count = content, len(content)
+            elif name == 'constants':
+                chunk, count = b''.join(content), len(content)
+            else:
+                chunk, count = _pack(content), len(content) // _WIDTH[name]
+            chunk += bytes(-len(chunk) % 8)
+            header += [offset, count]
+            data.append(chunk)
+            offset += len(chunk)
+        return _HEADER.pack(MAGIC, VERSION, *header) + b''.join(data)
+
+# Saves a uCIR (or a NumberedIR) in a binary file (opened in 'wb' mode).
+def dump(code, out_file):
+    if not isinstance(code, NumberedIR):
+        code = number(code)
+    out_file.write(_Writer().write(code))
+
+class uCIRFile():
+    '''
+    A binary uCIR file, mapped in memory. Use it in a with statement (or
+    close it): the sections are views of the map.
+    Atributes:
+        - sections: (offset, count) of each section
+        - views: integer views of the sections, in place (see section)
+        - strings: the strings decoded so far
+    '''
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.map)
+        self.views = dict()
+        if len(self.buffer) < _HEADER.size or self.buffer[:4] != MAGIC:
+            version = None
+        else:
+            _, version, *header = _HEADER.unpack_from(self.buffer)
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{filename} isn't a binary uCIR (version {VERSION})")
+        self.sections = {name: (header[2*i], header[2*i+1]) for i, name in enumerate(SECTIONS)}
+        self.strings = [None] * max(self.sections['strings'][1] - 1, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in self.views.values():
+            view.release()
+        self.views.clear()
+        self.buffer.release()
+        self.map.close()
+
+    # Integers of a section, without copying them (if the machine is
+    # little-endian, as the file).
+    def section(self, name):
+        view = self.views.get(name)
+        if view is None:
+            offset, count = self.sections[name]
+            size = 4 * _WIDTH[name] * count
+            view = self.buffer[offset:offset + size]
+            if sys.byteorder == 'little':
+                view = view.cast('i')
+            else:
+                data = array('i')
+                data.frombytes(view)
+                data.byteswap()
+                view = memoryview(data)
+            self.views[name] = view
+        return view
+
+    # A string of the pool (decoded once).
+    def string(self, index):
+        value = self.strings[index]
+        if value is None:
+            offsets = self.section('strings')
+            start = self.sections['blob'][0]
+            data = self.buffer[start + offsets[index]:start + offsets[index + 1]]
+            value = self.strings[index] = str(data, 'utf-8')
+        return value
+
+    # A constant of the pool.
+    def constant(self, index):
+        offset = self.sections['constants'][0] + _CONSTANT.size * index
+        tag, value = _CONSTANT.unpack_from(self.buffer, offset)
+        if tag == INT:
+            return struct.unpack('<q', value)[0]
+        elif tag == FLOAT:
+            return struct.unpack('<d', value)[0]
+        elif tag == STRING:
+            return self.string(struct.unpack('<q', value)[0])
+        elif tag == LIST:
+            first, size = struct.unpack('<ii', value)
+            return [self.constant(first + i) for i in range(size)]
+        elif tag == BOOL:
+            return bool(struct.unpack('<q', value)[0])
+        return None
+
+    # The saved uCIR, numbered (see uCIR.NumberedIR).
+    def program(self):
+        string = self.string
+        symbols = [string(index) for index in self.section('symbols')]
+        registers = [None] * len(symbols)
+        kinds = self.section('kinds')
+        opcodes = [(decode(string(kinds[i])), kinds[i+1]) for i in range(0, len(kinds), 2)]
+
+        functions, names, params = self.section('functions'), self.section('names'), self.section('params')
+        code = []
+        records = self.section('code')
+
+        # Building the instructions would trigger many (useless) garbage
+        # collections: leave them to the next one instead.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for i in range(0, len(records), 4):
+                opcode, size = opcodes[records[i]]
+                op = opcode.op
+                if op == Op.LITERAL:
+                    code.append((opcode, self.constant(records[i+1]), records[i+2]))
+                elif op == Op.DEFINE:
+                    symbol, _, name, count, param, nparams = functions[6*records[i+2]:6*records[i+2]+6]
+                    registers[~symbol] = [string(index) for index in names[name:name + count]]
+                    code.append((opcode, symbol, [(string(params[2*j]), params[2*j+1])
+                                                  for j in range(param, param + nparams)]))
+                elif op == Op.GLOBAL and size > 1:
+                    code.append((opcode, records[i+1], self.constant(records[i+2])))
+                elif size == 3:
+                    code.append((opcode, records[i+1], records[i+2], records[i+3]))
+                elif size == 2:
+                    code.append((opcode, records[i+1], records[i+2]))
+                elif size == 1:
+                    code.append((opcode, records[i+1]))
+                else:
+                    code.append((opcode,))
+        finally:
+            if enabled:
+                gc.enable()
+        return NumberedIR(code, symbols, registers)
+
+# The uCIR saved in a binary file (see dump), numbered.
+def load(filename):
+    with uCIRFile(filename) as f:
+        return f.program()
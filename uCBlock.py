@@ -22,7 +22,7 @@ os.environ["PATH"] += os.pathsep + 'C:\Program Files (x86)/Graphviz2.38/bin'
 from collections import OrderedDict
 from graphviz import Digraph
 from os.path import exists
-import re
+from uCIR import Op, decode
 
 class Block(object):
     meta = None # Reference to UCCFG metaclass
@@ -166,7 +166,7 @@ class Block(object):
             #print(f"Removing {self.get_line(-1)} : {last_inst}")
             self.remove_inst(self.get_line(-1))
         # If following block starts in label, remove it
-        if re.match(r'\d+',first_inst[0]):
+        if decode(first_inst[0]).op == Op.LABEL:
             #print(f"Removing {self.get_line(0)} : {first_inst}")
             succ.remove_inst(succ.get_line(0))
         
@@ -237,8 +237,8 @@ class uCIRCFG(object):
         self.generator = generator
         self.first_block = None
         
-        self.targets = [r'define',r'\d+']              # Possible branch targets
-        self.branches = [r'return',r'jump',r'cbranch'] # Possible branching statements
+        self.targets = {Op.DEFINE, Op.LABEL}             # Possible branch targets
+        self.branches = {Op.RETURN, Op.JUMP, Op.CBRANCH} # Possible branching statements
     
     def test(self, data, quiet=False):
         self.generator.front_end.parser.lexer.reset_line_num()
@@ -309,8 +309,8 @@ class uCIRCFG(object):
     ##### Building the CFG ####
     
     # Lambda functions
-    is_target = lambda self, x : bool([True for t in self.targets if re.match(t, x)])
-    is_branch = lambda self, x : bool([True for b in self.branches if re.match(b, x)])
+    is_target = lambda self, x : decode(x).op in self.targets
+    is_branch = lambda self, x : decode(x).op in self.branches
 
     def build_cfg(self, code):
         ''' Given the IR code as a list of tuples, build a CFG.
@@ -353,7 +353,7 @@ class uCIRCFG(object):
         leaders = set([0])
         for i in range(len(code)):
             prev = code[i-1][0]
-            curr = code[i][0].split('_')[0]
+            curr = code[i][0]
             if self.is_target(curr) or self.is_branch(prev):
                 leaders = leaders.union([i])
         
@@ -380,7 +380,7 @@ class uCIRCFG(object):
         # Group blocks by functions
         for b in blocks:
             inst = b.first_inst()[0]
-            if inst.split('_')[0] =='define': # Reset every time a define is found
+            if decode(inst).op == Op.DEFINE: # Reset every time a define is found
                 if aux: funcs.append(aux)
                 aux = [b]
             else:
@@ -407,7 +407,7 @@ class uCIRCFG(object):
             last = b.last_inst()
 
             # Save blocks that can be jumped to
-            tar = first[0].split('_')[0]
+            tar = decode(first[0]).name
             if self.is_target(tar):
                 # Either a define or a label
                 if tar=='define':
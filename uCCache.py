@@ -0,0 +1,76 @@
+'''
+Front end: Cache of the generated lexer and parser tables.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import os
+import sys
+import hashlib
+import importlib.util
+from os.path import exists, expanduser, join
+from contextlib import contextmanager
+from ply import __version__ as ply_version
+
+# Tables are kept in $UC_CACHE_DIR, or in a 'uc' folder of the user
+# cache directory ($XDG_CACHE_HOME, or ~/.cache by default).
+def cache_dir():
+    ''' Returns the cache directory, creating it if needed.
+        None if it can't be created (tables are then not saved).
+    '''
+    path = os.environ.get('UC_CACHE_DIR')
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME') or join(expanduser('~'), '.cache')
+        path = join(base, 'uc')
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        return None
+    return path
+
+def rules_key(obj, prefix, *extra):
+    ''' Hash of the rules of obj (attributes starting with prefix: regexes
+        or functions with their docstrings), in definition order, and of
+        anything else the tables depend on (tokens, precedence...).
+    '''
+    funcs, strings = [], []
+    for name in dir(obj):
+        if not name.startswith(prefix):
+            continue
+        rule = getattr(obj, name)
+        if callable(rule):
+            funcs.append((rule.__code__.co_firstlineno, name, rule.__doc__))
+        else:
+            strings.append((name, rule))
+
+    # Function rules are tried in definition order: it must change the key,
+    # but the line numbers themselves must not.
+    funcs = [(name, doc) for (_, name, doc) in sorted(funcs)]
+    content = repr((ply_version, sys.version_info[:2], funcs, sorted(strings), extra))
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+@contextmanager
+def publish(tmp, path):
+    ''' Moves the file written to tmp inside the block to path, so other
+        processes never read a partially written table.
+    '''
+    try:
+        yield tmp
+        if exists(tmp):
+            os.replace(tmp, path)
+    finally:
+        if exists(tmp):
+            os.remove(tmp)
+
+def load_module(name, path):
+    ''' Imports a table module from its path (it is not in sys.path). '''
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
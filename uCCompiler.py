@@ -24,16 +24,21 @@ Last Modified: 09/07/2020.
 
 import sys
 import argparse
+from os.path import splitext, getsize
 from contextlib import contextmanager
 from uCLexer import uCLexer
 from uCParser import uCParser
+from uCDescent import uCDescentParser
 from uCSemantic import uCSemanticCheck
-from uCGenerate import uCIRGenerator
+from uCGenerate import uCIRGenerator, uCFusedGenerator
+from uCFold import uCConstantFolder
 from uCInterpreter import uCIRInterpreter
 from uCBlock import uCIRCFG
 from uCDFA import uCIRDFA
 from uCOptimize import uCIROptimizer
 from uCBuild import uCIRBuilder
+from uCBinary import dump, load
+from uCText import read
 
 """
 One of the most important (and difficult) parts of writing a compiler
@@ -149,36 +154,90 @@ class Compiler:
         """
         self.lexer = uCLexer(None)
         self.lexer.build()
-        self.parser = uCParser(self.lexer)
+        if self.args.parser == 'descent':
+            self.parser = uCDescentParser(self.lexer, self.args.compact)
+        else:
+            self.parser = uCParser(self.lexer, self.args.compact)
         self.parser.build()
-    
+
+        # Streaming: lex the memory-mapped file chunk by chunk.
+        if self.args.stream:
+            self.code = self.lexer.stream(self.filename, use_mmap=True)
         self.ast = self.parser.parse(self.code, self.args.debug)
 
     def _sema(self):
-        """ Decorate AST with semantic actions. If ast_file != None,
-            prints out the abstract syntax tree. """
-        try:
-            self.sema = uCSemanticCheck(self.parser)
-            self.sema.visit(self.ast)
-            if not self.args.susy and self.ast_file is not None:
-                self.ast.show(buf=self.ast_file, showcoord=True)
-        except AssertionError as e:
-            error(None, e)
+        """ Decorate AST with semantic actions, reporting every semantic
+            error found (sema.diagnostics), by line and column. If ast_file
+            != None and there were no errors, prints out the abstract syntax tree. """
+        self.sema = uCSemanticCheck(self.parser, recover=True)
+        self.sema.visit(self.ast)
+        for diagnostic in sorted(self.sema.diagnostics, key=lambda d: (d.line or 0, d.column or 0)):
+            error(diagnostic.line, diagnostic.message)
+        if not self.sema.diagnostics and not self.args.susy and self.ast_file is not None:
+            self.ast.show(buf=self.ast_file, showcoord=True)
+
+    def _fold(self):
+        """ Folds the constant expressions of the checked AST, and prunes
+            the statements whose condition is constant. """
+        self.folder = uCConstantFolder()
+        self.folder.fold(self.ast)
+        if self.args.debug:
+            sys.stderr.write("folded = %d, pruned = %d\n" % (self.folder.folded, self.folder.pruned))
 
     def _codegen(self):
         self.gen = uCIRGenerator(self.sema)
         self.gen.visit(self.ast)
+        self._cfg()
+
+    def _fused(self):
+        """ Decorate AST with semantic actions and generate its uCIR in a
+            single traversal. It stops at the first semantic error, and
+            returns False: the same AST is then checked again by _sema (the
+            check can be repeated), to report every error. """
+        self.sema = uCSemanticCheck(self.parser)
+        self.gen = uCFusedGenerator(self.sema)
+        try:
+            self.gen.visit(self.ast)
+        except AssertionError:
+            return False
+        if not self.args.susy and self.ast_file is not None:
+            self.ast.show(buf=self.ast_file, showcoord=True)
+        self._cfg()
+        return True
+
+    def _cfg(self):
+        """ Builds the CFG of the uCIR and, if ir_file != None, prints
+            out the uCIR. """
         self.gencode = self.gen.code
         
         self.cfg = uCIRCFG(self.gen)
         self.cfg.build_cfg(self.gencode)
         
+        if not self.args.susy and self.bin_file is not None:
+            dump(self.gencode, self.bin_file)
+
         if not self.args.susy and self.ir_file is not None:
             if self.args.cfg:
                 self.cfg.view(f=ir_file.name)
             else:
                 self.gen.show(buf=self.ir_file)
 
+    def _load(self):
+        """ Loads the uCIR saved in a text (see uCText) or binary file (see
+            uCBinary), so the back end starts from it, without the front end.
+            An empty file (left by a compilation with errors) is an error. """
+        self.gen = uCIRGenerator(None)
+        if self.saved == '.ir':
+            self.gen.code = read(self.filename)
+        elif getsize(self.filename):
+            self.gen.code = load(self.filename).render()
+        else:
+            self.gen.code = []
+        if not self.gen.code:
+            error(None, f"no uCIR in {self.filename}")
+            return
+        self._cfg()
+
     def _opt(self):
         dfa = uCIRDFA(self.cfg)
         self.opt = uCIROptimizer(dfa)
@@ -197,12 +256,22 @@ class Compiler:
             self.llvm.execute_ir(self.args.llvm_opt, self.llvm_opt_file)
 
     def _do_compile(self):
-        """ Compiles the code to the given source file. """
-        self._parse()
-        if not errors_reported():
-            self._sema()
+        """ Compiles the code to the given source file (or its saved uCIR). """
+        if self.saved:
+            self._load()
+        else:
+            self._parse()
+            fused = False
+            if not errors_reported():
+                # The fused pass is for programs without syntax errors.
+                fused = self.args.fused and not self.parser.errors and self._fused()
+                if not fused:
+                    self._sema()
+            if not errors_reported() and not fused:
+                if self.args.fold:
+                    self._fold()
+                self._codegen()
         if not errors_reported():
-            self._codegen()
             if self.args.opt:
                 self._opt()
             if self.args.llvm:
@@ -211,51 +280,62 @@ class Compiler:
     def compile(self):
         """ Compiles the given  filename """
 
-        if self.args.filename[-3:] == '.uc':
+        if self.args.filename.endswith(('.uc', '.ir', '.irb')):
             filename = self.args.filename
         else:
             filename = self.args.filename + '.uc'
+        base, ext = splitext(filename)
+        self.saved = ext if ext in ('.ir', '.irb') else None
 
         open_files = []
 
         self.ast_file = None
         if self.args.ast and not self.args.susy:
-            ast_filename = filename[:-3] + '.ast'
+            ast_filename = base + '.ast'
             sys.stderr.write("Outputting the AST to %s.\n" % ast_filename)
             self.ast_file = open(ast_filename, 'w')
             open_files.append(self.ast_file)
 
         self.ir_file = None
-        if self.args.ir and not self.args.susy:
-            ir_filename = filename[:-3] + '.ir'
+        if self.args.ir and not self.args.susy and self.saved != '.ir':
+            ir_filename = base + '.ir'
             sys.stderr.write("Outputting the uCIR to %s.\n" % ir_filename)
             self.ir_file = open(ir_filename, 'w')
             open_files.append(self.ir_file)
 
+        self.bin_file = None
+        if self.args.binary and not self.args.susy and self.saved != '.irb':
+            bin_filename = base + '.irb'
+            sys.stderr.write("Outputting the binary uCIR to %s.\n" % bin_filename)
+            self.bin_file = open(bin_filename, 'wb')
+            open_files.append(self.bin_file)
+
         self.opt_file = None
         if self.args.opt and not self.args.susy:
-            opt_filename = filename[:-3] + '.opt'
+            opt_filename = base + '.opt'
             sys.stderr.write("Outputting the optimized uCIR to %s.\n" % opt_filename)
             self.opt_file = open(opt_filename, 'w')
             open_files.append(self.opt_file)
 
         self.llvm_file = None
         if self.args.llvm and not self.args.susy:
-            llvm_filename = filename[:-3] + '.ll'
+            llvm_filename = base + '.ll'
             sys.stderr.write("Outputting the LLVM IR to %s.\n" % llvm_filename)
             self.llvm_file = open(llvm_filename, 'w')
             open_files.append(self.llvm_file)
 
         self.llvm_opt_file = None
         if self.args.llvm_opt and not self.args.susy:
-            llvm_opt_filename = filename[:-3] + '.opt.ll'
+            llvm_opt_filename = base + '.opt.ll'
             sys.stderr.write("Outputting the optimized LLVM IR to %s.\n" % llvm_opt_filename)
             self.llvm_opt_file = open(llvm_opt_filename, 'w')
             open_files.append(self.llvm_opt_file)
 
-        source = open(filename, 'r')
-        self.code = source.read()
-        source.close()
+        self.filename = filename
+        if not self.args.stream and not self.saved:
+            source = open(filename, 'r')
+            self.code = source.read()
+            source.close()
 
         self.run = not self.args.no_run
         with subscribe_errors(lambda msg: sys.stderr.write(msg+"\n")):
@@ -281,10 +361,11 @@ class Compiler:
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("filename")
+    parser.add_argument("filename", help="uC source, or its uCIR saved by -i (.ir) or -b (.irb)")
     parser.add_argument("-s", "--susy", help="run in the susy machine", action='store_true')
     parser.add_argument("-a", "--ast", help="dump the AST in the 'filename'.ast", action='store_true')
     parser.add_argument("-i", "--ir", help="dump the uCIR in the 'filename'.ir", action='store_true')
+    parser.add_argument("-b", "--binary", help="dump the uCIR in binary in the 'filename'.irb", action='store_true')
     parser.add_argument("-n", "--no-run", help="do not execute the program", action='store_true')
     parser.add_argument("-c", "--cfg", help="show the CFG for each function in pdf format", action='store_true')
     parser.add_argument("-o", "--opt", help="optimize the uCIR with const prop and dce", action='store_true')
@@ -292,6 +373,13 @@ if __name__ == '__main__':
     parser.add_argument("-l", "--llvm", help="generate LLVM IR code in the 'filename'.ll", action='store_true')
     parser.add_argument("-p", "--llvm-opt", choices=['ctm', 'dce', 'cfg', 'all'],
                         help="specify which llvm pass optimizations is enabled")
+    parser.add_argument("-r", "--parser", choices=['ply', 'descent'], default='ply',
+                        help="parser backend: PLY (LALR) or recursive descent")
+    parser.add_argument("-m", "--stream", help="lex the source while reading it, instead of reading it whole", action='store_true')
+    parser.add_argument("-k", "--compact", help="build a compact AST (packed coordinates, shared types: their coordinates are shown by their VarDecl)", action='store_true')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-f", "--fused", help="check the AST and generate the uCIR in a single traversal", action='store_true')
+    group.add_argument("-F", "--fold", help="fold the constants and prune dead branches of the AST before generating the uCIR", action='store_true')
     args = parser.parse_args()
 
     retval = Compiler(args).compile()
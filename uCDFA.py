@@ -13,7 +13,7 @@ Last Modified: 18/06/2020.
 '''
 
 from os.path import exists
-import re
+from uCIR import Op, decode, operands
 
 class uCIRDFA(object):
     def __init__(self, block_constructor):
@@ -61,56 +61,15 @@ class uCIRDFA(object):
         defs = dict([(num,set()) for num in range(1,self.cfg.lineID+1)])
         uses = dict([(num,set()) for num in range(1,self.cfg.lineID+1)])
         
-        # Maps which instruction USES which register (according to tuple position)
-        use_map = {
-            # Variables & Values
-            ('elem'):[1,2],
-            ('store','load','get'):[1],
-            # Binary Operations
-            ('add','sub','mul','div','mod'):[1,2], 
-            # Cast Operations
-            ('fptosi','sitofp'):[1],
-            # Relational/Equality/Logical 
-            ('lt','le','ge','gt','eq','ne','and','or','not'):[1,2],
-            # Functions & Builtins
-            ('param','print','return','cbranch', 'call', 'read'):[1] 
-            }
-
-        # Maps which instruction DEFINES which register (according to tuple position)
-        def_map = {
-            # Variables & Values
-            ('elem'):[3],
-            ('store','load','literal','get'):[2],
-            # Binary Operations
-            ('add','sub','mul','div','mod'):[3], 
-            # Cast Operations
-            ('fptosi','sitofp'):[2], 
-            # Relational/Equality/Logical 
-            ('lt','le','ge','gt','eq','ne','and','or','not'):[3],
-            # Functions
-            ('call'):[2]
-            }
-
-        def get_vars(inst, inst_map):
-            '''Get variables mapped from instruction'''
-            for keys,vals in inst_map.items():
-                local_def = inst[0].split('_')[0]
-                if local_def in keys:
-                    try:    return [inst[i] for i in vals]
-                    except: return []
-            return []
-
-        # Store Pointer is a special case (is a use of both temps)
-        str_ptr = lambda x: bool(re.match(r'store\w+\*', x[0]))
-        is_use  = lambda x: [x[1],x[2]] if str_ptr(x) else get_vars(x, use_map)
-        is_def  = lambda x: [] if str_ptr(x) else get_vars(x, def_map)
-
-        # Find use/def sets for each instruction
+        # Which registers each instruction USES and DEFINES (according to
+        # tuple position) is decoded with its opcode (see uCIR.Opcode). Store
+        # Pointer is a special case (is a use of both temps).
         for b in blocks:
             # Get use/def of each instruction in the block
             for num, inst in b.instructions.items():
-                uses[num].update(is_use(inst))
-                defs[num].update(is_def(inst))
+                code = decode(inst[0])
+                uses[num].update(operands(inst, code.uses))
+                defs[num].update(operands(inst, code.defines))
 
         # Return usedef statement wise sets
         return uses,defs
@@ -149,20 +108,20 @@ class uCIRDFA(object):
 
     def rd_gen_kill(self, dfs):
         defs = dict()
-        def_types = ('load', 'store', 'elem', 'literal', 'get', 
-                     'add', 'sub', 'mul', 'div', 'mod', 
-                     'le', 'lt', 'ge', 'gt', 'eq', 'ne',
-                     'and', 'or', 'not',
-                     'read')
+        def_types = {Op.LOAD, Op.STORE, Op.ELEM, Op.LITERAL, Op.GET,
+                     Op.ADD, Op.SUB, Op.MUL, Op.DIV, Op.MOD,
+                     Op.LE, Op.LT, Op.GE, Op.GT, Op.EQ, Op.NE,
+                     Op.AND, Op.OR, Op.NOT,
+                     Op.READ}
         
         # Find all definitions and create gen set.
         for b in dfs:
 
             # Go through all instructions.
             for num,inst in b.instructions.items():
-                split_inst = inst[0].split('_')
-                call_return = (split_inst[0] == 'call') and (len(inst) == 3)
-                local_def   = (split_inst[0] in def_types)
+                op = decode(inst[0]).op
+                call_return = (op == Op.CALL) and (len(inst) == 3)
+                local_def   = (op in def_types)
                 
                 if local_def or call_return:
                     
@@ -177,9 +136,9 @@ class uCIRDFA(object):
                         
             # Go through all instructions.
             for num,inst in b.instructions.items():
-                split_inst = inst[0].split('_')
-                call_return = (split_inst[0] == 'call') and (len(inst) == 3)
-                local_def   = (split_inst[0] in def_types)
+                op = decode(inst[0]).op
+                call_return = (op == Op.CALL) and (len(inst) == 3)
+                local_def   = (op in def_types)
                 
                 if local_def or call_return:
                     curr_kill = defs[inst[-1]] - set([(b.ID,num)])
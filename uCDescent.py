@@ -0,0 +1,504 @@
+'''
+First Project: Recursive descent parser for the uC language.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+from uCParser import uCParser
+from uCLexer import TokenArrays
+import uCAST as ast
+
+class ParseError(Exception):
+    ''' Unexpected token (None at the end of input). '''
+    def __init__(self, token):
+        self.token = token
+
+class uCDescentParser(uCParser):
+    '''Parser for the uC language, alternative to the PLY one (uCParser).
+    Statements and declarations are parsed by recursive descent, binary
+    expressions by precedence climbing. Builds the same AST as uCParser,
+    each method following the productions of the same name in it.
+    Atributes:
+        - source: lexer (or TokenArrays) tokens are read from
+        - tok: current token (None at the end of input)
+        - ahead: tokens read after the current one (for casts)
+    '''
+
+    # Binary operators: precedence level, as in uCParser.precedence.
+    binary_ops = {
+        '||': 1,
+        '&&': 2,
+        '==': 3, '!=': 3,
+        '<': 4, '>': 4, '<=': 4, '>=': 4,
+        '+': 5, '-': 5,
+        '*': 6, '/': 6, '%': 6,
+    }
+    nonassoc = {3, 4}
+
+    binary_types = ('OR', 'AND', 'EQ', 'UNEQ', '<', '>', 'LE', 'GE', '+', '-', '*', '/', '%')
+    assign_types = ('=', 'TIMESEQ', 'DIVEQ', 'MODEQ', 'PLUSEQ', 'MINUSEQ')
+    type_types = ('VOID', 'CHAR', 'INT', 'FLOAT')
+    un_op_types = ('&', '+', '*', '-', '!')
+    constant_types = {'CCONST': 'char', 'ICONST': 'int', 'FCONST': 'float', 'STRING': 'string'}
+
+    # Tokens that may start an expression (expr_opt is not empty).
+    expr_first = {'ID', 'CCONST', 'ICONST', 'FCONST', 'STRING',
+                  '(', 'PLUSPLUS', 'MINUSMINUS'} | set(un_op_types)
+
+    # No tables to build.
+    def build(self, **kwargs):
+        self.statements = {
+            '{': self.compound_statement,
+            'IF': self.selection_statement,
+            'WHILE': self.iteration_statement,
+            'FOR': self.iteration_statement,
+            'BREAK': self.jump_statement,
+            'RETURN': self.jump_statement,
+            'ASSERT': self.assert_statement,
+            'PRINT': self.print_statement,
+            'READ': self.read_statement,
+        }
+
+    # Parses an expression (source text or TokenArrays from the lexer).
+    # Syntax errors are reported by p_error, as in uCParser, but there is
+    # no error recovery: None is returned.
+    def parse(self, data, debug):
+        self.shared_types = {}
+        if isinstance(data, TokenArrays):
+            data.rewind()
+            self.source = data
+        else:
+            self.lexer.input(data)
+            self.source = self.lexer
+        self.next_token = self.source.token
+        self.ahead = []
+        self.tok = self.next_token()
+        try:
+            return self.program()
+        except ParseError as e:
+            self.p_error(e.token)
+            return None
+        except RecursionError:
+            # Nested deeper than Python's recursion (else if chains and
+            # nested parentheses are parsed in loops): a syntax error here.
+            self.p_error(self.tok)
+            return None
+
+    #### TOKENS ####
+
+    def peek(self):
+        return self.tok.type if self.tok else None
+
+    # Type of the token after the current one.
+    def peek_ahead(self):
+        if not self.ahead:
+            self.ahead.append(self.next_token())
+        tok = self.ahead[-1]
+        return tok.type if tok else None
+
+    # Consumes the current token.
+    def advance(self):
+        tok = self.tok
+        self.tok = self.ahead.pop() if self.ahead else self.next_token()
+        return tok
+
+    # Consumes the current token, which must be of the given type.
+    def expect(self, type):
+        if self.tok is None or self.tok.type != type:
+            raise ParseError(self.tok)
+        return self.advance()
+
+    def coord(self, tok):
+        if self.compact:
+            return ast.PackedCoord(tok.lineno, self.source.find_column(tok.lexpos))
+        return ast.Coord(tok.lineno, self.source.find_column(tok.lexpos))
+
+    #### ROOT ####
+
+    def program(self):
+        gdecls = [self.global_declaration()]
+        while self.tok is not None:
+            gdecls.append(self.global_declaration())
+        return ast.Program(gdecls)
+
+    #### FIRST SPLIT ####
+
+    def global_declaration(self):
+        if self.peek() not in self.type_types:
+            # Function without return type (defaults to INT).
+            decl = self.declarator()
+            params = self.declaration_list_opt()
+            return self._build_function_definition(type, decl, params, self.compound_statement())
+
+        spec = self.type_specifier()
+        if self.peek() == ';':
+            self.advance()
+            return ast.GlobalDecl(self._build_declarations(spec, None))
+        decl = self.declarator()
+        if self.peek() in ('=', ',', ';'):
+            decls = self.init_declarator_list(decl)
+            self.expect(';')
+            return ast.GlobalDecl(self._build_declarations(spec, decls))
+        params = self.declaration_list_opt()
+        return self._build_function_definition(spec, decl, params, self.compound_statement())
+
+    def declaration(self):
+        spec = self.type_specifier()
+        decls = self.init_declarator_list() if self.peek() != ';' else None
+        self.expect(';')
+        return self._build_declarations(spec, decls)
+
+    # The first declarator may have been parsed already.
+    def init_declarator_list(self, decl=None):
+        decls = [self.init_declarator(decl)]
+        while self.peek() == ',':
+            self.advance()
+            decls.append(self.init_declarator())
+        return decls
+
+    def init_declarator(self, decl=None):
+        if decl is None:
+            decl = self.declarator()
+        if self.peek() == '=':
+            self.advance()
+            return dict(decl=decl, init=self.initializer())
+        return dict(decl=decl, init=None)
+
+    def type_specifier(self):
+        if self.peek() not in self.type_types:
+            raise ParseError(self.tok)
+        tok = self.advance()
+        return ast.Type(tok.value, self.coord(tok))
+
+    def initializer(self):
+        if self.peek() != '{':
+            return self.assign_expr()
+        self.advance()
+        init = self.initializer()
+        inits = ast.InitList([init], init.coord)
+        while self.peek() == ',':
+            self.advance()
+            if self.peek() == '}':
+                break
+            inits.exprs.append(self.initializer())
+        self.expect('}')
+        return inits
+
+    def declarator(self):
+        if self.peek() != '*':
+            return self.direct_declarator()
+        stars = []
+        while self.peek() == '*':
+            stars.append(self.coord(self.advance()))
+
+        # The first pointer is the last one nested.
+        ptr = tail = ast.PtrDecl(None, stars.pop())
+        while stars:
+            tail.type = ast.PtrDecl(None, stars.pop())
+            tail = tail.type
+        return self._type_modify_decl(self.direct_declarator(), ptr)
+
+    def direct_declarator(self):
+        if self.peek() == '(':
+            self.advance()
+            decl = self.declarator()
+            self.expect(')')
+        else:
+            decl = ast.VarDecl(self.identifier(), None, None)
+
+        while True:
+            if self.peek() == '[':
+                self.advance()
+                dim = self.bin_expr() if self.peek() in self.expr_first else None
+                self.expect(']')
+                aux = ast.ArrayDecl(None, dim, decl.coord)
+            elif self.peek() == '(':
+                self.advance()
+                if self.peek() in self.type_types:
+                    args = self.parameter_list()
+                elif self.peek() == 'ID':
+                    args = self.id_list()
+                else:
+                    args = None
+                self.expect(')')
+                aux = ast.FuncDecl(None, args, None)
+            else:
+                return decl
+            decl = self._type_modify_decl(decl, aux)
+
+    #### EXPRESSIONS ####
+
+    # The first assignment expression may have been parsed (see parenthesized).
+    # As in the PLY grammar, a parenthesized list is extended, not nested.
+    def expr(self, expr=None):
+        if expr is None:
+            expr = self.assign_expr()
+        if self.peek() != ',':
+            return expr
+        if not isinstance(expr, ast.ExprList):
+            expr = ast.ExprList([expr], expr.coord)
+        while self.peek() == ',':
+            self.advance()
+            expr.exprs.append(self.assign_expr())
+        return expr
+
+    def expr_opt(self):
+        return self.expr() if self.peek() in self.expr_first else None
+
+    # Only an unary expression (not a cast) may be assigned to.
+    def assign_expr(self):
+        if self.peek() == '(' and self.is_cast():
+            return self.bin_expr()
+        left = self.un_expr()
+        if self.peek() in self.assign_types:
+            op = self.advance().value
+            return ast.Assignment(op, left, self.assign_expr(), left.coord)
+        return self.bin_expr(left)
+
+    # Binary Expressions #
+    # Precedence climbing: operands of an operator only take operators
+    # of higher precedence. Operators of the same level are left
+    # associative, or a syntax error if not associative.
+
+    def bin_expr(self, left=None, level=1):
+        if left is None:
+            left = self.cast_expr()
+        while self.peek() in self.binary_types:
+            op_level = self.binary_ops[self.tok.value]
+            if op_level < level:
+                break
+            op = self.advance().value
+            right = self.bin_expr(self.cast_expr(), op_level + 1)
+            left = ast.BinaryOp(op, left, right, left.coord)
+            if op_level in self.nonassoc and self.peek() in self.binary_types \
+                    and self.binary_ops[self.tok.value] == op_level:
+                raise ParseError(self.tok)
+        return left
+
+    # Cast Expressions #
+
+    # A '(' starts a cast if followed by a type.
+    def is_cast(self):
+        return self.peek_ahead() in self.type_types
+
+    def cast_expr(self):
+        if self.peek() == '(' and self.is_cast():
+            coord = self.coord(self.advance())
+            type = self.type_specifier()
+            self.expect(')')
+            return ast.Cast(type, self.cast_expr(), coord)
+        return self.un_expr()
+
+    # Unary Expressions #
+
+    def un_expr(self):
+        type = self.peek()
+        if type in ('PLUSPLUS', 'MINUSMINUS'):
+            op = self.advance().value
+            expr = self.un_expr()
+            return ast.UnaryOp(op, expr, expr.coord)
+        if type in self.un_op_types:
+            op = self.advance().value
+            expr = self.cast_expr()
+            return ast.UnaryOp(op, expr, expr.coord)
+        return self.postfix_expr()
+
+    # Postfix Expressions #
+
+    # The primary expression may have been parsed (see parenthesized).
+    def postfix_expr(self, expr=None):
+        if expr is None:
+            expr = self.primary_expr()
+        while True:
+            type = self.peek()
+            if type == '[':
+                self.advance()
+                subscript = self.expr()
+                self.expect(']')
+                expr = ast.ArrayRef(expr, subscript, expr.coord)
+            elif type == '(':
+                self.advance()
+                args = self.expr_opt()
+                self.expect(')')
+                expr = ast.FuncCall(expr, args, expr.coord)
+            elif type in ('PLUSPLUS', 'MINUSMINUS'):
+                expr = ast.UnaryOp('p' + self.advance().value, expr, expr.coord)
+            else:
+                return expr
+
+    # Primary Expressions #
+
+    def primary_expr(self):
+        type = self.peek()
+        if type == '(':
+            return self.parenthesized()
+        if type == 'ID':
+            return self.identifier()
+        if type in self.constant_types:
+            tok = self.advance()
+            return ast.Constant(self.constant_types[type], self.intern(tok.value), self.coord(tok))
+        raise ParseError(self.tok)
+
+    # Nested parentheses are parsed in a loop, not recursively: the innermost
+    # expression first, then each enclosing one is continued from it (as an
+    # unary expression, then the rest of expr) up to its ')'.
+    def parenthesized(self):
+        depth = 0
+        while self.peek() == '(' and not self.is_cast():
+            self.advance()
+            depth += 1
+        expr = self.expr()
+        self.expect(')')
+        for _ in range(depth - 1):
+            left = self.postfix_expr(expr)
+            if self.peek() in self.assign_types:
+                op = self.advance().value
+                expr = ast.Assignment(op, left, self.assign_expr(), left.coord)
+            else:
+                expr = self.bin_expr(left)
+            expr = self.expr(expr)
+            self.expect(')')
+        return expr
+
+    def identifier(self):
+        tok = self.expect('ID')
+        return ast.ID(self.intern(tok.value), self.coord(tok))
+
+    #### STATEMENTS ####
+
+    def statement(self):
+        parse = self.statements.get(self.peek())
+        if parse:
+            return parse()
+        expr = self.expr_opt()
+        self.expect(';')
+        if expr is None: # Position of the empty expr_opt in uCParser (line 0)
+            return ast.EmptyStatement(ast.Coord(0, self.source.find_column(0)))
+        return expr
+
+    def compound_statement(self):
+        coord = self.coord(self.expect('{'))
+        decls = self.declaration_list_opt()
+        stats = None
+        if self.peek() != '}':
+            stats = [self.statement()]
+            while self.peek() != '}':
+                stats.append(self.statement())
+        self.advance()
+        return ast.Compound(decls, stats, coord) if decls or stats else None
+
+    # Selection Statements #
+    # The else belongs to the closest if (shift in uCParser). An else if
+    # chain is parsed in a loop, then nested from its last if.
+
+    def selection_statement(self):
+        chain = []
+        else_stat = None
+        while True:
+            coord = self.coord(self.advance())
+            self.expect('(')
+            cond = self.expr()
+            self.expect(')')
+            chain.append((cond, self.statement(), coord))
+            if self.peek() != 'ELSE':
+                break
+            self.advance()
+            if self.peek() != 'IF':
+                else_stat = self.statement()
+                break
+        for cond, if_stat, coord in reversed(chain):
+            else_stat = ast.If(cond, if_stat, else_stat, coord)
+        return else_stat
+
+    # Iteration Statements #
+
+    def iteration_statement(self):
+        tok = self.advance()
+        coord = self.coord(tok)
+        self.expect('(')
+        if tok.type == 'WHILE':
+            cond = self.expr()
+            self.expect(')')
+            return ast.While(cond, self.statement(), coord)
+
+        if self.peek() in self.type_types: # The declaration includes the ';'
+            init = ast.DeclList(self.declaration(), coord)
+        else:
+            init = self.expr_opt()
+            self.expect(';')
+        cond = self.expr_opt()
+        self.expect(';')
+        next = self.expr_opt()
+        self.expect(')')
+        return ast.For(init, cond, next, self.statement(), coord)
+
+    # Jump Statements #
+
+    def jump_statement(self):
+        tok = self.advance()
+        coord = self.coord(tok)
+        if tok.type == 'BREAK':
+            self.expect(';')
+            return ast.Break(coord)
+        expr = self.expr_opt()
+        self.expect(';')
+        return ast.Return(expr, coord)
+
+    # Functions Statements #
+
+    def assert_statement(self):
+        coord = self.coord(self.advance())
+        expr = self.expr()
+        self.expect(';')
+        return ast.Assert(expr, coord)
+
+    def print_statement(self):
+        coord = self.coord(self.advance())
+        self.expect('(')
+        expr = self.expr_opt()
+        self.expect(')')
+        self.expect(';')
+        return ast.Print(expr, coord)
+
+    def read_statement(self):
+        coord = self.coord(self.advance())
+        self.expect('(')
+        expr = self.expr()
+        self.expect(')')
+        self.expect(';')
+        return ast.Read(expr, coord)
+
+    #### MISCELANEOUS ####
+
+    def parameter_list(self):
+        param = self.parameter_declaration()
+        params = ast.ParamList([param], param.coord)
+        while self.peek() == ',':
+            self.advance()
+            params.params.append(self.parameter_declaration())
+        return params
+
+    def parameter_declaration(self):
+        spec = self.type_specifier()
+        return self._build_declarations(spec, [dict(decl=self.declarator())])[0]
+
+    def id_list(self):
+        ids = [self.identifier()]
+        while self.peek() == ',':
+            self.advance()
+            ids.append(self.identifier())
+        return ids
+
+    def declaration_list_opt(self):
+        if self.peek() not in self.type_types:
+            return None
+        decls = self.declaration()
+        while self.peek() in self.type_types:
+            decls.extend(self.declaration())
+        return decls
@@ -0,0 +1,172 @@
+'''
+Second Project (extra): Constant folding over the checked AST, before the IR
+generation.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import operator
+import uCAST as ast
+
+# Arithmetic of the constants, as the uCIR interpreter (and the folding of
+# uCIROptimizer) does it: integer division is floor division.
+_ARITHMETIC = {
+    'int': {'+': operator.add, '-': operator.sub, '*': operator.mul,
+            '/': operator.floordiv, '%': operator.mod},
+    'float': {'+': operator.add, '-': operator.sub, '*': operator.mul,
+              '/': operator.truediv, '%': operator.mod},
+}
+
+_RELATIONAL = {'<': operator.lt, '<=': operator.le, '>': operator.gt,
+               '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+_CASTS = {'int': int, 'float': float}
+
+class uCConstantFolder(ast.NodeVisitor):
+    '''
+    Simplifies a checked AST (after uCSemanticCheck), so the generator emits
+    less code: the arithmetic on constants (BinaryOp, UnaryOp and Cast) is
+    replaced by its result, and the statements whose condition is constant
+    by the code that runs (If: the branch taken; While and Assert: nothing,
+    if the loop never runs or the assertion holds).
+    A condition is only constant if all of it is (no side effects are lost).
+    Divisions by zero are kept, to fail at run time as before.
+    Atributes:
+        - replaced: nodes folded (or removed: None) whose parent wasn't
+          visited yet, and their replacements
+        - folded: number of expressions folded
+        - pruned: number of statements removed or replaced by a branch
+    '''
+    def __init__(self):
+        self.replaced = dict()
+        self.folded = 0
+        self.pruned = 0
+
+    # Folds the AST in place.
+    def fold(self, node):
+        self.visit(node)
+
+    def generic_visit(self, node):
+        for _, child in node.children():
+            yield child
+        if self.replaced:
+            self.substitute(node)
+
+    def visit_ArrayRef(self, node):
+        # The subscript isn't named after its attribute (see substitute).
+        yield node.name
+        yield node.subsc
+        if node.subsc in self.replaced:
+            node.subsc = self.replaced.pop(node.subsc)
+
+    def visit_Assert(self, node):
+        yield node.expr
+        if self.replaced:
+            self.substitute(node)
+        if self.truth(node.expr):
+            self.prune(node, None)
+
+    def visit_BinaryOp(self, node):
+        yield node.lvalue
+        yield node.rvalue
+        if self.replaced:
+            self.substitute(node)
+
+        # Both operands are constants of a type with arithmetic.
+        left, right = node.lvalue, node.rvalue
+        if not (isinstance(left, ast.Constant) and isinstance(right, ast.Constant)):
+            return
+        func = _ARITHMETIC.get(left.type.name[0].name, {}).get(node.op)
+        if func is None or (node.op in ('/', '%') and right.value == 0):
+            return
+        self.constant(node, func(left.value, right.value))
+
+    def visit_Cast(self, node):
+        yield node.expr
+        if self.replaced:
+            self.substitute(node)
+        cast = _CASTS.get(node.type.name[0].name)
+        if cast and isinstance(node.expr, ast.Constant) and node.expr.type.name[0].name in _CASTS:
+            self.constant(node, cast(node.expr.value))
+
+    def visit_If(self, node):
+        yield node.cond
+        yield node.if_stat
+        if node.else_stat:
+            yield node.else_stat
+        if self.replaced:
+            self.substitute(node)
+        taken = self.truth(node.cond)
+        if taken is not None:
+            self.prune(node, node.if_stat if taken else node.else_stat)
+
+    def visit_UnaryOp(self, node):
+        yield node.expr
+        if self.replaced:
+            self.substitute(node)
+        expr = node.expr
+        if node.op in ('+', '-') and isinstance(expr, ast.Constant) and expr.type.name[0].name in _ARITHMETIC:
+            self.constant(node, expr.value if node.op == '+' else -expr.value)
+
+    def visit_While(self, node):
+        yield node.cond
+        if node.body:
+            yield node.body
+        if self.replaced:
+            self.substitute(node)
+        if self.truth(node.cond) is False:
+            self.prune(node, None)
+
+    ## AUXILIARY FUNCTIONS ##
+
+    # Value of a condition, if all of it is constant (None otherwise).
+    def truth(self, expr):
+        if isinstance(expr, ast.BinaryOp):
+            if expr.op in ('&&', '||'):
+                left, right = self.truth(expr.lvalue), self.truth(expr.rvalue)
+                if left is None or right is None:
+                    return None
+                return (left and right) if expr.op == '&&' else (left or right)
+            left, right = expr.lvalue, expr.rvalue
+            if isinstance(left, ast.Constant) and isinstance(right, ast.Constant) \
+                    and left.type.name[0].name in _ARITHMETIC and expr.op in _RELATIONAL:
+                return _RELATIONAL[expr.op](left.value, right.value)
+        elif isinstance(expr, ast.UnaryOp) and expr.op == '!':
+            value = self.truth(expr.expr)
+            return None if value is None else not value
+        return None
+
+    # Replaces an expression by a constant of its type.
+    def constant(self, node, value):
+        self.replaced[node] = ast.Constant(node.type, value, node.coord)
+        self.folded += 1
+
+    # Replaces a statement by another one (None: removes it).
+    def prune(self, node, stat):
+        self.replaced[node] = stat
+        self.pruned += 1
+
+    # Puts the replacements of a node's children in place. A statement
+    # removed from a list is dropped, elsewhere it is an EmptyStatement.
+    def substitute(self, node):
+        replaced = self.replaced
+        lists = dict()
+        for name, child in node.children():
+            if child not in replaced:
+                continue
+            new = replaced.pop(child)
+            attr, _, index = name.partition('[')
+            if index:
+                if attr not in lists:
+                    lists[attr] = list(getattr(node, attr))
+                lists[attr][int(index[:-1])] = new
+            else:
+                setattr(node, attr, new if new is not None else ast.EmptyStatement(child.coord))
+        for attr, items in lists.items():
+            setattr(node, attr, [item for item in items if item is not None])
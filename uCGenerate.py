@@ -14,8 +14,9 @@ Last Modified: 09/07/2020.
 '''
 
 import re
+from types import GeneratorType
 import uCAST as ast
-from uCSemantic import SymbolTable
+from uCSemantic import ScopeChain
 from os.path import exists
 
 class ScopeStack():
@@ -23,30 +24,31 @@ class ScopeStack():
     Class responsible for keeping variables scopes.
     Used for type checking variables as well as checking if they're are defined.
     Atributes:
-        - stack: stack of SymbolTables. Each item is a different scope ([0] is global [-1] is local)
+        - chain: addresses of the variables of each scope (ScopeChain, [0] is global [-1] is local)
+        - enclosures: function name (ast.ID) of each scope, None if not a function's
+        - dims: dimensions of each array variable
     '''
     def __init__(self):
-        self.stack = []
+        self.chain = ScopeChain()
+        self.enclosures = []
         self.dims = dict()
     
     # Add new scope (if a function definition started)
     # Every function definition is considered a new scope (new symboltable)
     def add_scope(self, node=None):
-        sym_tab = SymbolTable()
         if node : node = node.decl.name 
-        sym_tab.add(0, node)
-        self.stack.append(sym_tab) 
+        self.enclosures.append(node)
+        self.chain.push()
 
     # Add a new variable's address to the current function's scope
     def add_to_scope(self, node, addr):
-        scope = self.stack[-1]
         name = node.declname.name
-        scope.add(name, addr)
+        self.chain.add(name, addr)
     
     # Add a new variable's name to the global scope
     def add_global(self, node, addr):
         name = node.declname.name
-        self.stack[0].add(name, addr)
+        self.chain.add(name, addr, 0)
 
     def add_dims(self, node, data):
         name = node.declname.name
@@ -58,14 +60,11 @@ class ScopeStack():
 
     # Get type of function, stored as a global var.
     def get_func_type(self, name):
-        return self.stack[0].lookup(name).type
+        return self.chain.get(name, 0).type
 
     # Return a variable's address
     def fetch_temp(self, node):
-        name = node.name
-        for scope in self.stack[::-1]:
-            var = scope.lookup(name)
-            if var: break
+        var = self.chain.lookup(node.name)
         
         # If function
         if isinstance(var, ast.VarDecl):
@@ -74,23 +73,53 @@ class ScopeStack():
 
     # Remove current scope from stack (when a FuncDef node ends)
     def pop_scope(self):
-        self.stack.pop() 
+        self.chain.pop()
+        self.enclosures.pop()
     
     # Print for debugging
     def __str__(self):
         text = '\n'
-        for (i,sym) in enumerate(self.stack):
-            st = sym.symtab
-            labels = list(st.keys())
-            labels.remove(0) # Remove enclosure
-            labels = [(x,st[x]) for x in labels]
-            if i: enclosure = f"At '{st[0].name}'" if st[0] else 'In a loop'
+        for (i,enclosure) in enumerate(self.enclosures):
+            labels = [(x,self.chain.get(x, i)) for x in self.chain.names(i)]
+            if i: enclosure = f"At '{enclosure.name}'" if enclosure else 'In a loop'
             else : enclosure = 'Globals'
             text += f"{enclosure} => |"
             for k,v in labels: text+=f" {k} {v} |"
             text += '\n'
         return text
 
+class SharedScopeStack(ScopeStack):
+    '''
+    Variables scopes of the fused pass (uCFusedGenerator): the scopes are the
+    ones of the semantic check, whose bindings are the declarations (VarDecl),
+    and the address of a variable is kept on its declaration.
+    Atributes:
+        - chain: declarations of each scope (the ScopeChain of the check)
+        - dims: dimensions of each array variable
+    '''
+    def __init__(self, chain):
+        super(SharedScopeStack, self).__init__()
+        self.chain = chain
+
+    # Scopes are added and removed by the semantic check.
+    def add_scope(self, node=None):
+        pass
+
+    def pop_scope(self):
+        pass
+
+    # Keep a variable's address on its declaration (bound by the check)
+    def add_to_scope(self, node, addr):
+        node.gen_location = addr
+
+    # Functions are bound by the check (their address is already on them)
+    def add_global(self, node, addr):
+        pass
+
+    # Return a variable's address
+    def fetch_temp(self, node):
+        return self.chain.lookup(node.name).gen_location
+
 class uCIRGenerator(ast.NodeVisitor):
     '''
     Node visitor class that creates 3-address encoded instruction sequences.
@@ -148,6 +177,10 @@ class uCIRGenerator(ast.NodeVisitor):
 
     def generate(self, data):
         ast = self.front_end.parser.parse(data, False)
+        self.translate(ast)
+
+    # Checks the AST (with the front end) and generates its code.
+    def translate(self, ast):
         self.front_end.visit(ast)
         self.visit(ast)
 
@@ -162,15 +195,13 @@ class uCIRGenerator(ast.NodeVisitor):
 
         ast = self.front_end.parser.parse(data, False)
         
-        # Check semantics
-        self.front_end.visit(ast)
+        # Check semantics and generate IR
+        self.translate(ast)
         
         # Show AST
         if show_ast:
             ast.show()
             
-        # Generate IR
-        self.visit(ast)
         if not quiet: self.print_code()
         if out_file: self.write_file(self.code, out_file)
     
@@ -212,7 +243,7 @@ class uCIRGenerator(ast.NodeVisitor):
         else:
             _str = ''
             for _code in self.code:
-                _str += self.format_instruction(code)+'\n'
+                _str += self.format_instruction(_code)+'\n'
             buf.write(_str)
 
     def write_file(self, code, out_file):
@@ -233,12 +264,12 @@ class uCIRGenerator(ast.NodeVisitor):
         # Visit all global declarations.
         for gdecl in node.gdecls:
             if isinstance(gdecl, ast.GlobalDecl):
-                self.visit(gdecl)
+                yield gdecl
                 
         # Visit all function definitions.
         for fdef in node.gdecls:
             if isinstance(fdef, ast.FuncDef):
-                self.visit(fdef)
+                yield fdef
 
         # Remove global scope.
         self.scopes.pop_scope()
@@ -273,7 +304,7 @@ class uCIRGenerator(ast.NodeVisitor):
         self.arr['depth'] += 1
         
         # Fetch the array's dimensions (if on root)
-        self.build_offset(node)
+        yield from self.build_offset(node)
         
         # If not root, skip elem instruction
         if self.arr['depth'] == 0: 
@@ -302,7 +333,7 @@ class uCIRGenerator(ast.NodeVisitor):
 
     def visit_Assert(self, node):
         # Visit the assert condition
-        self.visit(node.expr)
+        yield node.expr
         
         # Create three new temporary variable names for True/False and rest of code
         target_true = self.new_temp()
@@ -338,28 +369,36 @@ class uCIRGenerator(ast.NodeVisitor):
     
     def visit_Assignment(self, node):
         # Visit the expression to be assigned.
-        self.visit(node.rvalue)
-        
+        yield node.rvalue
+        self.load_ref(node.rvalue)
+        
+        # Assignable expressions are ID, ArrayRef and UnaryOp. The address of
+        # an ID or of a pointer is known, the others are visited.
+        if not self.addressed(node.lvalue):
+            yield node.lvalue
+        
+        # Other assignment ops need the value too
+        elif node.op != '=':
+            yield node.lvalue
+        self.assign(node)
+    
+    # Whether the address of an assigned expression is known without a visit.
+    def addressed(self, lvalue):
+        return isinstance(lvalue, ast.ID) or (isinstance(lvalue, ast.UnaryOp) and lvalue.op == '*')
+    
+    # Stores the (loaded) value of an assignment, its lvalue already visited
+    # if needed.
+    def assign(self, node):
         # Create types
         ty = self.build_reg_types(node.rvalue.type)
         
-        # Load if ArrayRef
-        if isinstance(node.rvalue, ast.ArrayRef):
-            target = self.new_temp()
-            inst = ('load_'+ty+'_*', node.rvalue.gen_location, target)
-            self.code.append(inst)
-            node.rvalue.gen_location = target
-        
         # Assignable expressions are ID, ArrayRef and UnaryOp
-        visited = False
         if isinstance(node.lvalue, ast.ID):
             laddr = self.scopes.fetch_temp(node.lvalue)
         elif isinstance(node.lvalue, ast.UnaryOp) and node.lvalue.op == '*':
             laddr = self.scopes.fetch_temp(node.lvalue.expr)
             ty += '_*'
         else:
-            visited = True
-            self.visit(node.lvalue)
             laddr = node.lvalue.gen_location
             
             # Get content if ArrayRef.
@@ -368,7 +407,6 @@ class uCIRGenerator(ast.NodeVisitor):
         
         # Other assignment ops
         if node.op != '=':
-            if not visited:   self.visit(node.lvalue)
             loc = self.new_temp()
             opcode = self.bin_ops[node.op[0]] + "_" + ty
             inst = (opcode, node.lvalue.gen_location, node.rvalue.gen_location, loc)
@@ -387,24 +425,23 @@ class uCIRGenerator(ast.NodeVisitor):
         
     def visit_BinaryOp(self, node):
         # Visit the left and right expressions        
-        self.visit(node.lvalue)
-        # Load if ArrayRef
-        if isinstance(node.lvalue, ast.ArrayRef):
-            ty = self.build_reg_types(node.lvalue.type)
-            target = self.new_temp()
-            inst = ('load_'+ty+'_*', node.lvalue.gen_location, target)
-            self.code.append(inst)
-            node.lvalue.gen_location = target
-        
-        self.visit(node.rvalue)
-        # Load if ArrayRef
-        if isinstance(node.rvalue, ast.ArrayRef):
-            ty = self.build_reg_types(node.rvalue.type)
+        yield node.lvalue
+        self.load_ref(node.lvalue)
+        yield node.rvalue
+        self.load_ref(node.rvalue)
+        self.binary_op(node)
+    
+    # Loads the content of an array element, in place of its address.
+    def load_ref(self, expr):
+        if isinstance(expr, ast.ArrayRef):
+            ty = self.build_reg_types(expr.type)
             target = self.new_temp()
-            inst = ('load_'+ty+'_*', node.rvalue.gen_location, target)
+            inst = ('load_'+ty+'_*', expr.gen_location, target)
             self.code.append(inst)
-            node.rvalue.gen_location = target
-
+            expr.gen_location = target
+    
+    # Operates on the (loaded) operands of a binary operation.
+    def binary_op(self, node):
         # Make a new temporary for storing the result
         target = self.new_temp()
 
@@ -422,15 +459,8 @@ class uCIRGenerator(ast.NodeVisitor):
 
     def visit_Cast(self, node):
         # Visit the expression
-        self.visit(node.expr)
-        
-        # Load if ArrayRef
-        if isinstance(node.expr, ast.ArrayRef):
-            ty = self.build_reg_types(node.expr.type)
-            target = self.new_temp()
-            inst = ('load_'+ty+'_*', node.expr.gen_location, target)
-            self.code.append(inst)
-            node.expr.gen_location = target
+        yield node.expr
+        self.load_ref(node.expr)
         
         # Check type.
         ty = node.type.name[0].name
@@ -453,11 +483,11 @@ class uCIRGenerator(ast.NodeVisitor):
     def visit_Compound(self, node):
         if node.decls:
             for decl in node.decls:
-                self.visit(decl)
+                yield decl
         
         if node.stats:
             for stmt in node.stats:
-                self.visit(stmt)
+                yield stmt
 
     def visit_Constant(self, node):
         # Get type and check if is a string
@@ -486,7 +516,7 @@ class uCIRGenerator(ast.NodeVisitor):
         # Check for globals
         if self.fname == 'global':
             # Visit declaration
-            self.visit(node.type)
+            yield node.type
             
             # Check function ptr
             dec = node.type
@@ -520,7 +550,7 @@ class uCIRGenerator(ast.NodeVisitor):
             node.gen_location = node.type.gen_location
             
         elif self.alloc_phase:
-            self.visit(node.type)
+            yield node.type
             # Get gen_location
             node.gen_location = node.type.gen_location
         
@@ -547,7 +577,7 @@ class uCIRGenerator(ast.NodeVisitor):
                 self.code.append(inst)
             else:
                 # Visit initializers
-                self.visit(node.init)
+                yield node.init
                 name = node.init.gen_location
 
                 # Create opcode and append to instruction list
@@ -565,7 +595,7 @@ class uCIRGenerator(ast.NodeVisitor):
                 
     def visit_DeclList(self, node):
         for decl in node.decls:
-            self.visit(decl)
+            yield decl
     
     def visit_EmptyStatement(self, node):
         return
@@ -573,7 +603,7 @@ class uCIRGenerator(ast.NodeVisitor):
     def visit_ExprList(self, node):
         # Visit expressions
         for expr in node.exprs:
-            self.visit(expr)
+            yield expr
     
     def visit_For(self, node):
         # Add loop scope
@@ -592,13 +622,13 @@ class uCIRGenerator(ast.NodeVisitor):
         
         # Visit declarations
         if node.init:
-            self.visit(node.init)
+            yield node.init
         
         self.code += [inst, (label[1:],)]
         
         if node.cond:
             # Visit the condition
-            self.visit(node.cond)
+            yield node.cond
             
             # Create the opcode and append to list
             inst = ('cbranch', node.cond.gen_location, target_true, target_fake)
@@ -611,11 +641,11 @@ class uCIRGenerator(ast.NodeVisitor):
             
         # Visit loop
         if node.body:
-            self.visit(node.body)
+            yield node.body
         
         # Visit next
         if node.next:
-            self.visit(node.next)
+            yield node.next
 
         # Go back to the beginning.
         inst = ('jump', label)
@@ -631,7 +661,7 @@ class uCIRGenerator(ast.NodeVisitor):
     def visit_FuncCall(self, node):
         # Visit arguments.
         if node.args:
-            self.visit(node.args)
+            yield node.args
             
             # 1 vs multiple arguments
             if isinstance(node.args, ast.ExprList):
@@ -650,7 +680,7 @@ class uCIRGenerator(ast.NodeVisitor):
         
         # Get ptr if function ptr.
         if ty.name[0].name == 'ptr':
-            self.visit(node.name)
+            yield node.name
             name = node.name.gen_location
         else:
             name = '@' + node.name.name
@@ -675,7 +705,7 @@ class uCIRGenerator(ast.NodeVisitor):
         
         if self.fname != 'global':
             if node.params:
-                self.visit(node.params)
+                yield node.params
         
         # Add function node to global scope.
         self.scopes.add_global(var, var)
@@ -721,7 +751,7 @@ class uCIRGenerator(ast.NodeVisitor):
         
         # Visit function declaration (FuncDecl)
         self.alloc_phase = True
-        self.visit(node.decl.type)
+        yield node.decl.type
         
         # Visit body
         if node.body:
@@ -729,21 +759,21 @@ class uCIRGenerator(ast.NodeVisitor):
             # Allocate first, without init
             if node.body.decls:
                 for decl in node.body.decls:
-                    self.visit(decl)
+                    yield decl
                     
             # Visiting for declaration.
             # TODO: only works if the For is directly in function compound statement.
             if node.body.stats:
                 for stmt in node.body.stats:
                     if isinstance(stmt, ast.For) and isinstance(stmt.init, ast.DeclList):
-                        self.visit(stmt.init)
+                        yield stmt.init
             
             # Initiate params, decls and visit body.
             self.alloc_phase = False
             if par.params:
-                self.visit(par.params)
+                yield par.params
                 
-            self.visit(node.body)
+            yield node.body
         
         # Return label and return        
         # Void = no return, only label and return_void inst.
@@ -770,12 +800,14 @@ class uCIRGenerator(ast.NodeVisitor):
     
     def visit_GlobalDecl(self, node):
         for decl in node.decls:
-            self.visit(decl)
+            yield decl
     
     def visit_ID(self, node):
         # Get temporary with ID name.
-        var = self.scopes.fetch_temp(node)
-
+        self.load(node, self.scopes.fetch_temp(node))
+    
+    # Loads the value of a variable, at the temporary var.
+    def load(self, node, var):
         # Create a new temporary variable name 
         target = self.new_temp()
         
@@ -797,7 +829,7 @@ class uCIRGenerator(ast.NodeVisitor):
         target_else = self.new_temp()
         
         # Visit condition
-        self.visit(node.cond)
+        yield node.cond
 
         # Create the opcode and append to list
         inst = ('cbranch', node.cond.gen_location, target_then, target_else)
@@ -805,7 +837,7 @@ class uCIRGenerator(ast.NodeVisitor):
         
         # Create THEN
         self.code.append((target_then[1:],))
-        self.visit(node.if_stat)
+        yield node.if_stat
         
         # Create ELSE
         if node.else_stat:
@@ -813,7 +845,7 @@ class uCIRGenerator(ast.NodeVisitor):
             inst = ('jump', target_exit)
             self.code.append(inst)
             self.code.append((target_else[1:],))
-            self.visit(node.else_stat)
+            yield node.else_stat
             self.code.append((target_exit[1:],))
         else:
             self.code.append((target_else[1:],))
@@ -822,7 +854,7 @@ class uCIRGenerator(ast.NodeVisitor):
         node.gen_location = []
         for expr in node.exprs:
             if isinstance(expr, ast.InitList):
-                self.visit(expr)
+                yield expr
                 node.gen_location.append(expr.gen_location)
             else:
                 node.gen_location.append(expr.value)
@@ -831,7 +863,7 @@ class uCIRGenerator(ast.NodeVisitor):
         if self.alloc_phase:
             for par in node.params:
                 # Visit parameter (allocate vars)
-                self.visit(par)
+                yield par
         
         else:
             for i, par in enumerate(node.params or []):
@@ -851,7 +883,7 @@ class uCIRGenerator(ast.NodeVisitor):
                 exprs = [node.expr]
             
             for expr in exprs:
-                self.visit(expr)
+                yield expr
                 ty = self.build_reg_types(expr.type)
                 
                 # Load if ArrayRef
@@ -868,7 +900,7 @@ class uCIRGenerator(ast.NodeVisitor):
             self.code.append(inst)
             
     def visit_PtrDecl(self, node):
-        self.visit(node.type)
+        yield node.type
         node.gen_location = node.type.gen_location
     
     def visit_Read(self, node):
@@ -879,24 +911,23 @@ class uCIRGenerator(ast.NodeVisitor):
             exprs = [node.expr]
             
         for expr in exprs:
-            ty = self.build_reg_types(expr.type)
-            
             if isinstance(expr, ast.ID):
                 target = self.scopes.fetch_temp(expr)
-            elif isinstance(expr, ast.ArrayRef):
-                self.visit(expr)
-                ty += '_*'
-                target = expr.gen_location
             else:
-                self.visit(expr)
+                yield expr
                 target = expr.gen_location
+            
+            # Type, after the visit (which checks it, if fused)
+            ty = self.build_reg_types(expr.type)
+            if isinstance(expr, ast.ArrayRef):
+                ty += '_*'
             inst = ('read_' + ty, target)
             self.code.append(inst)
 
     def visit_Return(self, node):
         # If there is a return expression.
         if node.expr:
-            self.visit(node.expr)
+            yield node.expr
             expr_loc = node.expr.gen_location
             
             # Store return value in allocated variable
@@ -926,7 +957,7 @@ class uCIRGenerator(ast.NodeVisitor):
             return
         
         # Visit the expression
-        self.visit(node.expr)
+        yield node.expr
         expr_loc = node.expr.gen_location
         ty = self.build_reg_types(node.expr.type)
         
@@ -1014,7 +1045,7 @@ class uCIRGenerator(ast.NodeVisitor):
         target_fake = self.new_temp()
         
         # Visit the condition
-        self.visit(node.cond)
+        yield node.cond
 
         # Create the opcode and append to list
         inst = ('cbranch', node.cond.gen_location, target_true, target_fake)
@@ -1026,7 +1057,7 @@ class uCIRGenerator(ast.NodeVisitor):
         # Visit loop
         self.code.append((target_true[1:],))
         if node.body:
-            self.visit(node.body)
+            yield node.body
         
         # Go back to the beginning.
         inst = ('jump', label)
@@ -1046,10 +1077,10 @@ class uCIRGenerator(ast.NodeVisitor):
             # Stack recursion if ArraryRef of ArrayRef (x[y[i]])
             self.arr['stack'] += [self.arr['depth']]
             self.arr['depth'] = -1 
-            self.visit(node.subsc)
+            yield node.subsc
             self.arr['depth'] = self.arr['stack'].pop()
         else:
-            self.visit(node.subsc)
+            yield node.subsc
 
     def build_offset(self, node):
         ''' This function receives the root of a ArrayRef chain and creates
@@ -1059,7 +1090,7 @@ class uCIRGenerator(ast.NodeVisitor):
         '''
 
         if isinstance(node.name, ast.ArrayRef):
-            self.visit(node.name)
+            yield node.name
         else: # Recursion's Base
             self.arr['temp'] = self.scopes.fetch_temp(node.name)
             self.arr['type'] = self.build_reg_types(node.type)
@@ -1068,7 +1099,7 @@ class uCIRGenerator(ast.NodeVisitor):
 
         # Multiply index by dimension's elements size
         if self.arr['depth'] == 0:
-            self.build_index(node)
+            yield from self.build_index(node)
             result = node.subsc.gen_location
         else:
             # Load dimension's element size value
@@ -1079,7 +1110,7 @@ class uCIRGenerator(ast.NodeVisitor):
             self.code.append(literal)
 
             # Fetch array access index
-            self.build_index(node)
+            yield from self.build_index(node)
 
             # Multiply index and the dimension's element size
             result = self.new_temp()
@@ -1133,24 +1164,15 @@ class uCIRGenerator(ast.NodeVisitor):
     ## TYPE-RELATED FUNCTIONS ##
 
     def build_decl_types(self, node):
-        ptr = 0
-        name = ''
+        return self.build_decl_ctype(node).ir
+
+    # Canonical (interned) uCType of a declaration, with its dimensions (set
+    # by the semantic check, on its Type).
+    def build_decl_ctype(self, node):
         ty = node
-        
-        # Identify modifiers.
-        while not isinstance(ty, ast.VarDecl):
-            if isinstance(ty, ast.ArrayDecl):
-                name += f'_{ty.dims.value}'  
-            elif isinstance(ty, ast.PtrDecl):
-                ptr += 1
+        while not isinstance(ty, ast.Type):
             ty = ty.type
-        
-        # Ptrs
-        if ptr > 0:
-            name += ('_*'*ptr)
-        
-        name = ty.type.name[-1].name + name
-        return name
+        return ty.ctype
     
     def build_reg_types(self, ty):
         return ty.name[-1].name
@@ -1165,3 +1187,308 @@ class uCIRGenerator(ast.NodeVisitor):
             else:
                 name += item.name
         return name
+
+# Visit method of a visitor class for a node class (see NodeVisitor.visit).
+def _method(visitor, node_class):
+    return visitor._dispatch.get(node_class) or visitor._compile(node_class)
+
+class uCFusedGenerator(uCIRGenerator):
+    '''
+    IR generation fused with the semantic check: a single traversal of the
+    AST checks each node (with the front end, an uCSemanticCheck) and then
+    generates its code, sharing the scopes of the check (SharedScopeStack).
+    The code is the same as uCIRGenerator's after a separate check.
+    Where the two visit the children of a node in a different order, the
+    generator's is followed (e.g. the assigned value before the assigned
+    expression), so the first error found (raised as an AssertionError, the
+    check must not recover) may not be the one a separate check finds.
+    Declarators (VarDecl, ArrayDecl...) and the names that aren't loaded are
+    checked, and then generated, apart: they are a few nodes, without code.
+    Atributes:
+        - sema: the semantic check (the front end)
+        - inits: code of the initializers of the function's declarations,
+          generated with their allocation, until the body is
+        - hoisted: declarations of the loops (For.init) allocated with the
+          function's variables
+        - allocs: allocations of the variables of those loops
+        - slot: position of the allocations in the code
+        - target: where the declarations being visited are allocated
+    '''
+    def __init__(self, front_end=None):
+        super(uCFusedGenerator, self).__init__(front_end)
+        self.sema = front_end
+        self.scopes = SharedScopeStack(front_end.scopes.chain)
+        self.inits = dict()
+        self.hoisted = set()
+        self.allocs = []
+        self.slot = None
+        self.target = None
+
+    # Checks the AST and generates its code, in a single traversal.
+    def translate(self, ast):
+        self.visit(ast)
+
+    # Checks and generates a node, visiting each of its children once.
+    # The check goes first, waiting for the children the generator visits
+    # before the ones it asks for. Type nodes and the private children
+    # (the ones the generator doesn't visit, or only visits to load them)
+    # are checked apart, when the check asks for them.
+    def fuse(self, node, private=()):
+        check = _method(type(self.sema), node.__class__)(self.sema, node)
+        if type(check) is not GeneratorType:
+            check = ()
+        emit = ahead = None
+        for child in check:
+            if ahead and child in ahead:
+                continue
+            if child.__class__ is ast.Type or child in private:
+                self.sema.visit(child)
+                continue
+            if emit is None:
+                emit = self.emit(node)
+            for other in emit:
+                if other is child:
+                    yield child
+                    break
+                if other in private:
+                    self.generate(other)
+                else:
+                    ahead = ahead or []
+                    ahead.append(other)
+                    yield other
+            else: # Not visited by the generator
+                self.sema.visit(child)
+        for other in emit if emit is not None else self.emit(node):
+            self.generate(other)
+
+    # Visit of the generator (children to visit, if any).
+    def emit(self, node):
+        result = _method(uCIRGenerator, node.__class__)(self, node)
+        return result if type(result) is GeneratorType else ()
+
+    # Generates the code of a node that was checked.
+    def generate(self, node):
+        for child in self.emit(node):
+            self.generate(child)
+
+    # Checks and generates a local declaration, allocated in allocs (None: not
+    # allocated, as the declarations of inner blocks). Its declarator is
+    # allocated before the initializer is visited, as it may use it, but
+    # after the check of an array's (which may give its size).
+    def declare(self, node, allocs):
+        array = isinstance(node.type, ast.ArrayDecl)
+        allocated = False
+        for child in self.sema.visit_Decl(node):
+            if child is node.init and not array:
+                self.allocate(node, allocs)
+                allocated = True
+                yield child
+            else:
+                self.sema.visit(child)
+        if not allocated:
+            self.allocate(node, allocs)
+        
+        # Initialize (the string of a char array is still to be generated).
+        phase, self.alloc_phase = self.alloc_phase, False
+        for child in self.emit(node):
+            if array or child is not node.init:
+                self.generate(child)
+        self.alloc_phase = phase
+
+    def allocate(self, node, allocs):
+        if allocs is None:
+            return
+        code, self.code = self.code, allocs
+        phase, self.alloc_phase = self.alloc_phase, True
+        self.generate(node)
+        self.code, self.alloc_phase = code, phase
+
+    def visit_Program(self, node):
+        # Visited in the order of the source, as the check needs: the code
+        # is the same (global variables are kept apart from the functions').
+        emit = self.emit(node)
+        next(emit, None)
+        yield from self.sema.visit_Program(node)
+        
+        # Global declarations and functions, already visited.
+        for _ in emit:
+            pass
+
+    def visit_ArrayRef(self, node):
+        # The array's name isn't loaded.
+        private = (node.name,) if isinstance(node.name, ast.ID) else ()
+        return self.fuse(node, private)
+
+    def visit_Constant(self, node):
+        self.sema.visit_Constant(node)
+        uCIRGenerator.visit_Constant(self, node)
+
+    def visit_Decl(self, node):
+        # A declaration of the function's body, allocated and initialized.
+        code = self.inits.pop(node, None)
+        if code is not None:
+            self.code += code
+        
+        # Globals are initialized with constants (no code).
+        elif self.fname == 'global':
+            self.sema.visit(node)
+            self.generate(node)
+        else:
+            yield from self.declare(node, self.target)
+
+    def visit_DeclList(self, node):
+        # Declarations of a loop, allocated with the function's variables if hoisted.
+        target, self.target = self.target, (self.allocs if node in self.hoisted else None)
+        yield from self.fuse(node)
+        self.target = target
+
+    def visit_Assignment(self, node):
+        # The assigned variable isn't loaded (unless to operate on it): with a
+        # known address, the left value is checked, then generated once the
+        # right value is (only if the operator needs its value).
+        if not self.addressed(node.lvalue):
+            return self.fuse(node)
+        return self.assignment(node)
+
+    def assignment(self, node):
+        sema = self.sema
+        if node.lvalue.__class__ is ast.ID:
+            sema.visit_ID(node.lvalue)
+        else:
+            sema.visit(node.lvalue)
+        sema.check_assignable(node)
+        yield node.rvalue
+        sema.check_assigned(node)
+        self.load_ref(node.rvalue)
+        if node.op != '=':
+            self.generate(node.lvalue)
+        self.assign(node)
+
+    def visit_Assert(self, node):
+        # The condition is checked as soon as it is generated.
+        emit = uCIRGenerator.visit_Assert(self, node)
+        yield next(emit)
+        self.sema.boolean_check(node.expr)
+        yield from emit
+
+    def visit_BinaryOp(self, node):
+        # Each operand is checked, then loaded.
+        sema = self.sema
+        yield node.lvalue
+        sema.check_operand(node.lvalue)
+        self.load_ref(node.lvalue)
+        yield node.rvalue
+        sema.check_operand(node.rvalue)
+        self.load_ref(node.rvalue)
+        sema.check_binary_op(node)
+        self.binary_op(node)
+
+    def visit_FuncCall(self, node):
+        # The function's name isn't loaded (unless a pointer).
+        return self.fuse(node, (node.name,))
+
+    def visit_FuncDef(self, node):
+        # The function's header is checked first (its types make the
+        # definition), before any of its code is generated. Then its variables
+        # are allocated, before the body, as the generator does: the
+        # declarations of the body are checked then, and the code of their
+        # initializers is kept until the body's turn.
+        # The loops declaring variables are checked within the body, and
+        # their variables allocated with the others (see visit_DeclList).
+        check = self.sema.visit_FuncDef(node)
+        for child in check:
+            if child is node.body:
+                break
+            self.sema.visit(child)
+
+        # Not a function's declarator (e.g. an array of functions): there is
+        # no code for it, the check of the whole definition must reject it.
+        if not isinstance(node.decl.type, ast.FuncDecl):
+            if node.body:
+                self.sema.visit(node.body)
+            for child in check:
+                self.sema.visit(child)
+
+        emit = self.emit(node)
+        if node.body:
+            self.hoisted, self.allocs, self.slot = set(), [], None
+            for other in emit:
+                if other is node.body:
+                    break
+                if isinstance(other, ast.Decl):
+                    code, self.code = self.code, []
+                    yield from self.declare(other, code)
+                    self.inits[other] = self.code
+                    self.code = code
+                elif isinstance(other, ast.DeclList):
+                    self.hoisted.add(other)
+                    if self.slot is None:
+                        self.slot = len(self.code)
+                else: # Parameters: allocated, then stored
+                    self.generate(other)
+            yield node.body
+        for child in check:
+            self.sema.visit(child)
+        
+        # Return, then the allocations of the loops' variables.
+        for other in emit:
+            self.generate(other)
+        if self.allocs:
+            self.code[self.slot:self.slot] = self.allocs
+
+    def visit_ID(self, node):
+        self.sema.visit_ID(node)
+        self.load(node, self.scopes.fetch_temp(node))
+
+    def visit_If(self, node):
+        # The condition is checked as soon as it is generated.
+        emit = uCIRGenerator.visit_If(self, node)
+        yield next(emit)
+        self.sema.boolean_check(node.cond)
+        yield from emit
+
+    def visit_InitList(self, node):
+        # Only the nested lists are visited by the generator.
+        return self.fuse(node, tuple(expr for expr in node.exprs if not isinstance(expr, ast.InitList)))
+
+    def visit_Print(self, node):
+        # Expressions are generated one by one (not as an ExprList), and the
+        # check only visits them.
+        return self.emit(node)
+
+    def visit_Read(self, node):
+        # Variables read into aren't loaded.
+        exprs = node.expr.exprs if isinstance(node.expr, ast.ExprList) else [node.expr]
+        for expr in exprs:
+            if isinstance(expr, ast.ID):
+                self.sema.visit(expr)
+        
+        # The others are generated one by one (not as an ExprList).
+        yield from self.emit(node)
+        for _ in self.sema.visit_Read(node):
+            pass
+
+    def visit_UnaryOp(self, node):
+        # The address of a variable doesn't load it.
+        if node.op == '&' and isinstance(node.expr, ast.ID):
+            return self.fuse(node, (node.expr,))
+        return self.fuse(node)
+
+    def visit_While(self, node):
+        # The condition is checked as soon as it is generated, in the loop's
+        # scope.
+        emit = uCIRGenerator.visit_While(self, node)
+        self.sema.scopes.add_scope()
+        yield next(emit)
+        self.sema.boolean_check(node.cond)
+        yield from emit
+        self.sema.scopes.pop_scope()
+
+    # The others are fused as they are (a loop's next is generated after its
+    # body, see fuse).
+    visit_Break = visit_Cast = visit_EmptyStatement = visit_For = \
+    visit_GlobalDecl = visit_Return = fuse
+
+    # Neither checked nor generated beyond their children.
+    visit_Compound = uCIRGenerator.visit_Compound
+    visit_ExprList = uCIRGenerator.visit_ExprList
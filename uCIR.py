@@ -0,0 +1,236 @@
+'''
+Second Project (extra): uCIR instructions, with their opcodes decoded once.
+
+An instruction is a tuple (opcode, *operands), as the generator emits it,
+e.g. ('add_int', '%1', '%2', '%3'), ('store_int_*', '%4', '%5') or ('3',)
+for a label. The opcode string encodes the operation, the type of the
+operands and its modifiers (array dimensions and pointers): decode() parses
+it into an Opcode, once per distinct opcode (the decoded opcodes are
+interned), so the back end (CFG, dataflow, optimizer, interpreter and LLVM
+translation) doesn't split the string again at each visit.
+The operands can also be numbered (number): the registers become dense
+integers of each function and the globals indices of a symbol table, so a
+stage keeps them in lists instead of dictionaries of names.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+from enum import IntEnum
+
+class Op(IntEnum):
+    ''' Operations of the uCIR (first part of an opcode). '''
+    LABEL = 0
+    # Variables & Values
+    ALLOC = 1
+    GLOBAL = 2
+    LOAD = 3
+    STORE = 4
+    LITERAL = 5
+    ELEM = 6
+    GET = 7
+    # Binary Operations
+    ADD = 8
+    SUB = 9
+    MUL = 10
+    DIV = 11
+    MOD = 12
+    # Cast Operations
+    FPTOSI = 13
+    SITOFP = 14
+    # Relational/Equality/Logical
+    LT = 15
+    LE = 16
+    GE = 17
+    GT = 18
+    EQ = 19
+    NE = 20
+    AND = 21
+    OR = 22
+    NOT = 23
+    # Labels & Branches
+    JUMP = 24
+    CBRANCH = 25
+    # Functions & Builtins
+    DEFINE = 26
+    CALL = 27
+    RETURN = 28
+    PARAM = 29
+    READ = 30
+    PRINT = 31
+
+BINARY = frozenset((Op.ADD, Op.SUB, Op.MUL, Op.DIV, Op.MOD))
+RELATIONAL = frozenset((Op.LT, Op.LE, Op.GE, Op.GT, Op.EQ, Op.NE, Op.AND, Op.OR, Op.NOT))
+
+# Operations run (and named) without their type by the interpreter.
+_UNTYPED = frozenset((Op.FPTOSI, Op.SITOFP, Op.LABEL, Op.JUMP, Op.CBRANCH, Op.DEFINE, Op.CALL))
+
+# Operands (positions in the instruction) each operation uses and defines.
+_USES = dict.fromkeys((Op.ELEM,) + tuple(BINARY) + tuple(RELATIONAL), (1, 2))
+_USES.update(dict.fromkeys((Op.STORE, Op.LOAD, Op.GET, Op.FPTOSI, Op.SITOFP, Op.PARAM,
+                            Op.PRINT, Op.RETURN, Op.CBRANCH, Op.CALL, Op.READ), (1,)))
+_DEFINES = dict.fromkeys((Op.ELEM,) + tuple(BINARY) + tuple(RELATIONAL), (3,))
+_DEFINES.update(dict.fromkeys((Op.STORE, Op.LOAD, Op.LITERAL, Op.GET, Op.FPTOSI, Op.SITOFP,
+                               Op.CALL), (2,)))
+
+class Opcode():
+    '''
+    Decoded opcode of an instruction (see decode).
+    Atributes:
+        - opcode: the opcode string, e.g. 'store_int_10_*'
+        - op: the operation (Op), None if unknown
+        - name: first part of the opcode ('store'; a label's name)
+        - type: type of the operands ('int'), None if untyped
+        - dims: array dimensions, as integers ((10,))
+        - ptr: whether the opcode is on a pointer ('*')
+        - modifier: dimensions and pointers by position, as the interpreter
+          and the translator receive them ({'dim0': '10', 'ptr1': '*'})
+        - operation: name of the interpreter's run_ method ('store_int')
+        - uses: positions of the operands used
+        - defines: positions of the operands defined
+    '''
+    __slots__ = ('opcode', 'op', 'name', 'type', 'dims', 'ptr', 'modifier', 'operation',
+                 'uses', 'defines')
+
+    def __init__(self, opcode):
+        parts = opcode.split('_')
+        self.opcode = opcode
+        self.name = parts[0]
+        self.op = Op.LABEL if self.name.isdigit() else Op.__members__.get(self.name.upper())
+        self.type = parts[1] if len(parts) > 1 else None
+        self.modifier = {}
+        for i, part in enumerate(parts[2:]):
+            if part.isdigit():
+                self.modifier['dim' + str(i)] = part
+            elif part == '*':
+                self.modifier['ptr' + str(i)] = part
+        self.dims = tuple(int(part) for part in parts[2:] if part.isdigit())
+        self.ptr = '*' in parts[2:]
+        if self.op in _UNTYPED:
+            self.operation = self.name
+        else:
+            self.operation = '_'.join(parts[:2])
+
+        # Storing through a pointer uses both operands.
+        if self.op == Op.STORE and self.ptr:
+            self.uses, self.defines = (1, 2), ()
+        else:
+            self.uses, self.defines = _USES.get(self.op, ()), _DEFINES.get(self.op, ())
+
+    def __repr__(self):
+        return f"Opcode({self.opcode!r})"
+
+_opcodes = {}
+
+# Decoded opcode of an opcode string (interned).
+def decode(opcode):
+    code = _opcodes.get(opcode)
+    if code is None:
+        code = _opcodes[opcode] = Opcode(opcode)
+    return code
+
+# Operands of an instruction at the given positions (none if it is shorter).
+def operands(inst, positions):
+    if not positions or len(inst) <= positions[-1]:
+        return []
+    return [inst[i] for i in positions]
+
+class NumberedIR():
+    '''
+    uCIR whose operands are integers (see number). The instructions are
+    tuples (Opcode, *operands): a register is a dense index in the registers
+    of its function, and a global (a variable, constant or function) is the
+    complement (~index, a negative integer) of its index in the symbol table.
+    A label is (Opcode, register), the register that jumps to it name.
+    The names are only needed to print the code again (see render).
+    Atributes:
+        - code: the numbered instructions
+        - symbols: names of the globals ('@main', '@.str.0'), by index
+        - registers: names of the registers of each function, by the index
+          of its symbol (None if the symbol isn't a function). The register 0
+          is always '%0', the return value of main in the interpreter.
+    '''
+    def __init__(self, code, symbols, registers):
+        self.code = code
+        self.symbols = symbols
+        self.registers = registers
+
+    # Index of a symbol, in the operands (None if it isn't defined).
+    def symbol(self, name):
+        try:
+            return ~self.symbols.index(name)
+        except ValueError:
+            return None
+
+    # Number of registers of a function (operand).
+    def size(self, function):
+        return len(self.registers[~function])
+
+    # The code with the names of the operands, as it was generated.
+    def render(self):
+        symbols = self.symbols
+        names = None
+        name = lambda operand: symbols[~operand] if operand < 0 else names[operand]
+        code = []
+        for inst in self.code:
+            opcode, op = inst[0], inst[0].op
+            if op == Op.DEFINE:
+                names = self.registers[~inst[1]]
+                code.append((opcode.opcode, name(inst[1]), [(ty, names[reg]) for ty, reg in inst[2]]))
+            elif op == Op.LABEL:
+                code.append((opcode.opcode,))
+            elif op == Op.LITERAL:
+                code.append((opcode.opcode, inst[1], name(inst[2])))
+            elif op == Op.GLOBAL:
+                code.append((opcode.opcode, name(inst[1])) + inst[2:])
+            else:
+                code.append((opcode.opcode,) + tuple(name(operand) for operand in inst[1:]))
+        return code
+
+# Numbers the operands of a uCIR: the registers ('%3', '%x' and the labels)
+# in the order they appear in each function, and the globals ('@x') in the
+# order they appear in the code (see NumberedIR).
+def number(code):
+    symbols, registers = [], []
+    indexes = {}
+    local, names = None, None
+
+    def operand(name):
+        if name[0] == '@':
+            index = indexes.get(name)
+            if index is None:
+                index = indexes[name] = ~len(symbols)
+                symbols.append(name)
+                registers.append(None)
+            return index
+        if local is None:
+            raise ValueError(f"register {name} outside of a function")
+        reg = local.get(name)
+        if reg is None:
+            reg = local[name] = len(names)
+            names.append(name)
+        return reg
+
+    numbered = []
+    for inst in code:
+        opcode = decode(inst[0])
+        op = opcode.op
+        if op == Op.DEFINE:
+            function = operand(inst[1])
+            local, names = {'%0': 0}, ['%0']
+            registers[~function] = names
+            numbered.append((opcode, function, [(ty, operand(reg)) for ty, reg in inst[2]]))
+        elif op == Op.LABEL:
+            numbered.append((opcode, operand('%' + inst[0])))
+        elif op == Op.LITERAL:
+            numbered.append((opcode, inst[1], operand(inst[2])))
+        elif op == Op.GLOBAL:
+            numbered.append((opcode, operand(inst[1])) + tuple(inst[2:]))
+        else:
+            numbered.append((opcode,) + tuple(operand(name) for name in inst[1:]))
+    return NumberedIR(numbered, symbols, registers)
@@ -24,7 +24,8 @@ Modified by:
 Modifications from source:
     Changed class name;
     Added generator and test method;
-    Compatibility change for labels.
+    Compatibility change for labels;
+    Registers & globals numbered (kept in lists, see uCIR.number).
 
 University of Campinas - UNICAMP - 2020
 
@@ -32,7 +33,9 @@ Last Modified: 09/07/2020.
 '''
 
 import sys
+from functools import partial
 from os.path import exists
+from uCIR import Op, NumberedIR, number
 
 class uCIRInterpreter(object):
     """
@@ -55,6 +58,8 @@ class uCIRInterpreter(object):
              self.run_add_int('%1', '%2', '%3')
              self.run_print_int('%3')
 
+    with the registers numbered (see uCIR.number): run_literal_int(1, 1).
+
     Instructions for use:
         1. Instantiate an object of the Interpreter class
         2. Call the run method of this object passing the produced
@@ -66,8 +71,8 @@ class uCIRInterpreter(object):
         inputline = []
         M = 10000 * [None]      # Memory for global & local vars
 
-        self.globals = {}       # Dictionary of address of global vars & constants
-        self.vars = {}          # Dictionary of address of local vars relative to sp
+        self.globals = []       # Address of global vars & constants, by symbol
+        self.vars = []          # Address of local vars (registers), by register
 
         self.offset = 0         # offset (index) of local & global vars. Note that
                                 # each instance of var has absolute address in Memory
@@ -82,7 +87,9 @@ class uCIRInterpreter(object):
 
         self.pc = 0             # Program Counter
         self.start = 0          # PC of the main function
+        self.main = None        # Symbol of the main function
         self.code = None
+        self.program = None     # Code with numbered registers (see uCIR.number)
         
         self.generator = generator
 
@@ -104,19 +111,8 @@ class uCIRInterpreter(object):
         self.run(self.generator.code)
 
     def _extract_operation(self, source):
-        _modifier = {}
-        _aux = source.split('_')
-        if _aux[0] not in {'fptosi', 'sitofp', 'label', 'jump', 'cbranch',
-                           'define', 'call'}:
-            _opcode = _aux[0] + '_' + _aux[1]
-            for i, _val in enumerate(_aux[2:]):
-                if _val.isdigit():
-                    _modifier['dim' + str(i)] = _val
-                elif _val == '*':
-                    _modifier['ptr' + str(i)] = _val
-        else:
-            _opcode = _aux[0]
-        return (_opcode, _modifier)
+        # Decoded once per opcode (see uCIR.decode)
+        return (source.operation, source.modifier)
 
     def _copy_data(self, address, size, value):
         if isinstance(value, str):
@@ -130,13 +126,21 @@ class uCIRInterpreter(object):
     def run(self, ircode):
         """
         Run intermediate code in the interpreter.  ircode is a list
-        of instruction tuples.  Each instruction (opcode, *args) is
-        dispatched to a method self.run_opcode(*args)
+        of instruction tuples (or the code numbered, see uCIR.number).
+        Each instruction (opcode, *args) is dispatched to a method
+        self.run_opcode(*args), with the registers numbered.
         """
 
+        # Registers and globals are numbered, to be kept in lists
+        if not isinstance(ircode, NumberedIR):
+            ircode = number(ircode)
+        self.program = ircode
+        self.main = ircode.symbol('@main')
+        self.globals = len(ircode.symbols) * [None]
+        ircode = self.code = ircode.code
+
         # First, store the global vars & constants
         # Also, set the start pc to the main function entry
-        self.code = ircode
         self.pc = 0
         self.offset = 0
         while True:
@@ -144,10 +148,10 @@ class uCIRInterpreter(object):
                 op = ircode[self.pc]
             except IndexError:
                 break
-            if len(op) > 1:  # that is, not label
+            if op[0].op != Op.LABEL:
                 opcode, modifier = self._extract_operation(op[0])
-                if opcode.startswith('global'):
-                    self.globals[op[1]] = self.offset
+                if op[0].op == Op.GLOBAL:
+                    self.globals[~op[1]] = self.offset
                     # get the size of global var
                     if not modifier:
                         # size equals 1 or is a constant, so we use only
@@ -163,31 +167,44 @@ class uCIRInterpreter(object):
                         if len(op) == 3:
                             self._copy_data(self.offset, _len, op[2])
                         self.offset += _len
-                elif opcode.startswith('define'):
-                        self.globals[op[1]] = self.offset
+                elif op[0].op == Op.DEFINE:
+                        self.globals[~op[1]] = self.offset
                         M[self.offset] = self.pc
                         self.offset += 1
-                        if op[1] == '@main':
+                        if op[1] == self.main:
                             self.start = self.pc
             self.pc += 1
 
         # Now, running the program starting from the main function
+        if self.main is not None:
+            self.vars = self.program.size(self.main) * [None]
         self.pc = self.start
+        _methods = {}
         while True:
             try:
                 op = ircode[self.pc]
             except IndexError:
                 break
             self.pc += 1
-            if len(op) > 1 or op[0] == 'return_void':
-                opcode, modifier = self._extract_operation(op[0])
-                if hasattr(self, "run_" + opcode):
-                    if not modifier:
-                        getattr(self, "run_" + opcode)(*op[1:])
-                    else:
-                        getattr(self, "run_" + opcode + '_')(*op[1:], **modifier)
+            if op[0].op != Op.LABEL and (len(op) > 1 or op[0].opcode == 'return_void'):
+                # the method of each opcode is looked up once
+                try:
+                    _run = _methods[op[0]]
+                except KeyError:
+                    _run = _methods[op[0]] = self._method(op[0])
+                if _run is not None:
+                    _run(*op[1:])
                 else:
-                    print("Warning: No run_" + opcode + "() method", flush=True)
+                    print("Warning: No run_" + op[0].operation + "() method", flush=True)
+
+    def _method(self, source):
+        # Method that runs an opcode, with its modifiers (None if there isn't one)
+        opcode, modifier = self._extract_operation(source)
+        if not hasattr(self, "run_" + opcode):
+            return None
+        if not modifier:
+            return getattr(self, "run_" + opcode)
+        return partial(getattr(self, "run_" + opcode + '_'), **modifier)
 
     #
     # Auxiliary methods
@@ -199,27 +216,27 @@ class uCIRInterpreter(object):
         while True:
             try:
                 _op = self.code[_lpc]
-                _opcode = _op[0]
+                _opcode = _op[0].op
                 _lpc += 1
-                if _opcode.startswith('define'):
+                if _opcode == Op.DEFINE:
                     break
-                elif len(_op) == 1 and _opcode != 'return_void':
-                    # labels don't go to memory, just store the pc on dictionary
-                    # labels appears as name:, so we need to extract just the name
-                    self.vars['%' + _opcode] = _lpc
+                elif _opcode == Op.LABEL:
+                    # labels don't go to memory, just store the pc on its
+                    # register (the one the jumps to it use)
+                    self.vars[_op[1]] = _lpc
             except IndexError:
                 break
 
     def _alloc_reg(self, target):
-        # Alloc space in memory and save the offset in the dictionary
+        # Alloc space in memory and save the offset in the register
         # for new vars or temporaries, only.
-        if target not in self.vars:
+        if self.vars[target] is None:
             self.vars[target] = self.offset
             self.offset += 1
 
     def _get_address(self, source):
-        if source.startswith('@'):
-            return self.globals[source]
+        if source < 0:
+            return self.globals[~source]
         else:
             return self.vars[source]
 
@@ -234,8 +251,8 @@ class uCIRInterpreter(object):
             inputline = inputline[:-1].strip().split()
 
     def _get_value(self, source):
-        if source.startswith('@'):
-            return M[self.globals[source]]
+        if source < 0:
+            return M[self.globals[~source]]
         else:
             return M[self.vars[source]]
 
@@ -244,15 +261,15 @@ class uCIRInterpreter(object):
         self.offset += size
         self._store_multiple_values(size, target, varname)
 
-    def _push(self, locs):
+    def _push(self, locs, size):
         # save the addresses of the vars from caller & their last offset
         self.stack.append(self.vars)
         self.sp.append(self.offset)
 
-        # clear the dictionary of caller local vars and their offsets in memory
+        # clear the registers of caller local vars and their offsets in memory
         # and copy the parameters passed to the callee in their local vars.
         # Finally, cleanup the parameters list used to transfer these vars
-        self.vars = {}
+        self.vars = size * [None]
         for idx, val in enumerate(self.params):
             # Note that arrays (size >=1) are passed by reference only.
             self.vars[locs[idx]] = self.offset
@@ -285,15 +302,15 @@ class uCIRInterpreter(object):
                 sys.exit(M[target])
 
     def _store_deref(self, target, value):
-        if target.startswith('@'):
-            M[M[self.globals[target]]] = value
+        if target < 0:
+            M[M[self.globals[~target]]] = value
         else:
             M[M[self.vars[target]]] = value
 
     def _store_multiple_values(self, dim, target, value):
         _left = self._get_address(target)
         _right = self._get_address(value)
-        if value.startswith('@'):
+        if value < 0:
             if isinstance(M[_right], str):
                 _value = list(M[_right])
                 M[_left:_left+dim] = _value
@@ -301,8 +318,8 @@ class uCIRInterpreter(object):
         M[_left:_left+dim] = M[_right:_right+dim]
 
     def _store_value(self, target, value):
-        if target.startswith('@'):
-            M[self.globals[target]] = value
+        if target < 0:
+            M[self.globals[~target]] = value
         else:
             M[self.vars[target]] = value
 
@@ -335,8 +352,8 @@ class uCIRInterpreter(object):
         # save the return pc in the return stack
         self.returns.append(self.pc)
         # jump to the calle function
-        if source.startswith('@'):
-            self.pc = M[self.globals[source]]
+        if source < 0:
+            self.pc = M[self.globals[~source]]
         else:
             self.pc = M[self.vars[source]]
 
@@ -348,16 +365,16 @@ class uCIRInterpreter(object):
 
     # Enter the function
     def run_define(self, source, args):
-        if source == '@main':
-            # alloc register to the return value but not initialize it.
+        if source == self.main:
+            # alloc register to the return value ('%0') but not initialize it.
             # We use the "None" value to check if main function returns void.
-            self._alloc_reg('%0')
+            self._alloc_reg(0)
             # alloc the labels with respective pc's
             self._alloc_labels()
         else:
             # extract the location names of function args
             _locs = [el[1] for el in args]
-            self._push(_locs)
+            self._push(_locs, self.program.size(source))
             
     def run_elem_int(self, source, index, target):
         self._alloc_reg(target)
@@ -505,7 +522,7 @@ class uCIRInterpreter(object):
     run_return_char = run_return_int
 
     def run_return_void(self):
-        self._pop(M[self.vars['%0']])
+        self._pop(M[self.vars[0]])
 
     def run_store_int(self, source, target):
         self._store_value(target, self._get_value(source))
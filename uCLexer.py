@@ -13,7 +13,216 @@ Last Modified: 27/04/2020.
 '''
 
 import ply.lex as lex
-from os.path import exists
+import os
+from os.path import exists, join
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from array import array
+from functools import partial
+from locale import getpreferredencoding
+import codecs
+import io
+import mmap
+import uCCache
+
+class TokenArrays():
+    '''Compact token stream, built by uCLexer.tokenize_all.
+    Tokens are stored in parallel arrays instead of one LexToken per token:
+        - kinds: kind id of each token (index in names)
+        - starts: offset where each token begins in the input
+        - lines: line number of each token
+        - values: index of each token value in the interned table
+    Atributes:
+        - table: distinct token values, one entry per distinct lexeme
+        - line_starts: offset where each line of the input begins
+    '''
+    __slots__ = ('names', 'kinds', 'starts', 'lines', 'values', 'table',
+                 'line_starts', 'table_kinds', 'interned', 'cursor')
+
+    def __init__(self, names):
+        self.names = names
+        self.kinds = array('H')
+        self.starts = array('q')
+        self.lines = array('l')
+        self.values = array('l')
+        self.table = []
+        self.line_starts = array('q', [0])
+        self.table_kinds = []   # Kind of each table entry
+        self.interned = {}      # Lexeme => table index
+        self.cursor = 0         # Next token returned by token()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # Even if empty: yacc replaces a false lexer by its default one.
+    def __bool__(self):
+        return True
+
+    def type(self, i):
+        return self.names[self.kinds[i]]
+
+    def value(self, i):
+        return self.table[self.values[i]]
+
+    # Parser interface (same as uCLexer): tokens are only created on demand.
+    def rewind(self):
+        self.cursor = 0
+
+    def token(self):
+        i = self.cursor
+        if i >= len(self.kinds):
+            return None
+        self.cursor = i + 1
+        tok = lex.LexToken()
+        tok.type = self.names[self.kinds[i]]
+        tok.value = self.table[self.values[i]]
+        tok.lineno = self.lines[i]
+        tok.lexpos = self.starts[i]
+        return tok
+
+    def find_column(self, lexpos):
+        starts = self.line_starts
+        return lexpos - starts[bisect_right(starts, lexpos) - 1] + 1
+
+    # Tokens first to last (exclusive), sharing the table and line starts.
+    def slice(self, first, last):
+        out = TokenArrays(self.names)
+        out.kinds = self.kinds[first:last]
+        out.starts = self.starts[first:last]
+        out.lines = self.lines[first:last]
+        out.values = self.values[first:last]
+        out.table, out.table_kinds, out.interned = self.table, self.table_kinds, self.interned
+        out.line_starts = self.line_starts
+        return out
+
+class TokenStream(TokenArrays):
+    '''Token stream lexed lazily from a file, built by uCLexer.stream.
+    Only the current chunk of the source and its tokens are kept: once all
+    of them were read, the arrays are refilled by scanning the next chunk.
+    Tokens crossing a chunk boundary are left in pending and scanned again
+    with the following chunk, so the buffer is bounded by the chunk size
+    plus the largest token.
+    Atributes:
+        - scan: scanner of the lexer (uCLexer._scan)
+        - chunks: iterator over the decoded text chunks of the file
+        - pending: text not scanned yet (at most an unfinished token)
+        - base: offset of pending in the whole input
+        - lineno: line number at the start of pending
+    '''
+    __slots__ = ('scan', 'chunks', 'pending', 'base', 'lineno', 'done')
+
+    def __init__(self, names, scan, chunks):
+        super().__init__(names)
+        self.scan = scan
+        self.chunks = chunks
+        self.pending = ''
+        self.base = 0
+        self.lineno = 1
+        self.done = False
+
+    def token(self):
+        if self.cursor >= len(self.kinds) and not self._refill():
+            return None
+        return TokenArrays.token(self)
+
+    # Scans the next chunks until there are new tokens, dropping the ones
+    # already read. Returns False when the whole file was scanned.
+    def _refill(self):
+        for tokens in (self.kinds, self.starts, self.lines, self.values):
+            del tokens[:]
+        self.cursor = 0
+
+        while not self.kinds:
+            if self.done:
+                return False
+            chunk = next(self.chunks, None)
+            self.done = chunk is None
+            data = self.pending + chunk if chunk else self.pending
+            pos, self.lineno = self.scan(data, self, 0, self.lineno, self.done, self.base)
+            self.pending = data[pos:]
+            self.base += pos
+        return True
+
+class TokenBuffer(TokenArrays):
+    '''Token stream of an edited source buffer, built by uCLexer.tokenize_buffer.
+    An edit only rescans the text from the last token before it, until the
+    new tokens resynchronize with the old ones after it. The tokens after
+    that point are kept, with their offsets and lines shifted.
+    Atributes:
+        - scan: scanner of the lexer (uCLexer._scan)
+        - text: current text of the buffer
+    '''
+    __slots__ = ('scan', 'text')
+
+    window = 256 # First amount of text scanned past an edit
+
+    def __init__(self, names, scan, text):
+        super().__init__(names)
+        self.scan = scan
+        self.text = text
+
+    # Replaces deleted characters at offset by inserted, relexing as little
+    # as possible. Returns the range of token indices that were rescanned.
+    def edit(self, offset, deleted, inserted):
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+        starts, line_starts = self.starts, self.line_starts
+
+        # Restart from the last token starting before the edit. Lexemes
+        # before it never look past its start, so they are unchanged.
+        first = bisect_left(starts, offset) - 1
+        if first >= 0:
+            pos, lineno = starts[first], self.lines[first]
+        else:
+            first, pos, lineno = 0, 0, 1
+        keep = bisect_right(line_starts, pos)
+
+        # Scan windows of growing size, sharing the interned table, until
+        # a new token starts at the (shifted) start of an old token after
+        # the edit: from there on the text, and so the tokens, are the same.
+        out = TokenArrays(self.names)
+        out.table, out.table_kinds, out.interned = self.table, self.table_kinds, self.interned
+        out.line_starts = array('q', [line_starts[keep - 1]])
+        last, window = len(starts), self.window
+        new = resync = None
+        while new is None:
+            checked = len(out.kinds)
+            stop = min(max(pos, edit_end) + window, len(text))
+            final = stop == len(text)
+            scanned, lineno = self.scan(text[pos:stop], out, 0, lineno, final, pos)
+            pos += scanned
+            window *= 2
+            for j in range(checked, len(out.kinds)):
+                old = out.starts[j] - delta
+                if out.starts[j] >= edit_end:
+                    resync = bisect_left(starts, old)
+                    if resync < last and starts[resync] == old:
+                        new = j
+                        break
+            else:
+                if final:
+                    new, resync = len(out.kinds), last
+
+        # Splice the rescanned tokens and lines between the unchanged ones.
+        if resync < last:
+            resync_at = starts[resync]
+            line_delta = out.lines[new] - self.lines[resync]
+            new_lines = bisect_right(out.line_starts, resync_at + delta)
+            old_lines = bisect_right(line_starts, resync_at)
+        else:
+            line_delta = 0
+            new_lines, old_lines = len(out.line_starts), len(line_starts)
+        shift = lambda values, by: array(values.typecode, map(by.__add__, values)) if by else values
+
+        self.kinds = self.kinds[:first] + out.kinds[:new] + self.kinds[resync:]
+        self.values = self.values[:first] + out.values[:new] + self.values[resync:]
+        self.starts = starts[:first] + out.starts[:new] + shift(starts[resync:], delta)
+        self.lines = self.lines[:first] + out.lines[:new] + shift(self.lines[resync:], line_delta)
+        self.line_starts = (line_starts[:keep] + out.line_starts[1:new_lines]
+                            + shift(line_starts[old_lines:], delta))
+        self.text = text
+        return first, first + new
 
 #### CONFLICTING TYPES ####
 # ID & KEYWORDS => Longest Match & Rule Order Using Dictionary
@@ -29,10 +238,28 @@ class uCLexer():
     def __init__(self, error_func):
         self.error_func = error_func
         self.last_token = None
+        self.line_starts = [0]      # Offset where each line of the input begins
+        self.line_data = None       # Input text indexed by line_starts
+        self.line_hint = (0, 0, 0)  # Last line found: (index, start, end)
 
     # Build the lexer. Needs to be called after object is created.
+    # The tables are cached (see uCCache) and only regenerated when the rules change.
     def build(self, **kwargs):
-        self.lexer = lex.lex(object=self, optimize=True, **kwargs)
+        directory = uCCache.cache_dir()
+        if directory is None:
+            self.lexer = lex.lex(object=self, optimize=True, lextab=None, **kwargs)
+        else:
+            name = 'lextab_' + uCCache.rules_key(self, 't_', self.tokens, self.literals)
+            path = join(directory, name + '.py')
+            if exists(path):
+                lextab = uCCache.load_module(name, path)
+                self.lexer = lex.lex(object=self, optimize=True, lextab=lextab, **kwargs)
+            else:
+                tmp = f'{name}_{os.getpid()}'
+                with uCCache.publish(join(directory, tmp + '.py'), path):
+                    self.lexer = lex.lex(object=self, optimize=True, lextab=tmp,
+                                         outputdir=directory, **kwargs)
+        self._build_actions()
 
     # Resets line counter.
     def reset_line_num(self):
@@ -40,15 +267,196 @@ class uCLexer():
 
     def input(self, text):
         self.lexer.input(text)
+        self._index_lines(text)
 
     def token(self):
         self.last_token = self.lexer.token()
         return self.last_token
 
+    # Builds the line-start offset table of the text, so any position
+    # can be converted to (line, column) with a binary search.
+    def _index_lines(self, text):
+        lengths = map(len, text.split('\n'))
+        self.line_starts = list(accumulate((n + 1 for n in lengths), initial=0))[:-1]
+        self.line_data = text
+        self.line_hint = (0, 0, 0)
+
+    # Finds the line index of a position in the current input. Lookups
+    # mostly come in increasing order, so the last line found is tried first.
+    def _find_line(self, lexpos):
+        if self.line_data is not self.lexer.lexdata: # Input changed behind our back
+            self._index_lines(self.lexer.lexdata)
+        line, begin, end = self.line_hint
+        if begin <= lexpos < end:
+            return line, begin
+        starts = self.line_starts
+        line = bisect_right(starts, lexpos) - 1
+        end = starts[line + 1] if line + 1 < len(starts) else len(self.line_data) + 1
+        self.line_hint = (line, starts[line], end)
+        return line, starts[line]
+
+    # Finds the (line, column) of a position in the current input.
+    def find_coord(self, lexpos):
+        line, begin = self._find_line(lexpos)
+        return (line + 1, lexpos - begin + 1)
+
+    def find_column(self, lexpos):
+        _, begin, end = self.line_hint
+        if not begin <= lexpos < end or self.line_data is not self.lexer.lexdata:
+            begin = self._find_line(lexpos)[1]
+        return lexpos - begin + 1
+
     def find_tok_column(self, token):
         # Find the column of the token in its line.
-        last_cr = self.lexer.lexdata.rfind('\n', 0, token.lexpos)
-        return token.lexpos - last_cr
+        return self.find_column(token.lexpos)
+
+    # Tokenizes the whole text at once into a TokenArrays.
+    def tokenize_all(self, text):
+        out = TokenArrays(self.kinds)
+        self._scan(text, out)
+        return out
+
+    # Tokenizes an editable text into a TokenBuffer (see TokenBuffer.edit).
+    def tokenize_buffer(self, text):
+        out = TokenBuffer(self.kinds, self._scan, text)
+        self._scan(text, out)
+        return out
+
+    # Tokenizes a file lazily, while reading it in chunks of chunk_size
+    # bytes (from a memory map, if use_mmap), into a TokenStream.
+    def stream(self, filename, chunk_size=1 << 16, use_mmap=False):
+        chunks = self._read_chunks(filename, chunk_size, use_mmap)
+        return TokenStream(self.kinds, self._scan, chunks)
+
+    # Decodes a file chunk by chunk, exactly as open(filename, 'r').read()
+    # would (same encoding, universal newlines), even if a character or
+    # a '\r\n' is split between chunks.
+    def _read_chunks(self, filename, chunk_size, use_mmap):
+        decoder = codecs.getincrementaldecoder(getpreferredencoding(False))()
+        decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+        with open(filename, 'rb') as source:
+            if use_mmap and source.seek(0, io.SEEK_END):
+                with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for begin in range(0, len(mapped), chunk_size):
+                        text = decoder.decode(mapped[begin:begin + chunk_size])
+                        if text: yield text
+            else:
+                source.seek(0)
+                for chunk in iter(partial(source.read, chunk_size), b''):
+                    text = decoder.decode(chunk)
+                    if text: yield text
+        text = decoder.decode(b'', final=True)
+        if text: yield text
+
+    #### ARRAY SCANNER ####
+    # Scans with the master regex built by PLY, but appends to a TokenArrays
+    # instead of creating a LexToken (and calling a rule) for each token.
+    # Each lexeme is converted only once, the first time it is seen.
+    # Must behave exactly as the t_ rules below.
+    SKIP, EMIT, ERROR = range(3)
+
+    def _build_actions(self):
+        self.kinds = self.tokens + tuple(self.literals)
+        self.kind_ids = dict((name, i) for (i, name) in enumerate(self.kinds))
+        self.actions = []
+        for (regex, lexindexfunc) in self.lexer.lexre:
+            acts = []
+            for entry in lexindexfunc:
+                name = entry[1] if entry else None
+                if name in self.error_msgs:
+                    acts.append((self.ERROR, self.error_msgs[name]))
+                elif name in self.kind_ids:
+                    acts.append((self.EMIT, name))
+                else:
+                    acts.append((self.SKIP, None))
+            self.actions.append((regex, acts))
+
+    def _scan(self, data, out, pos=0, lineno=1, final=True, base=0):
+        ''' Scans data from pos, appending tokens and line starts to out.
+            base is the offset of data in the whole input. If not final,
+            stops before a token that could continue after the end of data.
+            Returns the position and line number where the scan stopped.
+        '''
+        ignore = self.lexer.lexignore
+        literals = self.lexer.lexliterals
+        kind_ids = self.kind_ids
+        kinds, starts, lines, values = out.kinds, out.starts, out.lines, out.values
+        table, table_kinds, interned = out.table, out.table_kinds, out.interned
+        line_starts = out.line_starts
+        end = len(data)
+        limit = end if final else end - 1
+
+        while pos < end:
+            if data[pos] in ignore:
+                pos += 1
+                continue
+
+            for regex, acts in self.actions:
+                m = regex.match(data, pos)
+                if m: break
+            else:
+                # No rule matched: literal or illegal character.
+                if pos + 1 >= limit and not final:
+                    break
+                char = data[pos]
+                if char in literals:
+                    idx = interned.get(char)
+                    if idx is None:
+                        idx = interned[char] = len(table)
+                        table.append(char)
+                        table_kinds.append(kind_ids[char])
+                    kinds.append(table_kinds[idx])
+                    starts.append(base + pos)
+                    lines.append(lineno)
+                    values.append(idx)
+                else:
+                    self._scan_error(f"Illegal character {char}", base + pos, lineno, line_starts)
+                pos += 1
+                continue
+
+            stop = m.end()
+            if stop >= limit and not final:
+                break
+            action, arg = acts[m.lastindex]
+
+            if action == self.EMIT:
+                raw = m.group()
+                idx = interned.get(raw)
+                if idx is None:
+                    idx = interned[raw] = len(table)
+                    if arg in self.rule_values:
+                        kind, value = self.rule_values[arg](self, raw)
+                    else:
+                        kind, value = arg, raw
+                    table.append(value)
+                    table_kinds.append(kind_ids[kind])
+                kinds.append(table_kinds[idx])
+                starts.append(base + pos)
+                lines.append(lineno)
+                values.append(idx)
+                pos = stop
+                continue
+
+            # Skipped lexemes (newlines, comments and errors) only count lines.
+            raw = m.group()
+            if action == self.ERROR:
+                self._scan_error(arg, base + pos, lineno, line_starts)
+            nl = raw.find('\n')
+            while nl >= 0:
+                line_starts.append(base + pos + nl + 1)
+                lineno += 1
+                nl = raw.find('\n', nl + 1)
+            pos = stop
+            if action == self.ERROR: # The error also skips the next character
+                if pos < end and data[pos] == '\n':
+                    line_starts.append(base + pos + 1)
+                pos += 1
+
+        return pos, lineno
+
+    def _scan_error(self, msg, lexpos, lineno, line_starts):
+        if self.error_func is not None:
+            self.error_func(msg, lineno, lexpos - line_starts[-1] + 1)
 
     # Internal auxiliary methods
     def _error(self, msg, token):
@@ -68,7 +476,7 @@ class uCLexer():
         if exists(data): 
             with open(data, 'r') as content_file :
                 data = content_file.read()
-        self.lexer.input(data)
+        self.input(data)
         while True:
             tok = self.lexer.token()
             if not tok: 
@@ -119,6 +527,22 @@ class uCLexer():
     
     literals = ['+', '-', '/', '*', '%', '=', '&', '!', ',', ';', '(', ')', '{', '}', '[', ']', '<', '>']
 
+    # Type and value of the tokens built by rule functions (used by the array scanner).
+    rule_values = {
+        'ID':     lambda self, v: (self.keyword_map.get(v, "ID"), v),
+        'FCONST': lambda self, v: ('FCONST', float(v)),
+        'ICONST': lambda self, v: ('ICONST', int(v)),
+        'CCONST': lambda self, v: ('CCONST', v),
+        'STRING': lambda self, v: ('STRING', v[1:-1]),
+    }
+
+    # Messages of the error handling rules.
+    error_msgs = {
+        'UNTCOMMENT': "Unterminated comment",
+        'UNTSTRING':  "Unterminated string",
+        'UNTCCHAR':   "Invalid char constant",
+    }
+
     # Define a rule so we can track line numbers
     def t_newline(self, t):
         r'\n+'
@@ -163,21 +587,21 @@ class uCLexer():
     def t_UNTCOMMENT (self, t) :
         r'/\*(.|\n)*?$'
         t.lexer.lineno += t.value.count('\n')
-        msg = "Unterminated comment"
+        msg = self.error_msgs['UNTCOMMENT']
         self._error(msg, t)
     
     # Unmatched Quotes (unterminated string)
     def t_UNTSTRING (self, t) :
         r'\".*?($|\n)'
         t.lexer.lineno += t.value.count('\n')
-        msg = "Unterminated string"
+        msg = self.error_msgs['UNTSTRING']
         self._error(msg, t)
 
     # Unmatched quotes (unterminated character)
     def t_UNTCCHAR (self, t) :
         r'\'.*?($|\n|\')'
         t.lexer.lineno += t.value.count('\n')
-        msg = "Invalid char constant"
+        msg = self.error_msgs['UNTCCHAR']
         self._error(msg, t)
 
     # If an unmatched character is found
@@ -14,6 +14,7 @@ Last Modified: 09/07/2020.
 
 from os.path import exists
 import re
+from uCIR import Op, decode
 
 class uCIROptimizer(object):
     def __init__(self, dfa):
@@ -131,7 +132,7 @@ class uCIROptimizer(object):
     def deadcode_elimination(self):
         # Preparations for Deadcode elimination routine
         blocks = self.dfa.liveness_analysis()
-        is_label = lambda str: bool(re.match(r'\d+',str))
+        is_label = lambda str: decode(str).op == Op.LABEL
         late_kill = []
 
         # Iterate through blocks eliminating code
@@ -213,8 +214,7 @@ class uCIROptimizer(object):
                 inst = inst_block.instructions[num]
                 target = inst[-1]
                 
-                split_inst = inst[0].split('_')
-                op = split_inst[0]
+                op = decode(inst[0]).name
                 
                 # Const dict.
                 if op == 'literal':
@@ -227,8 +227,10 @@ class uCIROptimizer(object):
             
             # Propagate/fold.
             for num, inst in b.instructions.items():
-                try: op,ty = inst[0].split('_')
-                except: op,ty = inst[0],None
+                # (Opcodes with modifiers aren't folded nor propagated.)
+                code = decode(inst[0])
+                if code.dims or code.ptr: op,ty = inst[0],None
+                else: op,ty = code.name,code.type
 
                 # Binary operation: fold.
                 if op in binary:
@@ -242,7 +244,7 @@ class uCIROptimizer(object):
                         l,r = const[left], const[right]
                         inst = self.fold_constants(inst, l, r)
                         b.instructions[num] = inst
-                        op = inst[0].split('_')[0]
+                        op = decode(inst[0]).name
                 
                 # Memory operation: replace with literal
                 elif op in memory:
@@ -297,7 +299,8 @@ class uCIROptimizer(object):
             'ne'  : lambda a,b: int(a != b)
         }
 
-        op, ty = inst[0].split('_')
+        code = decode(inst[0])
+        op, ty = code.name, code.type
         
         # Int or float division
         if op == 'div':
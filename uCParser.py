@@ -13,8 +13,15 @@ Last Modified: 23/04/2020.
 '''
 
 from ply.yacc import yacc
-from os.path import exists
+import os
+import sys
+import gc
+import pickle
+import hashlib
+from os.path import exists, join
+from uCLexer import TokenArrays
 import uCAST as ast
+import uCCache
 
 class uCParser():
     
@@ -28,21 +35,47 @@ class uCParser():
     )
 
     # Initializes the class with the lexer object and tokens list.
-    def __init__(self, lexer):
+    # compact: build a compact AST, where coordinates are packed integers
+    # (ast.PackedCoord), names and constants are interned, and the Type of
+    # each declared scalar is one shared node per built-in type (without
+    # coordinates). The visitors work the same on it.
+    def __init__(self, lexer, compact=False):
         self.lexer = lexer
         self.tokens = lexer.tokens
+        self.errors = 0 # Syntax errors found so far
+        self.compact = compact
+        self.shared_types = {} # Type name => shared Type node (compact AST, per parse)
     
     # Builds the parser.
+    # The tables are cached (see uCCache) and only regenerated when the grammar changes.
     def build(self, **kwargs):
+        directory = uCCache.cache_dir()
+        if directory is None:
+            kwargs.setdefault('write_tables', False)
+            kwargs.setdefault('debug', False)
+        else:
+            key = uCCache.rules_key(self, 'p_', self.precedence, self.tokens, 'program')
+            path = join(directory, f'parsetab_{key}.pickle')
+            if not exists(path):
+                with uCCache.publish(f'{path}.{os.getpid()}', path) as tmp:
+                    self.parser = yacc(module=self, start='program', optimize=True,
+                                       picklefile=tmp, outputdir=directory,
+                                       debugfile=f'parser_{key}.out', **kwargs)
+                return
+            kwargs['picklefile'] = path
         self.parser = yacc(
             module=self,
             start='program',
             optimize=True,
             **kwargs)
     
-    # Parses an expression.
+    # Parses an expression (source text or TokenArrays from the lexer).
     def parse(self, data, debug):
-        return self.parser.parse(data, debug=debug)
+        self.shared_types = {}
+        if isinstance(data, TokenArrays):
+            data.rewind()
+            return self.parser.parse(lexer=data, debug=debug)
+        return self.parser.parse(data, lexer=self.lexer, debug=debug)
     
     # Tests an expression and prints the result
     def test(self, data):
@@ -262,20 +295,20 @@ class uCParser():
 
     def p_identifier(self, p):
         ''' identifier : ID '''
-        p[0] = ast.ID(p[1], self.get_coord(p,1))
+        p[0] = ast.ID(self.intern(p[1]), self.get_coord(p,1))
 
     def p_constant_1(self, p):
         ''' constant : CCONST '''
-        p[0] = ast.Constant('char', p[1], self.get_coord(p,1))
+        p[0] = ast.Constant('char', self.intern(p[1]), self.get_coord(p,1))
     def p_constant_2(self, p):
         ''' constant : ICONST '''
-        p[0] = ast.Constant('int', p[1], self.get_coord(p,1))
+        p[0] = ast.Constant('int', self.intern(p[1]), self.get_coord(p,1))
     def p_constant_3(self, p):
         ''' constant : FCONST '''
-        p[0] = ast.Constant('float', p[1], self.get_coord(p,1))
+        p[0] = ast.Constant('float', self.intern(p[1]), self.get_coord(p,1))
     def p_constant_4(self, p):
         ''' constant : STRING'''
-        p[0] = ast.Constant('string', p[1], self.get_coord(p,1))
+        p[0] = ast.Constant('string', self.intern(p[1]), self.get_coord(p,1))
 
     #### STATEMENTS ####
 
@@ -355,24 +388,29 @@ class uCParser():
         p[0] = self._build_declarations(p[1], [dict(decl=p[2])])[0]
 
     # Listable Productions #
+    # Lists are extended in place: copying them on every reduction
+    # would make parsing quadratic in the number of elements.
 
     def p_global_declaration_list_1(self, p) :
         ''' global_declaration_list : global_declaration_list global_declaration '''
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
     def p_global_declaration_list_2(self, p) :
         ''' global_declaration_list : global_declaration '''
         p[0] = [p[1]]
 
     def p_declaration_list_1(self, p) :
         ''' declaration_list : declaration_list declaration '''
-        p[0] = p[1] + p[2]
+        p[1].extend(p[2])
+        p[0] = p[1]
     def p_declaration_list_2(self, p) :
         ''' declaration_list : declaration '''
         p[0] = p[1]
 
     def p_statement_list_1(self, p) :
         ''' statement_list : statement_list statement '''
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
     def p_statement_list_2(self, p) :
         ''' statement_list : statement '''
         p[0] = [p[1]]
@@ -381,7 +419,8 @@ class uCParser():
 
     def p_init_declarator_list_1(self, p):
         ''' init_declarator_list : init_declarator_list ',' init_declarator '''
-        p[0] = p[1] + [p[3]] 
+        p[1].append(p[3])
+        p[0] = p[1]
     def p_init_declarator_list_2(self, p):
         ''' init_declarator_list : init_declarator '''
         p[0] = [p[1]] 
@@ -396,7 +435,8 @@ class uCParser():
 
     def p_id_list_1(self, p):
         ''' id_list : id_list ',' identifier '''
-        p[0] = p[1] + [p[3]] 
+        p[1].append(p[3])
+        p[0] = p[1]
     def p_id_list_2(self, p):
         ''' id_list : identifier '''
         p[0] = [p[1]]
@@ -454,6 +494,7 @@ class uCParser():
 
     #### ERROR HANDLING ####
     def p_error(self, p):
+        self.errors += 1
         if p:
             print("Error near the symbol %s at (%s, %s)." % (p.value, p.lineno, p.lexpos))
         else:
@@ -507,10 +548,30 @@ class uCParser():
             if not isinstance(decl.type, ast.FuncDecl):
                 self.p_error(decl.coord)
             type.type = ast.Type(['int'], coord=decl.coord)
+        elif self.compact and type is decl.type:
+            # Scalars only: the semantic check adds the array and pointer
+            # modifiers to the Type in place. The position of the type is
+            # kept by the declaration.
+            type.type = self.shared_type(typename.name)
+            type.coord = typename.coord
         else:
             type.type = ast.Type([typename.name], coord=typename.coord)
 
         return decl
+
+    # Shared Type node of a built-in type (compact AST), without coordinates
+    # (line 0: each VarDecl using it has its coordinates instead). The
+    # semantic check turns its name into a uCType in place: the same for all
+    # of its uses.
+    def shared_type(self, name):
+        node = self.shared_types.get(name)
+        if node is None:
+            node = self.shared_types[name] = ast.Type([name], ast.PackedCoord(0))
+        return node
+
+    # Interns a name or constant of the compact AST.
+    def intern(self, value):
+        return sys.intern(value) if self.compact and type(value) is str else value
         
     def _type_modify_decl(self, decl, modifier):
         """ Tacks a type modifier on a declarator, and returns
@@ -539,7 +600,172 @@ class uCParser():
 
     # Get coordinates for token.
     def get_coord(self, p, token_idx):
-        last_cr = p.lexer.lexdata.rfind('\n', 0, p.lexpos(token_idx))
-        if last_cr < 0: last_cr = -1
-        column = (p.lexpos(token_idx) - (last_cr))
+        column = p.lexer.find_column(p.lexpos(token_idx))
+        if self.compact:
+            return ast.PackedCoord(p.lineno(token_idx), column)
         return ast.Coord(p.lineno(token_idx), column)
+
+
+class uCIncrementalParser():
+    '''Parser that only reparses the top-level declarations that changed.
+    The text is relexed from the previous tokens (see TokenBuffer) and split
+    in top-level declarations, each one cached by the hash of its text (and
+    its starting column). Unchanged declarations are copied from the cache,
+    with their lines shifted, instead of parsed.
+    Atributes:
+        - parser: parser of the changed declarations (uCParser or uCDescentParser)
+        - tokens: tokens of the last parsed text (TokenBuffer)
+        - cache: declaration key => (pickled subtrees and coordinates, first line, declared names)
+        - reparsed: number of declarations parsed by the last parse
+        - changed: names declared by the declarations parsed by the last parse,
+                   or gone since the previous one (see uCIncrementalChecker)
+    '''
+
+    type_types = ('VOID', 'CHAR', 'INT', 'FLOAT')
+
+    def __init__(self, parser):
+        # Cached declarations are shifted by changing their coordinates.
+        if parser.compact:
+            raise ValueError("incremental parsing needs a parser without compact AST")
+        self.parser = parser
+        self.lexer = parser.lexer
+        self.tokens = None
+        self.cache = {}
+        self.reparsed = 0
+        self.changed = set()
+
+    # Parses the source text, as uCParser.parse. Syntax errors are
+    # recovered from within the declaration they are in. Only the errors
+    # of the changed parts of the text are reported again.
+    def parse(self, data, debug):
+        # Unpickling allocates the whole tree, which would trigger many
+        # (useless) garbage collections: leave them to the next one instead.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._parse(data, debug)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _parse(self, data, debug):
+        tokens = self.relex(data)
+        cache, gdecls, changed = {}, [], set()
+        self.reparsed = 0
+
+        for first, last in self.split(tokens):
+            start = tokens.starts[first]
+            if tokens.type(last - 1) in (';', '}'):
+                text = data[start:tokens.starts[last - 1] + 1]
+            else: # Unfinished declaration: up to the end of the source
+                text = data[start:]
+            digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+            key = (digest, tokens.find_column(start))
+            line = tokens.lines[first]
+
+            entry = self.cache.get(key)
+            if entry is not None:
+                decls, coords = pickle.loads(entry[0])
+                if line != entry[1]:
+                    delta = line - entry[1]
+                    for coord in coords:
+                        coord.line += delta
+            else:
+                errors = self.parser.errors
+                program = self.parser.parse(tokens.slice(first, last), debug)
+                decls = program.gdecls if program else []
+                self.reparsed += 1
+                names = [name for decl in decls for name in ast.declared_names(decl)]
+                changed.update(names)
+                if len(decls) == 1 and self.parser.errors == errors: # Only cache what parsed cleanly
+                    pickled = pickle.dumps((decls, self._coords(decls)), pickle.HIGHEST_PROTOCOL)
+                    entry = (pickled, line, names)
+            if entry is not None:
+                cache[key] = entry
+            gdecls.extend(decls)
+
+        for key in self.cache.keys() - cache.keys():
+            changed.update(self.cache[key][2])
+        self.cache = cache # Forget declarations that are gone
+        self.changed = changed
+        return ast.Program(gdecls) if gdecls else None
+
+    # Tokenizes the text. After the first parse, only the part between the
+    # common prefix and suffix with the previous text is relexed.
+    def relex(self, data):
+        if self.tokens is None:
+            self.tokens = self.lexer.tokenize_buffer(data)
+            return self.tokens
+
+        old = self.tokens.text
+        size = min(len(old), len(data))
+        prefix = self._common(lambda n: old[:n] == data[:n], size)
+        suffix = self._common(lambda n: old[len(old) - n:] == data[len(data) - n:], size - prefix)
+        if prefix < len(old) or len(old) != len(data):
+            self.tokens.edit(prefix, len(old) - prefix - suffix, data[prefix:len(data) - suffix])
+        return self.tokens
+
+    # Largest n <= size such that same(n), by binary search (same is monotonic).
+    # Comparing slices is much faster than walking the characters in Python.
+    def _common(self, same, size):
+        low, high = 0, size
+        while low < high:
+            mid = (low + high + 1) // 2
+            if same(mid):
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    # Splits the tokens in top-level declarations: ranges (first, last)
+    # of token indices, ending at a ';' or at the '}' of a function body.
+    def split(self, tokens):
+        names, ranges = tokens.names, []
+        first = depth = 0
+        body = False  # The outermost '{' opened a function body (not an initializer)
+        knr = False   # Inside the parameter declarations of a function (K&R style)
+        prev = None
+        for i, kind in enumerate(tokens.kinds):
+            type = names[kind]
+            if type == '{':
+                if depth == 0:
+                    body = prev != '='
+                depth += 1
+            elif type == '}':
+                depth = max(depth - 1, 0)
+                if depth == 0 and body:
+                    ranges.append((first, i + 1))
+                    first, knr = i + 1, False
+            elif depth == 0:
+                if type == ';' and not knr:
+                    ranges.append((first, i + 1))
+                    first = i + 1
+                elif prev == ')' and type in self.type_types:
+                    knr = True
+            prev = type
+        if first < len(tokens.kinds): # Unfinished declaration
+            ranges.append((first, len(tokens.kinds)))
+        return ranges
+
+    # Collects the coordinates in the subtrees that have a line (line 0 means
+    # no position). They are pickled along with the subtrees, so a cached
+    # declaration is moved by shifting them, without walking the tree again.
+    # Coordinates are shared between nodes, so each one is listed once.
+    def _coords(self, nodes):
+        seen, coords = set(), []
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, ast.Coord):
+                if node.line:
+                    coords.append(node)
+            elif isinstance(node, ast.Node):
+                slots = node.__slots__
+                for name in (slots,) if isinstance(slots, str) else slots:
+                    stack.append(getattr(node, name, None))
+            elif isinstance(node, (list, tuple)):
+                stack.extend(node)
+        return coords
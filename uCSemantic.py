@@ -14,7 +14,10 @@ Last Modified: 13/05/2020.
  
 import uCType
 import uCAST as ast
+import uCSerialize
+import os
 from os.path import exists
+from concurrent.futures import ProcessPoolExecutor
 
 class SymbolTable(object):
     '''
@@ -57,11 +60,11 @@ class SignaturesTable():
     # Register function signature (when Decl is declaring a FuncDecl)\
     # Params: 
     #   node - a FuncDecl class from the uCAST
+    # Returns the error message if it doesn't match the previous one.
     def sign_func(self, node, defining):
         name      = node.type.declname.name 
         ty        = node.type.type          # get func type (FuncDecl.VarDecl.Type)
         params    = []                      
-        coord = f"({node.type.declname.coord.line}, {node.type.declname.coord.column}): "
 
         if node.params: 
             paramlist = node.params.params 
@@ -72,7 +75,8 @@ class SignaturesTable():
         for p in paramlist:
             if isinstance(p.type, ast.VarDecl):
                 params.append(p.type.type) # Append ast.Type instances
-        new = dict(type=ty, params=params, defined=defining)
+        ftype = uCType.function_of(ty.ctype, [p.ctype for p in params])
+        new = dict(type=ty, params=params, defined=defining, ftype=ftype)
 
         # If function was already signed, validate signature
         if name in self.sign.keys() :
@@ -80,71 +84,40 @@ class SignaturesTable():
             
             # Check if this function was defined twice
             defined = signature['defined']
-            
-            msg = f"Function '{name}' was defined twice."
-            condition = not defining or (defining and not defined)
-            assert condition, coord+msg
+            if defining and defined:
+                return f"Function '{name}' was defined twice."
             signature['defined'] = defining # Update flag if defining and not defined
 
+            # Types are interned: same function type, same signature.
+            sign = signature['ftype']
+            if ftype is sign:
+                return None
+
             # Check return type and amount of paramters
-            msg = f"Function '{name}' has multiple declarations: different return types."
-            ret_type = (ty.name == signature['type'].name)
-            assert ret_type, coord+msg
-            
-            msg = f"Function '{name}' has exceding/missing arguments."
-            num_params = (len(new['params']) == len(signature['params']))
-            assert num_params, coord+msg
+            if ftype.of is not sign.of:
+                return f"Function '{name}' has multiple declarations: different return types."
+            if len(ftype.params) != len(sign.params):
+                return f"Function '{name}' has exceding/missing arguments."
             
             # Check paramter types
-            param_types = True 
-            for (new, sign) in zip(new['params'], self.sign[name]['params']):
-                param_types *= (sign.name == new.name)
-                
-            msg = f"Function '{name}' has incorrect parameter types."
-            assert param_types, coord+msg
+            if ftype.params != sign.params:
+                return f"Function '{name}' has incorrect parameter types."
 
         else : # Not signed yet? 
             self.sign[name] = new
+        return None
 
     # Fetches the function's return type (node must be ast.ID)
     def get_return(self, node):
         return self.sign[node.name]['type']
 
-    # Fetches the functions params types (node must be ast.ID)
-    def check_params(self, fcall, fid):
-        # NOTE: We must compare names (Type attr has coord which will differ)
-        f_name = fcall.name.name
-
-        # Fetch list of passed params
-        if fcall.args:
-            allowed = [ast.ID, ast.Constant, ast.FuncCall, ast.BinaryOp, ast.UnaryOp]
-            params = []
-            if not isinstance(fcall.args, ast.ExprList):
-                p = fcall.args
-                
-                coord = f"({p.coord.line}, {p.coord.column}): "
-                msg = f"Function call '{f_name}' has invalid argument '{p}'." 
-                assert type(p) in allowed, coord+msg
-                params = [p]
-            else:
-                for p in fcall.args.exprs:
-                    coord = f"({p.coord.line}, {p.coord.column}): "
-                    msg = f"Function call '{f_name}' has invalid argument '{p}'." 
-                    assert type(p) in allowed, coord+msg
-                    params.append(p)
-
-            # Iterate through params checking their classes ans taking measures:
-            # ID, Constant, FuncCall, BinOp, UnOp
-            args = []
-            for p in params:
-                args.append(p.type.name[0])
-        else: # It's possible to have no arguments
-            args = []
-
-        # Fetch expected params from signatures
-        expects = [ty.name[0] for ty in self.sign[fid.name]['params']]
-
-        return (args == expects)
+    # Check the types of the arguments passed (params) to a function (fid must be ast.ID)
+    def check_params(self, params, fid):
+        # Compare with the expected params from signatures (interned types)
+        expects = self.sign[fid.name]['ftype'].params
+        if len(params) != len(expects):
+            return False
+        return all(p.type.ctype is ty for (p, ty) in zip(params, expects))
 
     # Fetches signature (node must be ast.ID)
     def get_sign(self, node):
@@ -171,106 +144,195 @@ class SignaturesTable():
             text = text[:-2]+')\n'
         return str(text)
 
+class ScopeChain():
+    '''
+    Nested scopes, where each name is resolved in O(1), whatever the depth.
+    Each name maps to the stack of its bindings, tagged with the depth of
+    their scope (innermost last). A scope keeps the names bound in it, so
+    popping it only undoes its own bindings.
+    Atributes:
+        - bindings: name => list of (depth, value), innermost last
+        - scopes: names bound in each open scope ([0] is global [-1] is local)
+    '''
+    def __init__(self):
+        self.bindings = {}
+        self.scopes = []
+
+    def __len__(self):
+        return len(self.scopes)
+
+    # Open a new (innermost) scope
+    def push(self):
+        self.scopes.append({})
+
+    # Close the innermost scope, undoing its bindings
+    def pop(self):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
+
+    # Depth of the scope of the innermost binding of name (None if unbound)
+    def depth(self, name):
+        stack = self.bindings.get(name)
+        return stack[-1][0] if stack else None
+
+    # Value of the innermost binding of name (None if unbound)
+    def lookup(self, name):
+        stack = self.bindings.get(name)
+        return stack[-1][1] if stack else None
+
+    # Value of name in the scope at depth (default: innermost), None if unbound there
+    def get(self, name, depth=-1):
+        depth %= len(self.scopes)
+        for (level, value) in reversed(self.bindings.get(name, ())):
+            if level <= depth:
+                return value if level == depth else None
+        return None
+
+    # Bind name to value in the scope at depth (default: innermost)
+    def add(self, name, value, depth=-1):
+        depth %= len(self.scopes)
+        stack = self.bindings.setdefault(name, [])
+        i = len(stack)
+        while i and stack[i-1][0] > depth: # Outer scope: below the inner bindings
+            i -= 1
+        if i and stack[i-1][0] == depth:
+            stack[i-1] = (depth, value)
+        else:
+            stack.insert(i, (depth, value))
+            self.scopes[depth][name] = None
+
+    # Remove the binding of name in the scope at depth (default: innermost)
+    def remove(self, name, depth=-1):
+        depth %= len(self.scopes)
+        stack = self.bindings[name]
+        i = next(i for i, (level, _) in enumerate(stack) if level == depth)
+        del stack[i]
+        del self.scopes[depth][name]
+        if not stack:
+            del self.bindings[name]
+
+    # Names bound in the scope at depth, in order
+    def names(self, depth):
+        return list(self.scopes[depth])
+
 class ScopeStack():
     '''
     Class responsible for keeping variables scopes.
     Used for type checking variables as well as checking if they're are defined.
     Atributes:
-        - stack: stack of SymbolTables. Each item is a different scope ([0] is global [-1] is local)
+        - chain: variables of each scope (ScopeChain, [0] is global [-1] is local)
+        - enclosures: function name (ast.ID) of each scope, None if not a function's
+        - functions: [function scope depth, returned flag] of the open function scopes
     '''
     def __init__(self):
         # Index 0 is the global scope, -1 is the current scope
-        self.stack = [] 
+        self.chain = ScopeChain()
+        self.enclosures = []
+        self.functions = []
     
     # Add new scope (if a function definition started)
     # Every function definition is considered a new scope (new symboltable)
     def add_scope(self, node=None):
-        sym_tab = SymbolTable()
         if node : node = node.decl.name 
-        sym_tab.add(0, node)            # Add scope name to table with key 0 (only numeric)
-        self.stack.append(sym_tab) 
+        if node : self.functions.append([len(self.chain), False])
+        self.enclosures.append(node)
+        self.chain.push()
 
     # Add a new variable to the current function's scope (in node VarDecl)
     def add_to_scope(self, node):
-        scope = self.stack[-1]      
         var_name = node.declname.name 
         
         # Check if variable is declared in scope.
-        declared = scope.lookup(var_name)
+        declared = self.chain.get(var_name)
         
-        scope.add(var_name, node)
+        self.chain.add(var_name, node)
         return not declared
     
     def add_func(self, node):
         # node should be Class ast.VarDecl
         f_name = node.declname.name 
-        glob = self.stack[0]        
-        loc = self.stack[-1]
         
         # Add to global scope if not defined
-        if not glob.lookup(f_name):  
-            glob.add(f_name, node)
+        if not self.chain.get(f_name, 0):  
+            self.chain.add(f_name, node, 0)
             
         # Remove local scope
-        if loc.lookup(f_name):       
-            loc.pop(f_name)          
+        if self.chain.get(f_name):       
+            self.chain.remove(f_name)          
 
     # Remove current scope from stack (when a FuncDef node ends)
     def pop_scope(self):
-        self.stack.pop() 
+        self.chain.pop()
+        if self.enclosures.pop():
+            self.functions.pop()
     
     # Check the current enclosure
     def enclosure(self):
-        scope = self.stack[-1]
-        return scope.lookup(0)
+        return self.enclosures[-1]
     
-    # Get current function scope.
-    def nearest_func_scope(self):
-        for scope in self.stack[::-1]:
-            if scope.lookup(0): return scope
-        return None
-
     # Check the current function
     def nearest_function(self):
-        func = self.nearest_func_scope()
-        return func.lookup(0) if func else None
+        return self.enclosures[self.functions[-1][0]] if self.functions else None
 
     # Set that function has returned.
     def set_returned(self):
-        func = self.nearest_func_scope()
-        if func: func.add('returned', True)
+        if self.functions: self.functions[-1][1] = True
 
     # Get if function is returned.
     def check_returned(self):
-        func = self.nearest_func_scope()
-        return func.lookup('returned')
+        return self.functions[-1][1]
 
     # Check if ID name is within the current scope, return it's type
     # Must be of type ast.ID
     def in_scope(self, node):
-        name = node.name
-        
-        # Check all scopes from last to global.
-        for scope in self.stack[::-1]:
-            var = scope.lookup(name)
-            if var: break                       # Prioritize local
-        return var
+        return self.chain.lookup(node.name)
 
     def __str__(self):
         text = '\n'
-        for (i,sym) in enumerate(self.stack):
-            ids = list(sym.symtab.keys())
-            ids.remove(0) # Remove enclosure
-            text += f"Level {i} => {ids}\n"
+        for i in range(len(self.chain)):
+            text += f"Level {i} => {self.chain.names(i)}\n"
         return text
 
+# Expressions allowed as arguments of a function call.
+_ARGUMENTS = (ast.ID, ast.Constant, ast.FuncCall, ast.BinaryOp, ast.UnaryOp)
+
+class Diagnostic():
+    '''
+    Semantic error found by uCSemanticCheck.
+    Atributes:
+        - message: description of the error
+        - line, column: where it was found (None if unknown)
+    '''
+    __slots__ = ('message', 'line', 'column')
+
+    def __init__(self, message, coord=None):
+        self.message = message
+        self.line = coord.line if coord is not None else None
+        self.column = coord.column if coord is not None else None
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        return f"({self.line}, {self.column}): {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({str(self)!r})"
+
 class uCSemanticCheck(ast.NodeVisitor):
     '''
     Program checking class. This class uses the visitor pattern. You need to define methods
     of the form visit_NodeName() for each kind of AST node that you want to process.
     Note: You will need to adjust the names of the AST nodes if you picked different names.
+    By default, the first error found is raised as an AssertionError. If recover, the
+    errors are collected in diagnostics instead, and the check goes on: expressions
+    with an error get the error type, and the checks using them are skipped, so
+    one error doesn't cascade into many.
     '''
-    def __init__(self, parser=None):
+    def __init__(self, parser=None, recover=False):
 
         # Set flags
         self.flags = dict(inFDef=False)
@@ -287,6 +349,13 @@ class uCSemanticCheck(ast.NodeVisitor):
         # Initialize signatures table
         self.signatures = SignaturesTable()
 
+        # Global names used, when recorded (see uCIncrementalChecker)
+        self.uses = None
+
+        # Errors found (Diagnostic), if collected instead of raised
+        self.recover = recover
+        self.diagnostics = []
+
         # Add built-in type names (int, float, char) to the symbol table
         self.types.add("int",uCType.int_type)
         self.types.add("float",uCType.float_type)
@@ -321,7 +390,7 @@ class uCSemanticCheck(ast.NodeVisitor):
         
         # 2. Visit all of the statements
         for gdecl in node.gdecls:
-            self.visit(gdecl)
+            yield gdecl
         
         # 3. Remove global scope.
         self.scopes.pop_scope()
@@ -335,65 +404,73 @@ class uCSemanticCheck(ast.NodeVisitor):
 
     def visit_ArrayDecl(self, node):
         # 1. Visit type.
-        self.visit(node.type)
+        yield node.type
         
         # 2. Add array type to array.
-        ty = self.get_inner_type(node.type)
-        
-        arr_type = self.types.lookup('array')
-        ty.name.insert(0, arr_type)
+        self.add_modifier(node, 'array')
         
         # 3. Check dimensions.
         if node.dims:
             # 3.1. Visit dims.
-            self.visit(node.dims)
+            yield node.dims
         
             # 3.2. Check if array size is nonnegative.
-            if isinstance(node.dims, ast.UnaryOp):
-                msg = "Array declared with a negative size."
-                msg = self.build_error_msg(msg, node.dims.coord)
-                assert node.dims.op != '-', msg
+            if isinstance(node.dims, ast.UnaryOp) and node.dims.op == '-':
+                self.error("Array declared with a negative size.", node.dims.coord)
 
     def visit_ArrayRef(self, node):
         # 1. Visit name (ID)
-        self.visit(node.name)
+        yield node.name
         name = node.name
         
         # 2. Check if ID is array or ptr.
         ptr = self.types.lookup('ptr')
         arr = self.types.lookup('array')
         
-        msg = f"ID '{name.name}' is not an array or pointer."
-        msg = self.build_error_msg(msg, name.coord)
-        error = (name.type.name[0] == ptr or name.type.name[0] == arr)
-        assert error, msg
+        indexable = not self.poisoned(name)
+        if indexable and not (name.type.name[0] == ptr or name.type.name[0] == arr):
+            self.error(f"ID '{name.name}' is not an array or pointer.", name.coord)
+            indexable = False
+
+        # 3. Assign node type (known from the name).
+        if indexable:
+            node.type = ast.Type(name.type.name[1:], node.coord)
+            node.type.ctype = name.type.ctype.of if name.type.ctype else None
 
-        # 3. Visit subscript.
-        self.visit(node.subsc)
+        # 4. Visit subscript.
+        yield node.subsc
                 
-        # 4. Check if subscript is a valid ID, if ID.
+        # 5. Check if subscript is a valid ID, if ID.
         coord = node.subsc.coord
-        if isinstance(node.subsc, ast.ID):
-            msg = f"ID '{node.subsc.name}' is a function, can't be used as subscript."
-            msg = self.build_error_msg(msg, coord)
-            assert not self.signatures.get_sign(node.subsc), msg
+        if isinstance(node.subsc, ast.ID) and self.signatures.get_sign(node.subsc):
+            self.error(f"ID '{node.subsc.name}' is a function, can't be used as subscript.", coord)
 
-        # 5. Check subscript type.
+        # 6. Check subscript type.
         type_int = self.types.lookup('int')
         ty = node.subsc.type.name[-1]
+        if ty != type_int and not self.poisoned(node.subsc):
+            self.error(f"Array index must be of type int, and is of type {ty.name}.", coord)
         
-        msg = f"Array index must be of type int, and is of type {ty.name}."
-        msg = self.build_error_msg(msg, coord)
-        assert ty == type_int, msg
-        
-        # 6. Assign node type
-        node.type = ast.Type(name.type.name[1:], node.coord)
+        # 7. Unknown type, if not indexable.
+        if not indexable:
+            self.poison(node)
         
     def visit_Assignment(self, node):
-        ptr = self.types.lookup('ptr')
-
         # 1. Visit left value
-        self.visit(node.lvalue)
+        yield node.lvalue
+        
+        # 2-3. Check the left value and the operator.
+        self.check_assignable(node)
+        
+        # 4. Visit right value.
+        yield node.rvalue
+        
+        # 5-7. Check the right value, and assign result type.
+        self.check_assigned(node)
+    
+    # Checks the (visited) left value of an assignment, and its operator.
+    def check_assignable(self, node):
+        ptr = self.types.lookup('ptr')
         lvalue = node.lvalue
         
         # 2. Check if ID or ArrayRef or UnaryOp.
@@ -402,10 +479,8 @@ class uCSemanticCheck(ast.NodeVisitor):
             func = self.signatures.get_sign(lvalue)
             
             # 2.1. If it is 
-            if func:
-                msg = f"Assigning to function '{lvalue.name}'." 
-                msg = self.build_error_msg(msg, lvalue.coord)
-                assert func['type'].name[0] == ptr, msg
+            if func and func['type'].name[0] != ptr:
+                self.error(f"Assigning to function '{lvalue.name}'.", lvalue.coord)
         elif isinstance(lvalue, ast.UnaryOp):
             inner = lvalue.expr
             while isinstance(inner, ast.UnaryOp):
@@ -415,146 +490,151 @@ class uCSemanticCheck(ast.NodeVisitor):
             assignable = False
             
         if not assignable:
-            msg = "Expression is not assignable."
-            msg = self.build_error_msg(msg, node.coord)
-            assert False, msg
+            self.error("Expression is not assignable.", node.coord)
         
         # 3. Check if assignment is valid.
-        if node.op != '=':
+        if node.op != '=' and not self.poisoned(lvalue):
             ty = lvalue.type.name[0]
-            
-            msg = f"Assignment operator '{node.op}' not valid for type {ty.name}."
-            msg = self.build_error_msg(msg, node.coord)
-            assert node.op in ty.assign_ops, msg
-        
-        # 4. Visit right value.
-        self.visit(node.rvalue)
+            if node.op not in ty.assign_ops:
+                self.error(f"Assignment operator '{node.op}' not valid for type {ty.name}.", node.coord)
+    
+    # Checks the (visited) right value of an assignment against its left value.
+    def check_assigned(self, node):
+        ptr = self.types.lookup('ptr')
+        lvalue = node.lvalue
         rvalue = node.rvalue
 
         # 5. If ID, check if function.
-        if isinstance(rvalue, ast.ID):
-            msg = f"Assigning function '{rvalue.name}'." 
-            msg = self.build_error_msg(msg, rvalue.coord)
-            assert not self.signatures.get_sign(rvalue), msg
+        if isinstance(rvalue, ast.ID) and self.signatures.get_sign(rvalue):
+            self.error(f"Assigning function '{rvalue.name}'.", rvalue.coord)
 
         # 6. Check types
         string = self.types.lookup('string')
         array = self.types.lookup('array')
         ltype = lvalue.type.name
         rtype = rvalue.type.name
-        
-        ty_msg = f"Type mismatch in assignment ({ltype}/{rtype})."
-        ty_msg = self.build_error_msg(ty_msg, node.coord)
+        mismatch = False
         
         # 6.1. Special cases.
-        if ltype[0] == array:
-            msg = "Array is not assignable."
-            msg = self.build_error_msg(msg, lvalue.coord)
-            assert False, msg
+        if self.poisoned(lvalue, rvalue):
+            pass
+        elif ltype[0] == array:
+            self.error("Array is not assignable.", lvalue.coord)
         elif ltype[0] == ptr:
-            msg = "Pointer can only be assigned array or other pointer."
-            msg = self.build_error_msg(msg, node.coord)
-            assert rtype[0] == ptr or rtype[0] == array, msg
-            
-            assert ltype[1:] == rtype[1:], ty_msg
+            if not (rtype[0] == ptr or rtype[0] == array):
+                self.error("Pointer can only be assigned array or other pointer.", node.coord)
+            else:
+                mismatch = ltype[1:] != rtype[1:]
         elif rtype[0] == string:
             char = self.types.lookup('char')
-            assert ltype == [ptr,char], ty_msg
+            mismatch = ltype != [ptr,char]
         
         # 6.2. Regular case
         else:
-            assert ltype == rtype, ty_msg
+            mismatch = ltype != rtype
+
+        if mismatch:
+            self.error(f"Type mismatch in assignment ({ltype}/{rtype}).", node.coord)
             
         # 7. Assign result type.
         node.type = lvalue.type
         
     def visit_Assert(self, node):
         # 1. Visit the expression.
-        self.visit(node.expr)
+        yield node.expr
         
         # 2. Expression must be boolean
         self.boolean_check(node.expr)
 
     def visit_BinaryOp(self, node):
         # 1. Visit left value
-        self.visit(node.lvalue)
-        lvalue = node.lvalue
+        yield node.lvalue
 
         # 2. If ID, check if function
-        if isinstance(lvalue, ast.ID):
-            msg = f"Function '{lvalue.name}' in binary operation."
-            msg = self.build_error_msg(msg, lvalue.coord)
-            assert not self.signatures.get_sign(lvalue), msg
+        self.check_operand(node.lvalue)
         
         # 3. Visit right value
-        self.visit(node.rvalue)
-        rvalue = node.rvalue
+        yield node.rvalue
         
         # 4. If ID, check if function        
-        if isinstance(rvalue, ast.ID):
-            msg = f"Function '{rvalue.name}' in binary operation."
-            msg = self.build_error_msg(msg, rvalue.coord)
-            assert not self.signatures.get_sign(rvalue), msg
-
-        # 5. Check types.
-        msg = f"Type mismatch in binary operation ({lvalue.type.name}/{rvalue.type.name})."
-        msg = self.build_error_msg(msg, node.coord)
-        assert lvalue.type.name == rvalue.type.name, msg
+        self.check_operand(node.rvalue)
+        
+        # 5-7. Check types and operator, assign result type.
+        self.check_binary_op(node)
+    
+    # Checks that a (visited) operand of a binary operation isn't a function.
+    def check_operand(self, expr):
+        if isinstance(expr, ast.ID) and self.signatures.get_sign(expr):
+            self.error(f"Function '{expr.name}' in binary operation.", expr.coord)
+    
+    # Checks the operands of a binary operation (visited), and assigns its type.
+    def check_binary_op(self, node):
+        lvalue = node.lvalue
+        rvalue = node.rvalue
+        
+        # 5. Check types (unknown, if an operand's is).
+        if self.poisoned(lvalue, rvalue):
+            self.poison(node)
+            return
+        if lvalue.type.name != rvalue.type.name:
+            self.error(f"Type mismatch in binary operation ({lvalue.type.name}/{rvalue.type.name}).", node.coord)
+            self.poison(node)
+            return
         
         # 6. Make sure the operation is supported
         ty = lvalue.type.name[0]
-        
-        msg = f"Unsupported operator '{node.op}' in binary operation for type {ty.name}."
-        msg = self.build_error_msg(msg, node.coord)
-        assert node.op in ty.bin_ops.union(ty.rel_ops), msg
+        if node.op not in ty.bin_ops and node.op not in ty.rel_ops:
+            self.error(f"Unsupported operator '{node.op}' in binary operation for type {ty.name}.", node.coord)
+            self.poison(node)
+            return
         
         # 7. Assign the result type
         if node.op in ty.bin_ops:
             node.type = lvalue.type
         else:
             node.type = ast.Type([self.types.lookup('bool')], node.coord)
+            node.type.ctype = node.type.name[0]
 
     def visit_Break(self, node):
         # 1. Check if enclosure is a loop, error if not
-        msg = "'break' can only be used inside a loop."
-        msg = self.build_error_msg(msg, node.coord)
-        assert not self.scopes.enclosure(), msg
+        if self.scopes.enclosure():
+            self.error("'break' can only be used inside a loop.", node.coord)
         
     def visit_Cast(self, node):
-        # 1. Visit type.
-        node.type.name = [node.type.name]
-        self.visit(node.type)
+        # 1. Visit type (its name is a list once checked).
+        if isinstance(node.type.name, str):
+            node.type.name = [node.type.name]
+        yield node.type
         
         # 2. Visit Expression
-        self.visit(node.expr)
+        yield node.expr
         
         # 3. Check if the expression type is castable to "type".
         ty = self.get_inner_type(node.expr).name[0]
         cast = node.type.name[0].name
-        
-        msg = f"Type {ty.name} can't be casted to type {cast}."
-        msg = self.build_error_msg(msg, node.coord)
-        assert cast in ty.cast_types, msg
+        if cast not in ty.cast_types and not self.poisoned(node.expr):
+            self.error(f"Type {ty.name} can't be casted to type {cast}.", node.coord)
         
     def visit_Compound(self, node):
         # 1. Visit all declarations
         if node.decls:
             for decl in node.decls:
-                self.visit(decl)
+                yield decl
             
         # 2. Visit all statements
         if node.stats:
             for stat in node.stats:
-                self.visit(stat)
+                yield stat
 
     def visit_Constant(self, node):
         # 1. Constant type to Type, with an uCType.
         if isinstance(node.type, str):
             ty = self.types.lookup(node.type)
-            msg =  f"Unsupported type '{node.type}'."
-            msg = self.build_error_msg(msg, node.coord)
-            assert ty, msg
+            if not ty:
+                self.error(f"Unsupported type '{node.type}'.", node.coord)
+                ty = uCType.error_type
             node.type = ast.Type([ty], node.coord)
+            node.type.ctype = ty
 
         # 2. Convert to respective type. Char by default.
         ty = node.type.name[0]
@@ -565,17 +645,17 @@ class uCSemanticCheck(ast.NodeVisitor):
         
     def visit_Decl(self, node):
         # 1. Visit type
-        self.visit(node.type)
+        yield node.type
         ty = node.type
 
         # 2. Visit name ID.
-        self.visit(node.name)
+        yield node.name
         
         # 3. Visit initializers, if defined.
         ty_msg = "Initialization type mismatch in declaration"
-        ty_msg = self.build_error_msg(ty_msg, node.name.coord)
+        coord = node.name.coord
         if node.init:
-            self.visit(node.init)
+            yield node.init
             
             # Check instance of initializer.
             # 3.1. Constant
@@ -588,43 +668,37 @@ class uCSemanticCheck(ast.NodeVisitor):
                     char = self.types.lookup('char')
                     
                     # 3.1.1.1. Check if char array.
-                    msg =  "A string initializer can only be assigned to a char array."
-                    msg = self.build_error_msg(msg, const.coord)
                     inner = self.get_inner_type(ty)
-                    error = (isinstance(ty, ast.ArrayDecl) and inner.name[-1] == char)
-                    assert error, msg
+                    if not (isinstance(ty, ast.ArrayDecl) and inner.name[-1] == char):
+                        self.error("A string initializer can only be assigned to a char array.", const.coord)
                     
                     # 3.1.1.2. Check length.
-                    dims = ty.dims
-                    if dims:
+                    elif ty.dims:
                         # TODO: dims can be UnOp or other expression... Not worth it?
-                        msg = f"Initializer-string '{const.value}' for char array is too long."
-                        msg = self.build_error_msg(msg, dims.coord)
-                        assert len(const.value) <= dims.value, msg
+                        dims = ty.dims
+                        if len(const.value) > dims.value:
+                            self.error(f"Initializer-string '{const.value}' for char array is too long.", dims.coord)
                     else:
                         node.type.dims = ast.Constant('int', len(const.value), node.name.coord)
                         self.visit_Constant(node.type.dims)
                 
                 # 3.1.2. Any other constant
-                else:
-                    msg = "Array declaration without explicit size needs an initializer list."
-                    msg = self.build_error_msg(msg, node.name.coord)
-                    assert not isinstance(ty, ast.ArrayDecl), msg
-                    ty_msg += f"({ty.type.name[0]}/{const.type.name[0]})."
-                    assert ty.type.name[0] == const.type.name[0], ty_msg
+                elif isinstance(ty, ast.ArrayDecl):
+                    self.error("Array declaration without explicit size needs an initializer list.", coord)
+                elif ty.type.name[0] != const.type.name[0]:
+                    self.error(ty_msg + f"({ty.type.name[0]}/{const.type.name[0]}).", coord)
             
             # 3.2. InitList
             elif isinstance(node.init, ast.InitList):
                 exprs = node.init.exprs
-                
                 sz_msg = "Size mismatch in variable initialization."
-                sz_msg = self.build_error_msg(sz_msg, node.name.coord)
                 
                 # 3.2.1. Variable
                 if isinstance(ty, ast.VarDecl):
-                    assert len(exprs) == 1, sz_msg
-                    ty_msg += f"({ty.type.name}/{exprs[0].type.name})."
-                    assert ty.type.name == exprs[0].type.name, ty_msg
+                    if len(exprs) != 1:
+                        self.error(sz_msg, coord)
+                    elif ty.type.name != exprs[0].type.name and not self.poisoned(exprs[0]):
+                        self.error(ty_msg + f"({ty.type.name}/{exprs[0].type.name}).", coord)
                 
                 # 3.2.2. Array
                 elif isinstance(ty, ast.ArrayDecl):
@@ -642,51 +716,53 @@ class uCSemanticCheck(ast.NodeVisitor):
                     
                     # TODO: dims can be unOp or other expression... Not worth it?
                     # Check if initialization lists are OK.
-                    assert self.check_init_len(exprs, ty), sz_msg
+                    if not self.check_init_len(exprs, ty):
+                        self.error(sz_msg, coord)
                     
                     # 3.2.2.2. Get basic type.
-                    msg = "No basic type in array declaration."
-                    msg = self.build_error_msg(msg, node.name.coord)
-                    ty = self.get_inner_type(ty)
-                    assert ty, msg
+                    elif not self.get_inner_type(ty):
+                        self.error("No basic type in array declaration.", coord)
                     
                     # 3.2.2.3. Check type.
-                    msg = f"Not all elements of the initializer list are of type {ty.name}"
-                    self.build_error_msg(msg, node.name.coord)
-                    assert self.check_init_list(exprs, ty), msg
+                    else:
+                        ty = self.get_inner_type(ty)
+                        if not self.check_init_list(exprs, ty):
+                            self.error(f"Not all elements of the initializer list are of type {ty.name}", coord)
                 
                 # 3.2.3. Pointer
                 elif isinstance(ty, ast.PtrDecl):
                     
                     # 3.2.3.1. Check length.
-                    assert len(exprs) == 1, sz_msg
+                    if len(exprs) != 1:
+                        self.error(sz_msg, coord)
 
                     # 3.2.3.2. Get basic type.
-                    msg = "No basic type in ptr declaration."
-                    msg = self.build_error_msg(msg, node.name.coord)
-                    ty = self.get_inner_type(ty)
-                    assert ty, msg
+                    elif not self.get_inner_type(ty):
+                        self.error("No basic type in ptr declaration.", coord)
                     
                     # 3.2.3.3. Initializer has to be of same type
-                    ty_msg += f"({ty.name}/{exprs[0].type.name})."
-                    assert ty.name == exprs[0].type.name, ty_msg
+                    else:
+                        ty = self.get_inner_type(ty)
+                        if ty.name != exprs[0].type.name and not self.poisoned(exprs[0]):
+                            self.error(ty_msg + f"({ty.name}/{exprs[0].type.name}).", coord)
 
             # 3.3. Any other expression.
             else:
                 ty = self.get_inner_type(ty)
-                ty_msg += f"({ty.name}/{node.init.type.name})."
-                assert ty.name == node.init.type.name, ty_msg
+                if ty.name != node.init.type.name and not self.poisoned(node.init):
+                    self.error(ty_msg + f"({ty.name}/{node.init.type.name}).", coord)
         
         # 4. If array declaration has no init.    
-        elif isinstance(ty, ast.ArrayDecl):
-            msg = "An array has to have a size or initializer."
-            msg = self.build_error_msg(msg, node.name.coord)
-            assert ty.dims, msg
+        elif isinstance(ty, ast.ArrayDecl) and not ty.dims:
+            self.error("An array has to have a size or initializer.", coord)
+
+        # 5. Canonical type of the declaration, with its dimensions.
+        self.get_inner_type(node.type).ctype = self.build_ctype(node.type)
     
     def visit_DeclList(self, node):
         # 1. Visit all decls.
         for decl in node.decls:
-            self.visit(decl)
+            yield decl
     
     def visit_EmptyStatement(self, node):
         return
@@ -694,7 +770,7 @@ class uCSemanticCheck(ast.NodeVisitor):
     def visit_ExprList(self, node):
         # 1. Visit all expressions
         for expr in node.exprs:
-            self.visit(expr)
+            yield expr
             
     def visit_For(self, node):
         # 1. Create scope 
@@ -702,65 +778,79 @@ class uCSemanticCheck(ast.NodeVisitor):
         
         # 2. Visit initializer.
         if node.init:
-            self.visit(node.init)
+            yield node.init
         
         # 3. Check condition.
         if node.cond:
             
             # 3.1. Visit condition.
-            self.visit(node.cond)
+            yield node.cond
             
             # 3.2 Condition must be boolean
             self.boolean_check(node.cond)
         
         # 4. Visit next.
         if node.next:
-            self.visit(node.next)
+            yield node.next
         
         # 5. Visit body.
         if node.body:
-            self.visit(node.body)
+            yield node.body
 
         # 6. Remove scope
         self.scopes.pop_scope()
 
     def visit_FuncCall(self, node):
         # 1. Visit name ID.
-        self.visit(node.name)
+        yield node.name
         name = node.name
 
         # 2. Check if identifier is a function.
-        msg = f"ID '{name.name}' in function call is not a function."
-        msg = self.build_error_msg(msg, node.coord)
-        assert self.signatures.get_sign(name), msg
+        function = self.signatures.get_sign(name)
+        if not function and not self.poisoned(name):
+            self.error(f"ID '{name.name}' in function call is not a function.", node.coord)
         
         # 3. Visit arguments.
         if node.args:
-            self.visit(node.args)
+            yield node.args
+        if not function:
+            self.poison(node)
+            return
         
         # 4. Check args types
-        msg = f"Incorrect arguments passed to '{name.name}' function."
-        msg = self.build_error_msg(msg, node.coord)
-        test = self.signatures.check_params(node, name)
-        assert test, msg
+        if not node.args: # It's possible to have no arguments
+            args = []
+        elif isinstance(node.args, ast.ExprList):
+            args = node.args.exprs
+        else:
+            args = [node.args]
+        valid = True
+        for arg in args:
+            if type(arg) not in _ARGUMENTS:
+                self.error(f"Function call '{name.name}' has invalid argument '{arg}'.", arg.coord)
+                valid = False
+        if valid and not self.poisoned(*args) and not self.signatures.check_params(args, name):
+            self.error(f"Incorrect arguments passed to '{name.name}' function.", node.coord)
 
         # 5. Add type
         node.type = self.signatures.get_return(name)
     
     def visit_FuncDecl(self, node):
         # 1. Visit type
-        self.visit(node.type)
+        yield node.type
         
         # 2. Add to global scope.
         self.scopes.add_func(node.type)
         
         # 3. Visit params.
         if node.params:
-            self.visit(node.params)
+            yield node.params
         
         # 4. Sign function.
         define = (True if self.flags['inFDef'] else False)
-        self.signatures.sign_func(node, define)
+        msg = self.signatures.sign_func(node, define)
+        if msg:
+            self.error(msg, node.type.declname.coord)
     
     def visit_FuncDef(self, node):
         # 1. Setup flags
@@ -770,31 +860,57 @@ class uCSemanticCheck(ast.NodeVisitor):
         self.scopes.add_scope(node=node)
 
         # 3. Visit type.
-        self.visit(node.type)
+        yield node.type
                         
         # 4. Visit declaration.
-        self.visit(node.decl)
+        yield node.decl
 
         # 5. Visit parameter list
         if node.params:
-            self.visit(node.params)
+            yield node.params
                 
         # 6. Visit function.
         if node.body:
-            self.visit(node.body)
+            yield node.body
     
         # 7. Check if returned.
-        void = self.types.lookup('void')
-        if node.type.name[-1] != void:
-            msg = "No return from a non-void function."
-            msg = self.build_error_msg(msg, node.decl.name.coord)
-            assert self.scopes.check_returned(), msg
+        self.check_return(node)
         
         # 8. Remove scope
         self.scopes.pop_scope()
 
         # 9. Setdown flags
         self.flags['inFDef'] = False
+
+    # Checks the header of a function definition (steps 1-5 of visit_FuncDef),
+    # declaring it. Returns the variables of its scope (name, VarDecl), for
+    # check_body (see uCParallelChecker).
+    def check_header(self, node):
+        self.flags['inFDef'] = True
+        self.scopes.add_scope(node=node)
+        self.visit(node.type)
+        self.visit(node.decl)
+        if node.params:
+            self.visit(node.params)
+
+        chain = self.scopes.chain
+        local = [(name, chain.get(name)) for name in chain.names(-1)]
+        self.scopes.pop_scope()
+        self.flags['inFDef'] = False
+        return local
+
+    # Checks the body of a function definition whose header was checked
+    # (steps 6-9 of visit_FuncDef), given the variables of its scope.
+    def check_body(self, node, local):
+        self.flags['inFDef'] = True
+        self.scopes.add_scope(node=node)
+        for (name, decl) in local:
+            self.scopes.chain.add(name, decl)
+        if node.body:
+            self.visit(node.body)
+        self.check_return(node)
+        self.scopes.pop_scope()
+        self.flags['inFDef'] = False
     
     def visit_GlobalDecl(self, node):
         # 1. Visit every global declaration.
@@ -808,93 +924,93 @@ class uCSemanticCheck(ast.NodeVisitor):
             # 1.2. If function declaration, create temporary scope.
             if isinstance(ty, ast.FuncDecl):
                 self.scopes.add_scope()
-                self.visit(decl)
+                yield decl
                 self.scopes.pop_scope()
             else:
-                self.visit(decl)
+                yield decl
     
     def visit_ID(self, node):
         # 1. Check if ID was defined.
         decl = self.scopes.in_scope(node)
-        
-        msg = f"ID '{node.name}' is not defined."
-        msg = self.build_error_msg(msg, node.coord)
-        assert decl, msg
+        if not decl:
+            self.error(f"ID '{node.name}' is not defined.", node.coord)
+            self.poison(node)
+            return
         
         # 2. Assign type
         node.type = decl.type
+
+        # 3. Record global dependencies.
+        if self.uses is not None and self.scopes.chain.depth(node.name) == 0:
+            self.uses.add(node.name)
     
     def visit_If(self, node):
         # 1. Visit the condition
-        self.visit(node.cond)
+        yield node.cond
         
         # 2. Condition must be boolean
         self.boolean_check(node.cond)
         
         # 3. Visit statements
         if node.if_stat:
-            self.visit(node.if_stat)
+            yield node.if_stat
         
         if node.else_stat:
-            self.visit(node.else_stat)
+            yield node.else_stat
     
     def visit_InitList(self, node):
         # 1. Visit expressions
         for expr in node.exprs:
-            self.visit(expr)
+            yield expr
                     
     def visit_ParamList(self, node):
         # 1. Visit parameters.
         for param in node.params:
-            self.visit(param)
+            yield param
     
     def visit_Print(self, node):
         # 1. Visit the expressions.
         if node.expr:
-            self.visit(node.expr)
+            yield node.expr
 
     def visit_PtrDecl(self, node):
         # 1. Visit pointer
-        self.visit(node.type)
+        yield node.type
         
         # 2. Add ptr type to Type
-        ty = self.get_inner_type(node.type)
-        ptr_type = self.types.lookup('ptr')
-        ty.name.insert(0, ptr_type)
+        self.add_modifier(node, 'ptr')
         
     def visit_Read(self, node):
         # 1. Visit the expressions.
-        self.visit(node.expr)
+        yield node.expr
         
         if isinstance(node.expr, ast.ExprList):
             exprs = node.expr.exprs
         else:
             exprs = [node.expr]
         
-        msg = "Expression read must be ID or array reference."
         for expr in exprs:
-            err = self.build_error_msg(msg, node.coord)
-            assert isinstance(expr, (ast.ID, ast.ArrayRef)), err
+            if not isinstance(expr, (ast.ID, ast.ArrayRef)):
+                self.error("Expression read must be ID or array reference.", node.coord)
 
     def visit_Return(self, node):
         # 1. Check expression.
         if node.expr:
             # 1.1. Only 1 expression is allowed to return.
-            msg = "Only one return expression is allowed."
-            msg = self.build_error_msg(msg, node.coord)
-            assert not isinstance(node.expr, ast.ExprList), msg
+            single = not isinstance(node.expr, ast.ExprList)
+            if not single:
+                self.error("Only one return expression is allowed.", node.coord)
             
             # 1.2. Visit expression.
-            self.visit(node.expr)
-            ty = node.expr.type.name
+            yield node.expr
+            ty = node.expr.type.name if single and not self.poisoned(node.expr) else None
         else:
             ty = [self.types.lookup('void')]
             
         # 2. Check return type.
         ret = self.signatures.get_return(self.scopes.nearest_function())
-        msg = f"Incorrect return type {ty}, expected {ret.name}."
-        msg = self.build_error_msg(msg, node.coord)
-        assert ty == ret.name, msg
+        if ty is not None and ty != ret.name:
+            self.error(f"Incorrect return type {ty}, expected {ret.name}.", node.coord)
         
         # 3. Set function as returned
         # TODO: doesn't recognize if return is inside if... Not worth it?
@@ -905,21 +1021,29 @@ class uCSemanticCheck(ast.NodeVisitor):
         # NOTE: because of the array and ptr types, node.name can have more than one item.
         for i, name in enumerate(node.name or []):
             if not isinstance(name, uCType.uCType):
-                msg = f"Unsupported type '{name}'."
-                msg = self.build_error_msg(msg, node.coord)
                 ty = self.types.lookup(name)
-                assert ty, msg
+                if not ty:
+                    self.error(f"Unsupported type '{name}'.", node.coord)
+                    ty = uCType.error_type
                 node.name[i] = ty
+
+        # 2. Canonical type of the names (a declaration's is set with its
+        # dimensions, once they are known: see visit_Decl).
+        node.ctype = uCType.canonical(node.name)
         
     def visit_UnaryOp(self, node):
         # 1. Visit the expression.
-        self.visit(node.expr)
+        yield node.expr
         
         # 2. Make sure the operation is supported.
         ty = node.expr.type
-        
-        msg = f"Unsupported operator '{node.op}' in unary operation for type {ty.name[0].name}."
-        assert node.op in ty.name[0].un_ops, msg
+        if self.poisoned(node.expr):
+            self.poison(node)
+            return
+        if node.op not in ty.name[0].un_ops or (node.op == '*' and len(ty.name) < 2):
+            self.error(f"Unsupported operator '{node.op}' in unary operation for type {ty.name[0].name}.", node.coord)
+            self.poison(node)
+            return
         
         # 3. Assign the result type.
         # & => integer (returns address)
@@ -927,42 +1051,41 @@ class uCSemanticCheck(ast.NodeVisitor):
         # *,++,--,-,+ => same type of the nearby variable 
         if node.op == '*':
             ty = ast.Type(ty.name[1:], node.coord)
-            self.visit(ty)
+            yield ty
         elif node.op == '&':
             ptr = self.types.lookup('ptr')
             ty = ast.Type([ptr]+ty.name, node.coord)
-            self.visit(ty)
+            yield ty
         elif node.op == '!':
             ty = ast.Type(['bool'], node.coord)
-            self.visit(ty)
+            yield ty
         node.type = ty
         
     def visit_VarDecl(self, node):
         # 1. Visit type.
-        self.visit(node.type)
+        yield node.type
         
         # 2. Check scope and insert in symbol table.
         var = node.declname
-        msg = f"Variable '{var.name}' defined twice in the same scope."
-        msg = self.build_error_msg(msg, var.coord)
-        assert self.scopes.add_to_scope(node), msg
+        if not self.scopes.add_to_scope(node):
+            self.error(f"Variable '{var.name}' defined twice in the same scope.", var.coord)
         
         # 3. Visit name.
-        self.visit(node.declname)
+        yield node.declname
 
     def visit_While(self, node):
         # 1. Create Scope
         self.scopes.add_scope()
 
         # 2. Visit condition.
-        self.visit(node.cond)
+        yield node.cond
 
         # 3. Condition must be boolean
         self.boolean_check(node.cond)
 
         # 4. Visit body.
         if node.body:
-            self.visit(node.body)
+            yield node.body
 
         # 5. Create Scope
         self.scopes.pop_scope()
@@ -971,20 +1094,18 @@ class uCSemanticCheck(ast.NodeVisitor):
     def boolean_check(self, cond):
         ''' Check if a condition is boolean.'''
         boolean = self.types.lookup('bool')
+        if self.poisoned(cond):
+            return
         
         if isinstance(cond.type, uCType.uCType) :
             ty = cond.type
         else:
             ty = cond.type.name[0]
         
-        if hasattr(cond, 'type'):
-            msg = f"Expression must be boolean, and is {ty.name} instead."
-            msg = self.build_error_msg(msg, cond.coord)
-            assert ty == boolean, msg
-        else:
-            msg = "Expression must be boolean."
-            msg = self.build_error_msg(msg, cond.coord)
-            assert False, msg
+        if not hasattr(cond, 'type'):
+            self.error("Expression must be boolean.", cond.coord)
+        elif ty != boolean:
+            self.error(f"Expression must be boolean, and is {ty.name} instead.", cond.coord)
         
     def get_inner_type(self, node):
         ''' Get innermost type node. Useful in declarations. '''
@@ -993,6 +1114,34 @@ class uCSemanticCheck(ast.NodeVisitor):
             ty = ty.type
         return ty
     
+    def add_modifier(self, node, name):
+        ''' Add the array or ptr type of a declarator to its innermost type node, after
+            the ones of the declarators below it (once: the AST may be checked again). '''
+        ty, below = node.type, 0
+        while ty and not isinstance(ty, ast.Type):
+            below += isinstance(ty, (ast.ArrayDecl, ast.PtrDecl))
+            ty = ty.type
+        if len(ty.name) == below + 1:
+            ty.name.insert(0, self.types.lookup(name))
+
+    def build_ctype(self, node):
+        ''' Canonical (interned) uCType of a declaration, with its dimensions (unknown if not constant).'''
+        mods = []
+        ty = node
+        while not isinstance(ty, ast.Type):
+            mods.append(ty)
+            ty = ty.type
+        
+        # Wrap the basic type, from the innermost modifier.
+        ctype = ty.name[-1]
+        for mod in reversed(mods):
+            if isinstance(mod, ast.ArrayDecl):
+                dims = mod.dims.value if isinstance(mod.dims, ast.Constant) else None
+                ctype = uCType.array_of(ctype, dims if isinstance(dims, int) else None)
+            elif isinstance(mod, ast.PtrDecl):
+                ctype = uCType.pointer_to(ctype)
+        return ctype
+    
     def check_init_len(self, init, ty):
         ''' Check if every element of InitList is of the same length as array dimension.'''
         ret = True
@@ -1002,7 +1151,7 @@ class uCSemanticCheck(ast.NodeVisitor):
                 if not ret: break
                 ret &= self.check_init_len(expr.exprs, ty.type)
         
-        ret &= ty.dims.value == len(init)
+        ret &= self.poisoned(ty.dims) or ty.dims.value == len(init)
         return ret
     
     def check_init_list(self, init, ty):
@@ -1013,14 +1162,292 @@ class uCSemanticCheck(ast.NodeVisitor):
                 ret &= self.check_init_list(expr.exprs, ty)
         else:
             for expr in init:
-                ret &= ty.name[-1] == expr.type.name[-1]
+                ret &= ty.name[-1] == expr.type.name[-1] or self.poisoned(expr)
         return ret
     
+    def check_return(self, node):
+        ''' Check if a non-void function (FuncDef) has returned.'''
+        void = self.types.lookup('void')
+        if node.type.name[-1] != void and not self.scopes.check_returned():
+            self.error("No return from a non-void function.", node.decl.name.coord)
+
     ## ERROR MESSAGE FUNCTIONS ##
-    def build_coords(self, coord):
-        ''' Get coordinates in string form for error msgs.'''
-        return f"({coord.line}, {coord.column}): "
-    
-    def build_error_msg(self, msg, coord_raw):
-        ''' Build error msg from string and coords. '''
-        return self.build_coords(coord_raw) + msg
+    def error(self, msg, coord=None):
+        ''' Report an error: raised, or collected in diagnostics if recovering.'''
+        diagnostic = Diagnostic(msg, coord)
+        if not self.recover:
+            raise AssertionError(str(diagnostic))
+        self.diagnostics.append(diagnostic)
+
+    def poison(self, node):
+        ''' Give the error type to an expression whose type is unknown.'''
+        node.type = ast.Type([uCType.error_type], node.coord)
+        node.type.ctype = uCType.error_type
+
+    def poisoned(self, *nodes):
+        ''' Check if any of the expressions has the error type.'''
+        for node in nodes:
+            ty = getattr(node, 'type', None)
+            if isinstance(ty, ast.Type) and ty.name and ty.name[0] is uCType.error_type:
+                return True
+        return False
+
+class uCIncrementalChecker():
+    '''
+    Semantic check that only checks again the top-level declarations
+    affected by a change. The check of each declaration records the global
+    names (variables and functions) it uses. Given the names declared by the
+    declarations that changed (see uCIncrementalParser.changed), only those
+    declarations and the ones using their names are checked again. The
+    others are replaced by their checked tree from the previous check, with
+    their coordinates shifted, and their declarations are added to the
+    scopes and signatures again.
+    Atributes:
+        - parser: parser of the programs, for the semantic check
+        - results: (class, declared names) => [checked declaration, global
+                   names used, coordinates, first line]
+        - rechecked: number of declarations checked by the last check
+        - pending: names changed since the last successful check
+    '''
+    def __init__(self, parser=None):
+        # Reused declarations are shifted by changing their coordinates.
+        if getattr(parser, 'compact', False):
+            raise ValueError("incremental checking needs a parser without compact AST")
+        self.parser = parser
+        self.results = {}
+        self.rechecked = 0
+        self.pending = set()
+
+    # Checks a freshly parsed program, as uCSemanticCheck.visit, where the
+    # declarations named in changed were added, edited, moved or removed
+    # since the last check (None: everything changed). The checked
+    # declarations of the previous check are reused in program.gdecls.
+    def check(self, program, changed=None):
+        if changed is not None:
+            changed = self.pending | set(changed)
+        try:
+            self._check(program, changed)
+        except AssertionError:
+            # Check the changes again next time (everything, if unknown).
+            if changed is None:
+                self.results = {}
+            else:
+                self.pending = changed
+            raise
+        self.pending = set()
+        return program
+
+    def _check(self, program, changed):
+        sema = uCSemanticCheck(self.parser)
+        scopes = sema.scopes
+        results = {}
+        self.rechecked = 0
+
+        scopes.add_scope()
+        for i, gdecl in enumerate(program.gdecls):
+            names = ast.declared_names(gdecl)
+            key = (gdecl.__class__.__name__, tuple(names))
+            entry = self.results.get(key) if changed is not None and key not in results else None
+            if entry is not None and self.reusable(entry, names, changed, scopes):
+                self.replay(sema, entry[0])
+                line = self.first_line(gdecl)
+                if line != entry[3]:
+                    delta = line - entry[3]
+                    for coord in entry[2]:
+                        coord.line += delta
+                    entry[3] = line
+                program.gdecls[i] = entry[0]
+            else:
+                sema.uses = set()
+                sema.visit(gdecl)
+                self.rechecked += 1
+                entry = [gdecl, sema.uses, self.coords(gdecl), self.first_line(gdecl)]
+            results[key] = entry
+        scopes.pop_scope()
+
+        self.results = results # Forget declarations that are gone
+
+    # The checked declaration of entry is still valid: neither it nor the
+    # global names it uses changed, and they are all declared before it.
+    def reusable(self, entry, names, changed, scopes):
+        if not (changed.isdisjoint(names) and changed.isdisjoint(entry[1])):
+            return False
+        return all(name in names or scopes.chain.depth(name) == 0 for name in entry[1])
+
+    # Adds the declarations of an already checked top-level declaration to
+    # the global scope and the signatures, as its check did.
+    def replay(self, sema, gdecl):
+        scopes = sema.scopes
+        defining = isinstance(gdecl, ast.FuncDef)
+        for decl in ([gdecl.decl] if defining else gdecl.decls):
+            ty = decl.type
+            while not isinstance(ty, (ast.FuncDecl, ast.VarDecl)):
+                ty = ty.type
+            if isinstance(ty, ast.FuncDecl):
+                scopes.add_scope()
+                scopes.add_func(ty.type)
+                scopes.pop_scope()
+                msg = sema.signatures.sign_func(ty, defining)
+                if msg:
+                    sema.error(msg, ty.type.declname.coord)
+            else:
+                var = ty.declname
+                if not scopes.add_to_scope(ty):
+                    sema.error(f"Variable '{var.name}' defined twice in the same scope.", var.coord)
+
+    # Line of the declared name of a top-level declaration.
+    def first_line(self, gdecl):
+        decl = gdecl.decl if isinstance(gdecl, ast.FuncDef) else gdecl.decls[0]
+        return decl.name.coord.line
+
+    # Coordinates (with a line) of the nodes of a checked tree. Only its
+    # children are followed: the types set by the semantic check may be
+    # nodes of other declarations.
+    def coords(self, gdecl):
+        coords = {}
+        def pre(node, name, depth):
+            coord = node.coord
+            if isinstance(coord, ast.Coord) and coord.line:
+                coords[id(coord)] = coord
+        ast.walk(gdecl, pre)
+        return list(coords.values())
+
+# Checks the bodies of function definitions (jobs), in source order. The
+# global scope and the signatures are rebuilt from declared, as they were
+# before each function. Returns (index, checked FuncDef, diagnostics) for
+# each one. The errors are collected (recover), so the first one is the
+# error the sequential check raises. If not recover, it stops at the first
+# function with an error.
+def _check_bodies(declared, jobs, recover):
+    sema = uCSemanticCheck(recover=True)
+    chain = sema.scopes.chain
+    signs = sema.signatures.sign
+    sema.scopes.add_scope()
+    results = []
+    i = 0
+    for (index, node, local) in jobs:
+        while i < len(declared) and declared[i][0] <= index:
+            (_, name, decl, sign) = declared[i]
+            chain.add(name, decl)
+            if sign is not None:
+                signs[name] = sign
+            i += 1
+        sema.diagnostics = []
+        sema.check_body(node, local)
+        results.append((index, node, sema.diagnostics))
+        if sema.diagnostics and not recover:
+            break
+    return results
+
+# Global declarations and bodies to check, of the current (worker) process:
+# set once, by _start, not sent with each chunk.
+_declared = _jobs = None
+
+def _start(declared, jobs):
+    global _declared, _jobs
+    _declared, _jobs = declared, jobs
+
+# Checks the bodies of _jobs[start:end], in a worker. If trees, the checked
+# trees are sent back serialized (uCSerialize), which loads much faster than
+# a pickle.
+def _check_chunk(start, end, recover, trees):
+    results = _check_bodies(_declared, _jobs[start:end], recover)
+    data = None
+    if trees:
+        data = uCSerialize.dumps(ast.Program([node for (_, node, _) in results]))
+    return [(index, diagnostics) for (index, _, diagnostics) in results], data
+
+class uCParallelChecker():
+    '''
+    Semantic check where the bodies of the function definitions are checked
+    concurrently, in a pool of worker processes. The global declarations and
+    the function headers are checked first, in order, as uCSemanticCheck
+    does, recording where each global name was declared. The bodies only
+    read that frozen global scope (and the signatures), so they are sent to
+    the workers in chunks, and their errors are merged in source order.
+    As in the sequential check, the first error is raised, or, if recover,
+    all of them are collected in diagnostics.
+    By default the checked bodies are sent back (uCSerialize, whatever their
+    depth) and replace the ones of the program, as if checked in place. That
+    costs about as much as checking them, so with trees=False only the errors
+    are sent back: for checking without generating code.
+    Atributes:
+        - workers: number of worker processes (None: one per CPU; 0: no pool,
+                   the bodies are checked in place)
+        - chunks: number of chunks of bodies per worker
+        - trees: send the checked bodies back to the program (False: only the
+                 errors, the bodies checked by the pool are left undecorated)
+        - recover: collect the errors instead of raising the first one
+        - diagnostics: errors found by the last check (Diagnostic), in
+                       source order, if recover
+    '''
+    def __init__(self, workers=None, chunks=4, trees=True, recover=False):
+        self.workers = workers
+        self.chunks = chunks
+        self.trees = trees
+        self.recover = recover
+        self.diagnostics = []
+
+    # Checks a program, as uCSemanticCheck.visit: an AssertionError is raised
+    # for the first error, unless recover. The checked bodies replace the ones
+    # in gdecls.
+    def check(self, program):
+        sema = uCSemanticCheck(recover=self.recover)
+        chain = sema.scopes.chain
+        signs = sema.signatures.sign
+        declared, seen, jobs = [], set(), []
+        diagnostics = []
+        error = None
+
+        # 1. Global declarations and function headers, in order.
+        sema.scopes.add_scope()
+        for (index, gdecl) in enumerate(program.gdecls):
+            try:
+                if isinstance(gdecl, ast.FuncDef):
+                    jobs.append((index, gdecl, sema.check_header(gdecl)))
+                else:
+                    sema.visit(gdecl)
+            except AssertionError as e:
+                error = e # Only the bodies before it are checked
+                break
+            diagnostics += [(index, 0, diagnostic) for diagnostic in sema.diagnostics]
+            sema.diagnostics = []
+            for name in ast.declared_names(gdecl):
+                if name not in seen:
+                    seen.add(name)
+                    declared.append((index, name, chain.get(name, 0), signs.get(name)))
+
+        # 2. Function bodies, the results in source order (a function's
+        # header before its body).
+        for (index, node, found) in self.check_bodies(declared, jobs):
+            if found and not self.recover:
+                raise AssertionError(str(found[0]))
+            diagnostics += [(index, 1, diagnostic) for diagnostic in found]
+            if node is not None:
+                program.gdecls[index] = node
+        if error is not None:
+            raise error
+        diagnostics.sort(key=lambda item: item[:2])
+        self.diagnostics = [diagnostic for (_, _, diagnostic) in diagnostics]
+        return program
+
+    # Checks the bodies (jobs), yielding the results of _check_bodies in order.
+    def check_bodies(self, declared, jobs):
+        if self.workers == 0 or not jobs: # Serial, in this process
+            yield from _check_bodies(declared, jobs, self.recover)
+            return
+
+        # The workers get the jobs once, when started (for free, if forked).
+        workers = self.workers or os.cpu_count() or 1
+        size = -(-len(jobs) // (workers * self.chunks))
+        pool = ProcessPoolExecutor(workers, initializer=_start, initargs=(declared, jobs))
+        try:
+            futures = [pool.submit(_check_chunk, i, i + size, self.recover, self.trees)
+                       for i in range(0, len(jobs), size)]
+            for future in futures:
+                (results, data) = future.result()
+                nodes = iter(uCSerialize.loads(data, lazy=False).gdecls if data else ())
+                for (index, diagnostics) in results:
+                    yield (index, next(nodes, None), diagnostics)
+        finally: # After an error, the later chunks aren't needed
+            pool.shutdown(cancel_futures=True)
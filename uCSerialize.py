@@ -0,0 +1,419 @@
+'''
+Front end: Compact binary serialization of the AST.
+
+Format: a header, then the tree as a flat array of unsigned words (2 or 4
+bytes each). A node is its class id (+ _NODE), followed by the value of each
+of its __slots__, in order. The layout of each class (its name and slots) is
+stored in the header, with the table of the strings and numbers used.
+
+    magic | typecode | byteorder | header size (uint32) | header (JSON) | words
+
+Coordinates store their line as the difference to the previous one, so
+most of them are small (a PackedCoord is stored, and read back, as a
+Coord). Nodes referenced more than once (coordinates shared by several
+nodes, types set by the semantic check...) are written once, after a
+_SHARE tag, and then referenced by their index. The uCType singletons are
+stored by name, and the derived (interned) types by their kind and the
+types they are built from. Trees are encoded and decoded from an explicit
+stack, so they can be nested as deep as the parser allows.
+
+The body of each function is written apart, as a "blob" of words, so it
+can be loaded only when it's first accessed (see load). A blob has its own
+shared nodes, and can reference the shared nodes that precede it.
+
+Loading a whole tree (lazy=False) is only about 5x faster than parsing its
+source again, short of an order of magnitude, and 2.5x faster than
+unpickling it (100k lines: 1.1 s, vs 5.0 s and 2.7 s; see
+benchmarks/bench_ast.py --load). A lazy load decodes the top level only
+(6 ms), and each body when it's used.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+import gc
+import sys
+import json
+import struct
+from array import array
+import uCAST as ast
+import uCType
+
+MAGIC = b'uCAST\x02'
+
+# Tags of the values. Nodes are _NODE + class id.
+_NONE, _MISSING, _FALSE, _TRUE, _STR, _INT, _FLOAT, _LIST, _COORD, \
+    _SHARE, _REF, _OUTER, _TYPE, _DERIVED, _LAZY, _NODE = range(16)
+
+_missing = object() # Slot without a value (never set)
+
+# Names of the uCType singletons, by identity.
+_type_names = {id(value): name for name, value in vars(uCType).items() if isinstance(value, uCType.uCType)}
+
+def _slots(cls):
+    slots = cls.__slots__
+    return (slots,) if isinstance(slots, str) else tuple(slots)
+
+class _Pending():
+    '''Function body not loaded yet: a blob of words and the shared nodes
+    that precede it.
+    '''
+    __slots__ = ('reader', 'start', 'end', 'outer')
+
+    def __init__(self, reader, start, end, outer):
+        self.reader = reader
+        self.start = start
+        self.end = end
+        self.outer = outer
+
+    def load(self):
+        return self.reader.scope(self.start, self.end, self.outer)()
+
+class _Body():
+    '''Function body to write in its own blob (see _Writer.scope).'''
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+_body = ast.FuncDef.__dict__['body']
+
+class _LazyFuncDef(ast.FuncDef):
+    '''FuncDef whose body is decoded on first access, when it becomes a
+    plain FuncDef. Until then, visitors and show() handle it as a FuncDef
+    (see ast.register_alias). The body slot holds the pending blob.
+    '''
+    __slots__ = ()
+
+    base = ast.FuncDef
+
+    def _get_body(self):
+        body = _body.__get__(self)
+        if type(body) is _Pending:
+            body = body.load()
+            _body.__set__(self, body)
+        self.__class__ = ast.FuncDef
+        return body
+
+    def _set_body(self, value):
+        _body.__set__(self, value)
+        if type(value) is not _Pending:
+            self.__class__ = ast.FuncDef
+
+    body = property(_get_body, _set_body)
+
+    # Pickled and copied as a plain FuncDef.
+    def __reduce__(self):
+        return (ast.FuncDef, (self.type, self.decl, self.params, self.body, self.coord))
+
+ast.register_alias(_LazyFuncDef, ast.FuncDef)
+
+class _Writer():
+    '''Encoder of a tree into words and the tables of the header.
+    Atributes:
+        - strings: string => index in the string table
+        - classes: class => class id
+        - layouts: [name, slots] of each class id
+        - blobs: words of each function body
+        - shared: ids of the nodes (and lists) referenced more than once
+    '''
+
+    def __init__(self, root):
+        self.strings = {}
+        self.classes = {}
+        self.layouts = []
+        self.blobs = []
+        self.shared = self._shared(root)
+
+    # Finds the nodes and lists reachable more than once from root.
+    def _shared(self, root):
+        seen, shared = set(), set()
+        stack = [root]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, ast.Node):
+                cls = _LazyFuncDef.base if type(value) is _LazyFuncDef else type(value)
+                children = [getattr(value, name, None) for name in _slots(cls)]
+            elif isinstance(value, list):
+                children = value
+            else:
+                continue
+            if id(value) in seen:
+                shared.add(id(value))
+                continue
+            seen.add(id(value))
+            stack.extend(children)
+        return shared
+
+    def string(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def layout(self, cls):
+        index = self.classes.get(cls)
+        if index is None:
+            if cls.__module__ != ast.__name__:
+                raise TypeError(f"can't serialize {cls.__name__} nodes")
+            index = self.classes[cls] = len(self.layouts)
+            self.layouts.append([cls.__name__, list(_slots(cls))])
+        return index
+
+    # Encodes root in a new list of words. Function bodies are put in
+    # blobs, unless inside a blob already (outer: its enclosing memo).
+    # The values are encoded in preorder, from an explicit stack (no
+    # recursion, whatever the depth of the tree).
+    def scope(self, root, outer=None):
+        words, memo = [], {}
+        emit, shared, string = words.append, self.shared, self.string
+        line = 0
+
+        stack = [root]
+        pop, push = stack.pop, stack.append
+        while stack:
+            v = pop()
+            if v is _missing:
+                emit(_MISSING)
+                continue
+            cls = type(v)
+            if cls is _Body:
+                emit(_LAZY); emit(len(self.blobs))
+                self.blobs.append(self.scope(v.node, memo))
+                continue
+            key = id(v)
+            if key in memo:
+                emit(_REF); emit(memo[key])
+                continue
+            if outer is not None and key in outer:
+                emit(_OUTER); emit(outer[key])
+                continue
+            if key in shared:
+                emit(_SHARE)
+                memo[key] = len(memo)
+
+            if cls is _LazyFuncDef:
+                cls = _LazyFuncDef.base
+            if (cls is ast.Coord and type(v.line) is int) or cls is ast.PackedCoord:
+                delta = v.line - line
+                line = v.line
+                emit(_COORD)
+                emit(delta << 1 if delta >= 0 else (-delta << 1) - 1)
+                emit(0 if v.column is None else v.column + 1)
+            elif isinstance(v, ast.Node):
+                emit(_NODE + self.layout(cls))
+                children = [getattr(v, name, _missing) for name in _slots(cls)]
+                if outer is None and cls is ast.FuncDef:
+                    body = _slots(cls).index('body')
+                    if children[body] is not None and children[body] is not _missing:
+                        children[body] = _Body(children[body])
+                children.reverse()
+                stack.extend(children)
+            elif v is None:
+                emit(_NONE)
+            elif cls is str:
+                emit(_STR); emit(string(v))
+            elif cls is list:
+                emit(_LIST); emit(len(v))
+                stack.extend(reversed(v))
+            elif cls is bool:
+                emit(_TRUE if v else _FALSE)
+            elif cls is int:
+                emit(_INT); emit(string(str(v)))
+            elif cls is float:
+                emit(_FLOAT); emit(string(repr(v)))
+            elif key in _type_names:
+                emit(_TYPE); emit(string(_type_names[key]))
+            elif cls is uCType.uCDerivedType:
+                # Its kind and the types (and dimension) it is built from.
+                emit(_DERIVED); emit(string(v.name))
+                if v.name == 'array':
+                    push(v.dim)
+                elif v.name == 'function':
+                    push(list(v.params))
+                push(v.of)
+            else:
+                raise TypeError(f"can't serialize {cls.__name__} values")
+        return words
+
+class _Reader():
+    '''Decoder of the words of a serialized tree.
+    Atributes:
+        - words: words of the tree and of the function bodies (array)
+        - strings: string table
+        - layouts: (class, slot setters) of each class id
+        - blobs: (start, end) of the words of each function body
+        - lazy: function bodies are loaded on first access
+    '''
+
+    def __init__(self, words, strings, layouts, blobs, lazy):
+        self.words = words
+        self.strings = strings
+        self.blobs = blobs
+        self.lazy = lazy
+        self.layouts = []
+        for name, slots in layouts:
+            cls = getattr(ast, name, None)
+            if not (isinstance(cls, type) and issubclass(cls, ast.Node)) or list(_slots(cls)) != slots:
+                raise ValueError(f"AST layout of {name} doesn't match this version")
+            if lazy and cls is ast.FuncDef:
+                cls = _LazyFuncDef
+            self.layouts.append((cls, [getattr(cls, slot).__set__ for slot in slots]))
+
+    # Returns the decoder of words[start:end], a function returning its value.
+    # The compound values (nodes, lists, shared values and derived types)
+    # being decoded are kept in an explicit stack of frames, each completed
+    # by the values that follow it (no recursion, whatever the depth).
+    def scope(self, start, end, outer):
+        next_word = iter(self.words[start:end]).__next__
+        strings, layouts, blobs, lazy = self.strings, self.layouts, self.blobs, self.lazy
+        new, Coord, Pending = object.__new__, ast.Coord, _Pending
+        memo = []
+
+        def value():
+            line = 0
+            stack = []
+            push = stack.append
+            while True:
+                word = next_word()
+                if word >= _NODE:
+                    cls, setters = layouts[word - _NODE]
+                    v = new(cls)
+                    if setters:
+                        push([_NODE, v, setters, 0])
+                        continue
+                elif word == _COORD:
+                    delta = next_word()
+                    line += -((delta + 1) >> 1) if delta & 1 else delta >> 1
+                    column = next_word()
+                    v = new(Coord)
+                    v.line = line
+                    v.column = column - 1 if column else None
+                elif word == _STR:
+                    v = strings[next_word()]
+                elif word == _NONE:
+                    v = None
+                elif word == _SHARE:
+                    push([_SHARE, len(memo)])
+                    memo.append(None)
+                    continue
+                elif word == _REF:
+                    v = memo[next_word()]
+                elif word == _LIST:
+                    size = next_word()
+                    v = []
+                    if size:
+                        push([_LIST, v, size])
+                        continue
+                elif word == _MISSING:
+                    v = _missing
+                elif word == _OUTER:
+                    v = outer[next_word()]
+                elif word == _LAZY:
+                    start, end = blobs[next_word()]
+                    v = Pending(self, start, end, memo) if lazy else self.scope(start, end, memo)()
+                elif word == _INT:
+                    v = int(strings[next_word()])
+                elif word == _FLOAT:
+                    v = float(strings[next_word()])
+                elif word == _TYPE:
+                    v = getattr(uCType, strings[next_word()])
+                elif word == _DERIVED:
+                    kind = strings[next_word()]
+                    push([_DERIVED, kind, [], 1 if kind == 'ptr' else 2])
+                    continue
+                elif word in (_TRUE, _FALSE):
+                    v = word == _TRUE
+                else:
+                    raise ValueError(f"corrupted AST data (tag {word})")
+
+                # Gives v to the frame on top, and the frames it completes
+                # to the ones below.
+                while stack:
+                    frame = stack[-1]
+                    tag = frame[0]
+                    if tag == _NODE:
+                        i = frame[3]
+                        if v is not _missing:
+                            frame[2][i](frame[1], v)
+                        frame[3] = i = i + 1
+                        if i < len(frame[2]):
+                            break
+                        v = frame[1]
+                    elif tag == _LIST:
+                        frame[1].append(v)
+                        if len(frame[1]) < frame[2]:
+                            break
+                        v = frame[1]
+                    elif tag == _SHARE:
+                        memo[frame[1]] = v
+                    else:
+                        args = frame[2]
+                        args.append(v)
+                        if len(args) < frame[3]:
+                            break
+                        if frame[1] == 'array':
+                            v = uCType.array_of(*args)
+                        elif frame[1] == 'function':
+                            v = uCType.function_of(*args)
+                        else:
+                            v = uCType.pointer_to(*args)
+                    stack.pop()
+                else:
+                    return v
+
+        return value
+
+# Serializes the tree of root (usually an ast.Program) to bytes.
+def dumps(root):
+    writer = _Writer(root)
+    words = writer.scope(root)
+    main, blobs = len(words), []
+    for blob in writer.blobs:
+        blobs.append((len(words), len(words) + len(blob)))
+        words.extend(blob)
+
+    typecode = 'H' if max(words, default=0) < (1 << 16) else 'I'
+    header = json.dumps(dict(classes=writer.layouts, strings=list(writer.strings),
+                             blobs=blobs, main=main), separators=(',', ':')).encode()
+    return b''.join((MAGIC, typecode.encode(), sys.byteorder[0].encode(),
+                     struct.pack('<I', len(header)), header, array(typecode, words).tobytes()))
+
+# Rebuilds a tree from bytes. If lazy, function bodies are only decoded
+# when first accessed (they are decoded whole if the tree is dumped again).
+def loads(data, lazy=True):
+    data = memoryview(data)
+    size = len(MAGIC)
+    if data[:size] != MAGIC:
+        raise ValueError("not a serialized uC AST")
+    typecode, byteorder = chr(data[size]), chr(data[size + 1])
+    length, = struct.unpack_from('<I', data, size + 2)
+    start = size + 6 + length
+    header = json.loads(bytes(data[size + 6:start]))
+
+    words = array(typecode)
+    words.frombytes(data[start:])
+    if byteorder != sys.byteorder[0]:
+        words.byteswap()
+    reader = _Reader(words, header['strings'], header['classes'], header['blobs'], lazy)
+
+    # Decoding allocates the whole tree, which would trigger many
+    # (useless) garbage collections: leave them to the next one instead.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return reader.scope(0, header['main'], None)()
+    finally:
+        if enabled:
+            gc.enable()
+
+def dump(root, file):
+    file.write(dumps(root))
+
+def load(file, lazy=True):
+    return loads(file.read(), lazy)
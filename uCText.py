@@ -0,0 +1,111 @@
+'''
+Second Project (extra): Reading the uCIR back from its text form, as
+uCIRGenerator.format_instruction prints it (the .ir files):
+
+    global_string @.str.0 'assertion_fail on 7:12'
+    global_int_2 @v [1, 2]
+
+    define_int @f int %1, float %2
+    entry:
+      literal_int 1 %3
+      cbranch %4 label %5 label %6
+    5:
+      jump label %2
+
+Each line is one instruction (the blank line and the 'entry:' label after
+a define are part of it), so a file is parsed as it is read.
+
+Subject:
+    MC921 - Construction of Compilers
+Authors:
+    Victor Ferreira Ferrari  - RA 187890
+    Vinicius Couto Espindola - RA 188115
+
+University of Campinas - UNICAMP - 2020
+'''
+
+from ast import literal_eval
+from uCIR import decode
+
+# Value of a literal or of a global's initializer, by the type of its opcode.
+# Characters are printed with their quotes ("'a'") and strings without them
+# (hi there), as the generator keeps them: a char array's text is only a
+# list if it is an initializer list, of quoted characters (["'a'", "'b'"]).
+def value(text, ty):
+    if not text:
+        return text
+    elif ty == 'int' and text[0] != '[':
+        return int(text)
+    elif ty == 'float' and text[0] != '[':
+        return float(text)
+    elif ty == 'bool':
+        return text == 'True'
+    elif ty == 'char':
+        if text[0] != '[' or not text.lstrip('[').startswith(('"\'', "'\\''")):
+            return text
+        try:
+            items = literal_eval(text)
+        except (ValueError, SyntaxError):
+            return text
+        return items if _chars(items) else text
+    try:
+        return literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+# Whether a value is a (nested) list of quoted characters.
+def _chars(items):
+    if isinstance(items, str):
+        return len(items) > 2 and items[0] == items[-1] == "'"
+    return isinstance(items, list) and all(_chars(item) for item in items)
+
+# Instruction of a line (None if the line isn't one: the blank line and the
+# 'entry:' label after a define).
+def parse_line(line):
+    if line.startswith('  '):
+        inst = line[2:]
+        if inst.startswith('jump '):
+            return ('jump', inst[11:])
+        elif inst.startswith('cbranch '):
+            _, test, _, true, _, false = inst.split(' ')
+            return ('cbranch', test, true, false)
+        elif inst.startswith('return') or inst == 'print_void':
+            return tuple(inst.split(' '))
+
+        # Every other operand is followed by a space.
+        opcode, _, operands = inst[:-1].partition(' ')
+        if opcode.startswith('literal'):
+            literal, _, target = operands.rpartition(' ')
+            return (opcode, value(literal, decode(opcode).type), target)
+        return (opcode,) + tuple(operands.split(' '))
+
+    elif line.startswith('global'):
+        if line.startswith('global_string '):
+            opcode, name, string = line.split(' ', 2)
+            return (opcode, name, string[1:-1])
+        inst = line[:-1].split(' ', 2)
+        if len(inst) == 3:
+            inst[2] = value(inst[2], decode(inst[0]).type)
+        return tuple(inst)
+
+    elif line.startswith('define'):
+        opcode, name, params = line.split(' ', 2)
+        return (opcode, name, [tuple(param.split(' ')) for param in params.split(', ')] if params else [])
+
+    elif not line or line == 'entry:':
+        return None
+    elif line[-1] == ':':
+        return (line[:-1],)
+    return (line,)
+
+# Instructions of the lines of a uCIR (e.g. an open .ir file), as they are read.
+def parse(lines):
+    for line in lines:
+        inst = parse_line(line.rstrip('\n'))
+        if inst is not None:
+            yield inst
+
+# The uCIR of a .ir file.
+def read(filename):
+    with open(filename, 'r') as ir_file:
+        return list(parse(ir_file))
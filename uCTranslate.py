@@ -14,7 +14,7 @@ Last Modified: 09/07/2020.
 '''
 
 from llvmlite import ir
-import re
+from uCIR import Op, decode
 
 class uCIRTranslator(object):
     def __init__(self):
@@ -96,7 +96,7 @@ class uCIRTranslator(object):
         line = 0
         while line < len(code)-1:
             inst = code[line]
-            A = not re.match(r'cbranch|jump', inst[0])
+            A = decode(inst[0]).op not in (Op.CBRANCH, Op.JUMP)
             B = self.is_label(code[line+1])
             if A and B:
                 label = '%'+code[line+1][0]
@@ -107,25 +107,16 @@ class uCIRTranslator(object):
 
     def is_label(self, inst):
         if type(inst) in {tuple,list}: 
-            return bool(re.match(r'^\d+$', inst[0]))
+            return decode(inst[0]).op == Op.LABEL
         else: 
-            return bool(re.match(r'^\d+$', inst))
+            return decode(inst).op == Op.LABEL
 
     def _extract_operation(self, source):
-        if self.is_label(source): return 'label',None,None
-        _modifier = {}
-        _type = None
-        _aux = source.split('_')
-        _opcode = _aux[0]
-        if _opcode not in {'fptosi', 'sitofp', 'jump', 'cbranch', 'define'}:
-            _type = _aux[1]
-            for i, _val in enumerate(_aux[2:]):
-                if _val.isdigit():
-                    _modifier['dim' + str(i)] = _val
-                elif _val == '*':
-                    _modifier['ptr' + str(i)] = _val
-                    
-        return (_opcode, _type, _modifier)
+        # Decoded once per opcode (see uCIR.decode)
+        _code = decode(source)
+        if _code.op == Op.LABEL: return 'label',None,None
+        _type = None if _code.op == Op.DEFINE else _code.type
+        return (_code.name, _type, _code.modifier)
     
     def _global_constant(self, builder_or_module, name, value, linkage='internal'):
         # Get or create a (LLVM module-)global constant with *name* or *value*.
@@ -159,7 +150,7 @@ class uCIRTranslator(object):
         try:
             fn = self.module.get_global(inst[1][1:])
         except KeyError:
-            ty = inst[0].split('_')[1]
+            ty = decode(inst[0]).type
             
             # Get args
             arg_types = list(map(lambda x: x[0], inst[2]))
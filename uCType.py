@@ -12,6 +12,8 @@ University of Campinas - UNICAMP - 2020
 Last Modified: 05/05/2020.
 '''
 
+import weakref
+
 class uCType(object):
     '''
     Class that represents a type in the uC language.  Types 
@@ -24,6 +26,7 @@ class uCType(object):
         self.rel_ops = rel_ops
         self.assign_ops = assign_ops
         self.cast_types = cast_types
+        self.ir = name # Name in the uCIR
     
     def __str__(self):
         return f'type({self.name})'
@@ -31,6 +34,11 @@ class uCType(object):
     def __repr__(self):
         return self.__str__()
 
+    # Types are singletons: they are pickled as a reference to the
+    # module instance, so unpickled ASTs keep comparing types by identity.
+    def __reduce__(self):
+        return next(name for name, value in globals().items() if value is self)
+
 int_type = uCType("int",
     bin_ops = {'+', '-', '*', '/', '%'},
     un_ops = {'+', '-', '--', '++', 'p--', 'p++', '*', '&'},
@@ -69,3 +77,99 @@ arr_type = uCType('array',
     un_ops = {'*', '&', '++', 'p++', '--', 'p--'},
     rel_ops = {'==', '!='}
     )
+func_type = uCType('function')
+
+# Type of an expression with an error, so the checks using it are skipped.
+error_type = uCType('error')
+
+class uCDerivedType(uCType):
+    '''
+    Array, pointer or function type, built from other types. Derived types
+    are interned (see array_of, pointer_to and function_of): there is a
+    single instance of each one, so all types compare by identity. They
+    keep the operations of their kind (arr_type, ptr_type or func_type).
+    Atributes:
+        - of: element type (array), pointed type (ptr) or return type (function)
+        - dim: number of elements of an array (None if unknown)
+        - params: parameter types of a function (tuple)
+        - ir: name of the type in the uCIR (see uCIRGenerator.build_decl_types)
+    '''
+    def __init__(self, kind, of, dim=None, params=()):
+        super().__init__(kind.name, kind.bin_ops, kind.un_ops, kind.rel_ops, kind.assign_ops, kind.cast_types)
+        self.of = of
+        self.dim = dim
+        self.params = params
+
+        # Dimensions first, then pointers, from the outermost modifier.
+        dims, ptrs, ty = '', 0, self
+        while isinstance(ty, uCDerivedType) and ty.name != 'function':
+            if ty.name == 'array': dims += f'_{ty.dim}'
+            else: ptrs += 1
+            ty = ty.of
+        self.ir = ty.ir + dims + '_*' * ptrs
+
+    def __str__(self):
+        return f'type({self.spelling()})'
+
+    # C-like name of the type, as int*[10].
+    def spelling(self):
+        of = self.of.spelling() if isinstance(self.of, uCDerivedType) else self.of.name
+        if self.name == 'function':
+            params = (p.spelling() if isinstance(p, uCDerivedType) else p.name for p in self.params)
+            return f"{of}({', '.join(params)})"
+        if self.name == 'array':
+            return f"{of}[{'' if self.dim is None else self.dim}]"
+        return of + '*'
+
+    # Interned again when unpickled.
+    def __reduce__(self):
+        if self.name == 'array':
+            return (array_of, (self.of, self.dim))
+        if self.name == 'ptr':
+            return (pointer_to, (self.of,))
+        return (function_of, (self.of, self.params))
+
+# (kind, of, dim or params) => interned uCDerivedType. The types are only
+# kept while in use (by the trees of a check), so the table doesn't grow
+# with every program checked.
+_derived = weakref.WeakValueDictionary()
+
+def _intern(kind, of, extra, **attrs):
+    key = (kind, of, extra)
+    ty = _derived.get(key)
+    if ty is None:
+        ty = _derived[key] = uCDerivedType(kind, of, **attrs)
+    return ty
+
+def array_of(ty, dim=None):
+    ''' Array of dim elements of type ty (interned). '''
+    return _intern(arr_type, ty, dim, dim=dim)
+
+def pointer_to(ty):
+    ''' Pointer to type ty (interned). '''
+    return _intern(ptr_type, ty, None)
+
+def function_of(ret, params=()):
+    ''' Function returning ret, with parameters of the given types (interned). '''
+    params = tuple(params)
+    return _intern(func_type, ret, params, params=params)
+
+def canonical(names, dims=()):
+    '''
+    Canonical type of a list of type names, as kept by ast.Type after the
+    semantic check: modifiers first (arr_type, ptr_type) and the basic type
+    last. dims are the dimensions of its arrays, from the outermost one
+    (unknown if missing). None if the names aren't all uCTypes.
+    '''
+    if isinstance(names, str):
+        return None
+    if len(names) == 1 and type(names[0]) is uCType: # Basic types are their own
+        return names[0]
+    if not names or not all(isinstance(name, uCType) for name in names):
+        return None
+    ty = names[-1]
+    arrays = sum(name is arr_type for name in names[:-1])
+    dims = list(dims[:arrays]) + [None] * (arrays - len(dims))
+    for name in reversed(names[:-1]):
+        ty = array_of(ty, dims.pop()) if name is arr_type else pointer_to(ty)
+    return ty